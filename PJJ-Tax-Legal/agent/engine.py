@@ -12,12 +12,22 @@ import builtins
 import importlib
 import logging
 import os
+import threading
 import traceback
 from typing import Tuple, Dict, Optional
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# allowed_path of the code currently executing on this thread
+# (corpus-backed tools search the memory directory the agent is confined to)
+_active = threading.local()
+
+
+def get_allowed_path() -> Optional[str]:
+    """Absolute allowed_path of the sandboxed code running on this thread, or None."""
+    return getattr(_active, "allowed_path", None)
+
 
 def execute_sandboxed_code(
     code: str,
@@ -61,13 +71,14 @@ def execute_sandboxed_code(
         # If allowed_path specified, restrict file operations to that directory
         if allowed_path:
             allowed = os.path.abspath(allowed_path)
+            _active.allowed_path = allowed
             orig_open = builtins.open
 
             def secure_open(file, *args, **kwargs):
                 """Restricts file access to allowed_path."""
                 path = (
-                    file
-                    if isinstance(file, str)
+                    os.fspath(file)
+                    if isinstance(file, (str, os.PathLike))
                     else getattr(file, "name", str(file))
                 )
                 full_path = os.path.abspath(path if path is not None else "")
@@ -167,6 +178,7 @@ def execute_sandboxed_code(
 
         # Restore original builtins if they were modified
         if allowed_path:
+            _active.allowed_path = None
             try:
                 builtins.open = orig_open
                 os.remove = orig_remove
@@ -0,0 +1,360 @@
+"""
+Opt-in Profiling Hooks for the Tax Workflow
+===========================================
+
+Wraps each TaxOrchestrator.run_workflow step (and optionally each
+BaseAgent.generate call) with cProfile + tracemalloc and writes a report
+per session and step to the profiles directory.
+
+Switches (environment variables, see agent/settings.py):
+- TAX_PROFILE=off|all|sample     Profiling mode (default: off)
+- TAX_PROFILE_SAMPLE_RATE=0.01   Fraction of sessions profiled in "sample" mode
+- TAX_PROFILE_GENERATE=1         Also profile every BaseAgent.generate call
+- TAX_PROFILE_MEMORY=0           Skip tracemalloc (CPU profile only)
+- TAX_PROFILE_DIR=/path          Where reports are written
+
+Sampling is decided per session from a hash of the session_id, so every step
+of a sampled session is profiled and unsampled sessions pay only one hash.
+
+Report layout:
+    <PROFILE_DIR>/<session_id>/
+      step_2_20251208_101500.txt   # top functions, top allocation sites, peak memory
+      step_2_20251208_101500.prof  # raw cProfile stats (open with snakeviz / pstats)
+      summary.jsonl                # one JSON line per profiled step
+
+Usage:
+    from agent.profiling import profile_workflow_step, profile_generate, configure_profiling
+
+    configure_profiling(mode="all")   # runtime override of the env switch
+"""
+
+import cProfile
+import functools
+import inspect
+import io
+import json
+import pstats
+import threading
+import time
+import tracemalloc
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from agent import settings
+from agent.logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Report sizes
+TOP_FUNCTIONS = 30
+TOP_ALLOCATIONS = 20
+
+_config: Dict[str, Any] = {
+    "mode": settings.PROFILE_MODE,
+    "sample_rate": settings.PROFILE_SAMPLE_RATE,
+    "generate": settings.PROFILE_GENERATE,
+    "memory": settings.PROFILE_MEMORY,
+    "directory": settings.PROFILE_DIR,
+}
+
+# Only one cProfile can be active per thread; nested spans are recorded
+# as sub-timings of the outermost active profile instead.
+_local = threading.local()
+
+# tracemalloc is process-wide: spans running concurrently in other threads
+# share it, and whoever started it stops it only when the last span releases it.
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+_tracemalloc_owned = False
+
+
+def configure_profiling(
+    mode: Optional[str] = None,
+    sample_rate: Optional[float] = None,
+    generate: Optional[bool] = None,
+    memory: Optional[bool] = None,
+    directory: Optional[Path] = None,
+) -> Dict[str, Any]:
+    """
+    Override the profiling switches at runtime (e.g. from the Streamlit sidebar).
+
+    Args:
+        mode: "off", "all" or "sample"
+        sample_rate: Fraction of sessions profiled in "sample" mode (0-1)
+        generate: Also profile each BaseAgent.generate call
+        memory: Collect tracemalloc allocation sites and peak memory
+        directory: Profiles directory
+
+    Returns:
+        The active configuration
+    """
+    if mode is not None:
+        if mode not in ("off", "all", "sample"):
+            raise ValueError(f"Invalid profiling mode: {mode} (must be off, all or sample)")
+        _config["mode"] = mode
+    if sample_rate is not None:
+        _config["sample_rate"] = max(0.0, min(float(sample_rate), 1.0))
+    if generate is not None:
+        _config["generate"] = generate
+    if memory is not None:
+        _config["memory"] = memory
+    if directory is not None:
+        _config["directory"] = Path(directory)
+    return dict(_config)
+
+
+def is_session_profiled(session_id: str) -> bool:
+    """
+    Decide whether a session is profiled under the current mode.
+
+    Deterministic per session_id so all steps of a sampled session are captured.
+    """
+    mode = _config["mode"]
+    if mode == "all":
+        return True
+    if mode != "sample":
+        return False
+    bucket = zlib.crc32(str(session_id).encode("utf-8")) % 10_000
+    return bucket < _config["sample_rate"] * 10_000
+
+
+class _ProfileSpan:
+    """One cProfile + tracemalloc capture for a session step."""
+
+    def __init__(self, session_id: str, label: str):
+        self.session_id = session_id
+        self.label = label
+        self.profiler = cProfile.Profile()
+        self.children: List[Dict[str, Any]] = []
+        self.tracing = False
+        self.profiling = False
+        self.start_snapshot = None
+        self.start_time = 0.0
+
+    def start(self) -> None:
+        if _config["memory"]:
+            _acquire_tracemalloc()
+            self.tracing = True
+            self.start_snapshot = tracemalloc.take_snapshot()
+        self.start_time = time.perf_counter()
+        try:
+            self.profiler.enable()
+            self.profiling = True
+        except ValueError as e:
+            # Python 3.12+: only one profiler per process (another thread's span is active)
+            logger.debug(f"CPU profile skipped for {self.session_id}/{self.label}: {e}")
+
+    def abort(self) -> None:
+        """Undo a partial start()."""
+        if self.profiling:
+            self.profiler.disable()
+            self.profiling = False
+        if self.tracing:
+            _release_tracemalloc()
+            self.tracing = False
+
+    def stop(self, error: Optional[BaseException]) -> None:
+        if self.profiling:
+            self.profiler.disable()
+        wall_ms = (time.perf_counter() - self.start_time) * 1000
+
+        peak_bytes = None
+        allocation_lines: List[str] = []
+        if self.tracing:
+            try:
+                _current, peak_bytes = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot().filter_traces((
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                ))
+                for stat in snapshot.compare_to(self.start_snapshot, "lineno")[:TOP_ALLOCATIONS]:
+                    allocation_lines.append(str(stat))
+            finally:
+                _release_tracemalloc()
+
+        try:
+            self._write_report(wall_ms, peak_bytes, allocation_lines, error)
+        except Exception as e:
+            logger.warning(f"Failed to write profile report for {self.session_id}/{self.label}: {e}")
+
+    def _write_report(
+        self,
+        wall_ms: float,
+        peak_bytes: Optional[int],
+        allocation_lines: List[str],
+        error: Optional[BaseException]
+    ) -> None:
+        session_dir = Path(_config["directory"]) / _safe_name(self.session_id)
+        session_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        base = session_dir / f"{_safe_name(self.label)}_{stamp}"
+
+        stream = io.StringIO()
+        if self.profiling:
+            self.profiler.dump_stats(str(base.with_suffix(".prof")))
+            stats = pstats.Stats(self.profiler, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(TOP_FUNCTIONS)
+        else:
+            stream.write("n/a (another profiler was active in this process)\n")
+
+        lines = [
+            f"# Profile: session={self.session_id} step={self.label}",
+            f"# Captured: {datetime.now().isoformat()}",
+            f"Wall time: {wall_ms:.1f} ms",
+            f"Peak traced memory: {_format_bytes(peak_bytes)}",
+            f"Outcome: {'error: ' + repr(error) if error else 'ok'}",
+            "",
+        ]
+        if self.children:
+            lines.append(f"## Nested spans ({len(self.children)})")
+            for child in self.children:
+                lines.append(f"  {child['label']}: {child['wall_ms']:.1f} ms")
+            lines.append("")
+        lines.append(f"## Top {TOP_FUNCTIONS} functions by cumulative time")
+        lines.append(stream.getvalue())
+        if allocation_lines:
+            lines.append(f"## Top {TOP_ALLOCATIONS} allocation sites (growth during step)")
+            lines.extend(allocation_lines)
+
+        base.with_suffix(".txt").write_text("\n".join(lines), encoding="utf-8")
+
+        summary = {
+            "session_id": self.session_id,
+            "step": self.label,
+            "captured_at": datetime.now().isoformat(),
+            "wall_ms": round(wall_ms, 1),
+            "peak_bytes": peak_bytes,
+            "nested": self.children,
+            "error": repr(error) if error else "",
+            "report": base.with_suffix(".txt").name,
+        }
+        with open(session_dir / "summary.jsonl", "a", encoding="utf-8") as f:
+            f.write(json.dumps(summary, ensure_ascii=False) + "\n")
+
+        logger.info(f"Profile written: {base.with_suffix('.txt')} ({wall_ms:.1f} ms, peak {_format_bytes(peak_bytes)})")
+
+
+@contextmanager
+def profile_span(session_id: str, label: str):
+    """
+    Profile the enclosed block for session_id if the session is profiled.
+
+    Nested spans (e.g. BaseAgent.generate inside a workflow step) are recorded
+    as timings in the enclosing report rather than as a second cProfile.
+    """
+    active: Optional[_ProfileSpan] = getattr(_local, "span", None)
+    if active is not None:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            active.children.append({
+                "label": label,
+                "wall_ms": round((time.perf_counter() - start) * 1000, 1),
+            })
+        return
+
+    if not is_session_profiled(session_id):
+        yield
+        return
+
+    span = _ProfileSpan(session_id, label)
+    try:
+        span.start()
+        started = True
+    except Exception as e:
+        logger.warning(f"Profiling disabled for {session_id}/{label}: {e}")
+        span.abort()
+        started = False
+    if not started:
+        yield
+        return
+
+    _local.span = span
+    _local.session_id = session_id
+    error: Optional[BaseException] = None
+    try:
+        yield
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _local.span = None
+        _local.session_id = None
+        span.stop(error)
+
+
+def _acquire_tracemalloc() -> None:
+    """Register a span as a tracemalloc user, starting tracing if needed."""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+            _tracemalloc_owned = True
+        if _tracemalloc_users == 0:
+            # Peak is process-wide; only reset it when no other span is measuring
+            tracemalloc.reset_peak()
+        _tracemalloc_users += 1
+
+
+def _release_tracemalloc() -> None:
+    """Drop a span's tracemalloc use; stop tracing after the last span if we started it."""
+    global _tracemalloc_users, _tracemalloc_owned
+    with _tracemalloc_lock:
+        _tracemalloc_users = max(0, _tracemalloc_users - 1)
+        if _tracemalloc_users == 0 and _tracemalloc_owned:
+            tracemalloc.stop()
+            _tracemalloc_owned = False
+
+
+def profile_workflow_step(func: Callable) -> Callable:
+    """
+    Decorator for TaxOrchestrator.run_workflow.
+
+    Reads session_id and step from the call arguments and profiles the step.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _config["mode"] == "off":
+            return func(*args, **kwargs)
+        bound = signature.bind_partial(*args, **kwargs)
+        session_id = bound.arguments.get("session_id", "no-session")
+        step = bound.arguments.get("step", signature.parameters["step"].default)
+        with profile_span(session_id, f"step_{step}"):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def profile_generate(func: Callable) -> Callable:
+    """
+    Decorator for BaseAgent.generate implementations (applied by BaseAgent).
+
+    Only active when TAX_PROFILE_GENERATE=1; inside a profiled workflow step
+    the call is recorded as a nested span of that step.
+    """
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if _config["mode"] == "off" or not _config["generate"]:
+            return func(self, *args, **kwargs)
+        session_id = getattr(_local, "session_id", None) or "no-session"
+        with profile_span(session_id, f"{type(self).__name__}.generate"):
+            return func(self, *args, **kwargs)
+
+    wrapper.__profiled__ = True
+    return wrapper
+
+
+def _safe_name(value: Any) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(value)) or "unnamed"
+
+
+def _format_bytes(value: Optional[int]) -> str:
+    if value is None:
+        return "n/a (TAX_PROFILE_MEMORY=0)"
+    return f"{value / (1024 * 1024):.2f} MB"
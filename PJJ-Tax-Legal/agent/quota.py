@@ -0,0 +1,362 @@
+"""
+Memory Quota Ledger
+===================
+
+Keeps per-directory byte totals for an agent memory directory so that size
+queries and limit checks are O(1) instead of a full os.walk per call.
+
+The ledger maps every directory (relative to the memory root, "" = root) to
+the recursive size of the files below it. agent.tools.create_file,
+update_file and delete_file apply the size delta of each write to the file's
+directory and its ancestors (O(depth)), and refuse writes that would exceed
+FILE_SIZE_LIMIT, DIR_SIZE_LIMIT (parent directory) or MEMORY_SIZE_LIMIT.
+
+Not metered (never counted, writes there are not limited by the ledger):
+- hidden files and directories (".index/" with catalog.sqlite and
+  documents.pack, editor swap files)
+- UNMETERED_DIRS at the memory root: "tax_database/" is the reference corpus
+  written by the extraction pipeline (over 100MB on its own), not agent memory
+
+Files changed outside the tools are picked up by reconciliation: a full walk
+on first use when no ledger exists yet, then a walk every
+QUOTA_RECONCILE_INTERVAL seconds. One shared background thread reconciles
+every ledger, and at most MAX_LEDGERS roots are kept (least recently used
+dropped). A walk that raced with a tool write is discarded and retried on
+the next cycle.
+
+Ledger file (in the hidden, gitignored derived-artifact directory):
+    <memory root>/.index/quota-ledger.json
+
+Usage:
+    from agent.quota import get_quota
+
+    quota = get_quota()              # ledger for the sandbox's allowed path (else os.getcwd())
+    quota.total()                    # bytes in the whole memory
+    quota.size("entities")           # bytes below entities/
+    quota.check_write("entities/a.md", len(content.encode("utf-8")))
+"""
+
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from agent.engine import get_allowed_path
+from agent.logging_config import get_logger
+from agent.settings import (
+    DIR_SIZE_LIMIT,
+    FILE_SIZE_LIMIT,
+    MEMORY_SIZE_LIMIT,
+    QUOTA_RECONCILE_INTERVAL,
+)
+from corpus.settings import INDEX_DIRNAME
+
+logger = get_logger(__name__)
+
+LEDGER_FILENAME = "quota-ledger.json"
+LEGACY_LEDGER_FILENAME = ".quota-ledger.json"  # Pre-.index location, removed on first save
+LEDGER_VERSION = 2
+
+# Top-level directories that are not agent memory
+UNMETERED_DIRS = ("tax_database",)
+
+# Roots with a ledger in memory at once (one per memory directory)
+MAX_LEDGERS = 32
+
+
+class QuotaLedger:
+    """
+    Recursive byte totals per directory of one memory root.
+
+    All paths passed in may be absolute or relative to the current working
+    directory; paths outside the root, hidden paths and paths below
+    UNMETERED_DIRS are reported as untracked (None).
+    """
+
+    def __init__(self, root: str):
+        """
+        Initialize QuotaLedger
+
+        Args:
+            root: Memory directory the ledger accounts for
+        """
+        self.root = os.path.abspath(root)
+        self.ledger_path = os.path.join(self.root, INDEX_DIRNAME, LEDGER_FILENAME)
+        self._totals: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        # Bumped by every tool write; a reconcile walk that saw a different
+        # version than the one it started with is stale and thrown away.
+        self._version = 0
+        self.reconciled_at = 0.0
+
+        if not self._load():
+            self.reconcile()
+
+    # ========================================================================
+    # QUERIES
+    # ========================================================================
+
+    def total(self) -> int:
+        """Bytes used by the whole memory (unmetered directories excluded)."""
+        with self._lock:
+            return self._totals.get("", 0)
+
+    def size(self, dir_path: str) -> Optional[int]:
+        """
+        Recursive size of a directory in bytes.
+
+        Returns:
+            Size in bytes, 0 for an empty/unknown directory inside the root,
+            None if dir_path is outside the root
+        """
+        key = self._key(dir_path)
+        if key is None:
+            return None
+        with self._lock:
+            return self._totals.get(key, 0)
+
+    def check_write(self, file_path: str, new_size: int) -> Tuple[bool, str]:
+        """
+        Check whether writing new_size bytes to file_path respects all limits.
+
+        Args:
+            file_path: File about to be created or replaced
+            new_size: Size of the new content in bytes
+
+        Returns:
+            (allowed, reason) - reason names the violated limit
+        """
+        if new_size > FILE_SIZE_LIMIT:
+            return False, f"file would be {new_size} bytes (limit {FILE_SIZE_LIMIT})"
+
+        key = self._key(os.path.dirname(os.path.abspath(file_path)))
+        if key is None:
+            return True, ""
+        delta = new_size - _file_size(file_path)
+        with self._lock:
+            dir_total = self._totals.get(key, 0) + delta
+            memory_total = self._totals.get("", 0) + delta
+        if key and dir_total > DIR_SIZE_LIMIT:
+            return False, f"directory {key} would be {dir_total} bytes (limit {DIR_SIZE_LIMIT})"
+        if memory_total > MEMORY_SIZE_LIMIT:
+            return False, f"memory would be {memory_total} bytes (limit {MEMORY_SIZE_LIMIT})"
+        return True, ""
+
+    # ========================================================================
+    # UPDATES
+    # ========================================================================
+
+    def record(self, file_path: str, old_size: int, new_size: int) -> None:
+        """
+        Apply the size change of one file write or delete to its ancestors.
+
+        Args:
+            file_path: File that was written or deleted
+            old_size: Size before the change (0 if it did not exist)
+            new_size: Size after the change (0 if deleted)
+        """
+        key = self._key(os.path.dirname(os.path.abspath(file_path)))
+        delta = new_size - old_size
+        if key is None or delta == 0:
+            return
+        with self._lock:
+            self._version += 1
+            while True:
+                self._totals[key] = max(0, self._totals.get(key, 0) + delta)
+                if not key:
+                    break
+                key = os.path.dirname(key)
+            self._save()
+
+    def reconcile(self) -> bool:
+        """
+        Recompute all totals with a full walk and replace the ledger.
+
+        Returns:
+            True if the result was applied, False if a tool write raced with the walk
+        """
+        with self._lock:
+            started_version = self._version
+        totals = _walk_totals(self.root)
+        with self._lock:
+            if self._version != started_version:
+                return False
+            drift = totals.get("", 0) - self._totals.get("", 0)
+            if self._totals and drift:
+                logger.info(f"Quota ledger for {self.root} corrected by {drift:+d} bytes")
+            self._totals = totals
+            self.reconciled_at = time.time()
+            self._save()
+        return True
+
+    # ========================================================================
+    # PERSISTENCE
+    # ========================================================================
+
+    def _load(self) -> bool:
+        try:
+            # io.open: the sandbox swaps builtins.open for a path-checking
+            # wrapper while agent code runs; the ledger is framework state.
+            with io.open(self.ledger_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get("version") != LEDGER_VERSION or not isinstance(data.get("totals"), dict):
+            return False
+        self._totals = {str(k): int(v) for k, v in data["totals"].items()}
+        self.reconciled_at = float(data.get("reconciled_at", 0.0))
+        return True
+
+    def _save(self) -> None:
+        """Write the ledger atomically. Caller holds the lock."""
+        if not os.path.isdir(self.root):
+            return
+        data = {"version": LEDGER_VERSION, "reconciled_at": self.reconciled_at, "totals": self._totals}
+        tmp = f"{self.ledger_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.ledger_path), exist_ok=True)
+            with io.open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp, self.ledger_path)
+            legacy = os.path.join(self.root, LEGACY_LEDGER_FILENAME)
+            if os.path.exists(legacy):
+                os.remove(legacy)
+        except OSError as e:
+            logger.warning(f"Could not save quota ledger {self.ledger_path}: {e}")
+
+    def _key(self, dir_path: str) -> Optional[str]:
+        """Ledger key for a directory, or None if it is outside the root."""
+        full = os.path.abspath(dir_path or self.root)
+        if full == self.root:
+            return ""
+        if not full.startswith(self.root + os.sep):
+            return None
+        key = os.path.relpath(full, self.root)
+        parts = key.split(os.sep)
+        if parts[0] in UNMETERED_DIRS or any(part.startswith(".") for part in parts):
+            return None
+        return key
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path) if os.path.isfile(path) else 0
+    except OSError:
+        return 0
+
+
+def walk_size(dir_path: str) -> int:
+    """Recursive size of a directory by full walk (for paths outside any ledger root)."""
+    total_size = 0
+    for dirpath, dirnames, filenames in os.walk(dir_path):
+        for filename in filenames:
+            try:
+                total_size += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total_size
+
+
+def _walk_totals(root: str) -> Dict[str, int]:
+    """Recursive byte totals for every metered directory below root."""
+    totals: Dict[str, int] = {}
+    order = []
+    # Top-down so hidden and unmetered directories are pruned before descending
+    for dirpath, dirnames, filenames in os.walk(root):
+        key = "" if dirpath == root else os.path.relpath(dirpath, root)
+        dirnames[:] = [
+            d for d in dirnames
+            if not d.startswith(".") and not (not key and d in UNMETERED_DIRS)
+        ]
+        total = 0
+        for filename in filenames:
+            if filename.startswith("."):
+                continue
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+        totals[key] = total
+        order.append(key)
+    # Children were visited after their parents: add them up in reverse
+    for key in reversed(order):
+        if key:
+            totals[os.path.dirname(key)] += totals[key]
+    return totals
+
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+_ledgers: "OrderedDict[str, QuotaLedger]" = OrderedDict()
+_ledgers_lock = threading.Lock()
+_reconciler: Optional[threading.Thread] = None
+_reconciler_stop = threading.Event()
+
+
+def get_quota(root: Optional[str] = None) -> QuotaLedger:
+    """
+    Return the process-wide ledger for a memory root.
+
+    The default root is the allowed path of the sandboxed code running on
+    this thread, not its working directory (agent code chdirs into
+    subfolders); the working directory is used only outside the sandbox.
+    The first call for a root loads or builds the ledger; the shared
+    background reconciler is started on first use.
+
+    Raises:
+        ValueError: root is outside the allowed path of the running sandbox
+    """
+    allowed = get_allowed_path()
+    root = os.path.abspath(root or allowed or os.getcwd())
+    if allowed and root != allowed and not root.startswith(allowed.rstrip(os.sep) + os.sep):
+        raise ValueError(f"Quota root {root} is outside the allowed path {allowed}")
+    with _ledgers_lock:
+        ledger = _ledgers.get(root)
+        if ledger is None:
+            ledger = QuotaLedger(root)
+            _ledgers[root] = ledger
+            while len(_ledgers) > MAX_LEDGERS:
+                _ledgers.popitem(last=False)
+        _ledgers.move_to_end(root)
+        _start_reconciler()
+        return ledger
+
+
+def stop_reconciler(timeout: float = 5.0) -> None:
+    """Stop the shared background reconciler (ledgers stay usable)."""
+    global _reconciler
+    _reconciler_stop.set()
+    thread, _reconciler = _reconciler, None
+    if thread is not None:
+        thread.join(timeout)
+
+
+def _start_reconciler(interval: float = QUOTA_RECONCILE_INTERVAL) -> None:
+    """Start the shared reconcile thread once (caller holds _ledgers_lock)."""
+    global _reconciler
+    if _reconciler is not None or interval <= 0:
+        return
+    _reconciler_stop.clear()
+    _reconciler = threading.Thread(
+        target=_reconcile_loop, args=(interval,), name="QuotaReconciler", daemon=True
+    )
+    _reconciler.start()
+
+
+def _reconcile_loop(interval: float) -> None:
+    # Wake often enough that each ledger is reconciled about once per interval
+    while not _reconciler_stop.wait(min(interval, 30.0)):
+        with _ledgers_lock:
+            ledgers = list(_ledgers.values())
+        for ledger in ledgers:
+            if time.time() - ledger.reconciled_at < interval or not os.path.isdir(ledger.root):
+                continue
+            try:
+                ledger.reconcile()
+            except OSError as e:
+                logger.warning(f"Quota reconcile of {ledger.root} failed: {e}")
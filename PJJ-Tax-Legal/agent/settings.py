@@ -31,6 +31,12 @@ MEMORY_PATH = "memory_dir"
 FILE_SIZE_LIMIT = 1024 * 1024  # 1MB
 DIR_SIZE_LIMIT = 1024 * 1024 * 10  # 10MB
 MEMORY_SIZE_LIMIT = 1024 * 1024 * 100  # 100MB
+QUOTA_RECONCILE_INTERVAL = float(os.getenv("TAX_QUOTA_RECONCILE_INTERVAL", "300"))  # Seconds; 0 disables (see agent/quota.py)
+
+# read_files tool (per-call byte budgets on what is sent back to the model)
+READ_FILES_MAX_BYTES_PER_FILE = 20_000
+READ_FILES_TOTAL_BUDGET = 100_000
+READ_FILES_WORKERS = 8
 
 # Engine
 SANDBOX_TIMEOUT = 20
@@ -38,3 +44,13 @@ SANDBOX_TIMEOUT = 20
 # Path settings
 SYSTEM_PROMPT_PATH = Path(__file__).resolve().parent / "system_prompt.txt"
 SAVE_CONVERSATION_PATH = Path("output") / "conversations"
+
+# Profiling (opt-in, see agent/profiling.py)
+# TAX_PROFILE: "off" (default), "all" (every session) or "sample" (TAX_PROFILE_SAMPLE_RATE of sessions)
+PROFILE_MODE = os.getenv("TAX_PROFILE", "off").lower()
+PROFILE_SAMPLE_RATE = float(os.getenv("TAX_PROFILE_SAMPLE_RATE", "0.01"))
+PROFILE_GENERATE = os.getenv("TAX_PROFILE_GENERATE", "0") == "1"  # Also profile each BaseAgent.generate
+PROFILE_MEMORY = os.getenv("TAX_PROFILE_MEMORY", "1") == "1"  # tracemalloc allocation sites + peak
+PROFILE_DIR = Path(
+    os.getenv("TAX_PROFILE_DIR", str(Path(__file__).resolve().parent.parent / "streamlit_instance_info" / "profiles"))
+)
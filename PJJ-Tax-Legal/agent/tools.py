@@ -10,13 +10,29 @@ All functions must have:
 - Same return types (code depends on these)
 """
 
+import codecs
+import concurrent.futures
 import os
 
+from agent.engine import get_allowed_path as _get_allowed_path
+from agent.quota import get_quota as _get_quota, walk_size as _walk_size
+from agent.settings import READ_FILES_MAX_BYTES_PER_FILE, READ_FILES_TOTAL_BUDGET, READ_FILES_WORKERS
+from corpus.navigation import (
+    grep_documents as _grep_documents,
+    has_corpus as _has_corpus,
+    read_document_passages as _read_document_passages,
+    search_documents as _search_documents,
+)
+from corpus.tree import get_tree_snapshot as _get_tree_snapshot, note_changed as _note_changed
+
 
 def get_size(file_or_dir_path: str) -> int:
     """
     Get the size of a file or directory in bytes.
 
+    Directory and total sizes come from the quota ledger (agent/quota.py),
+    so they cost O(1) instead of a walk.
+
     Args:
         file_or_dir_path: Path to file/dir, or empty string for total memory size
 
@@ -25,29 +41,14 @@ def get_size(file_or_dir_path: str) -> int:
     """
     if not file_or_dir_path or file_or_dir_path == "":
         # Total memory directory size
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(os.getcwd()):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                try:
-                    total_size += os.path.getsize(filepath)
-                except OSError:
-                    pass
-        return total_size
+        return _get_quota().total()
 
     # Specific file or directory
     if os.path.isfile(file_or_dir_path):
         return os.path.getsize(file_or_dir_path)
     elif os.path.isdir(file_or_dir_path):
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(file_or_dir_path):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                try:
-                    total_size += os.path.getsize(filepath)
-                except OSError:
-                    pass
-        return total_size
+        size = _get_quota().size(file_or_dir_path)
+        return size if size is not None else _walk_size(file_or_dir_path)
     else:
         raise FileNotFoundError(f"Path not found: {file_or_dir_path}")
 
@@ -61,9 +62,16 @@ def create_file(file_path: str, content: str = "") -> bool:
         content: Content to write (default: empty)
 
     Returns:
-        True if successful, False otherwise
+        True if successful, False otherwise (including when a size limit would be exceeded)
     """
     try:
+        quota = _get_quota()
+        new_size = len(content.encode("utf-8"))
+        allowed, _ = quota.check_write(file_path, new_size)
+        if not allowed:
+            return False
+        old_size = os.path.getsize(file_path) if os.path.isfile(file_path) else 0
+
         # Create parent directories
         parent_dir = os.path.dirname(file_path)
         if parent_dir and not os.path.exists(parent_dir):
@@ -72,6 +80,8 @@ def create_file(file_path: str, content: str = "") -> bool:
         # Write file
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(content)
+        quota.record(file_path, old_size, new_size)
+        _note_changed(file_path)
         return True
     except Exception:
         return False
@@ -108,7 +118,8 @@ def update_file(file_path: str, old_content: str, new_content: str) -> bool:
         new_content: Content to replace with
 
     Returns:
-        True if successful, False if old_content not found or other error
+        True if successful, False if old_content not found, a size limit
+        would be exceeded, or other error
     """
     try:
         # Check file exists
@@ -126,9 +137,18 @@ def update_file(file_path: str, old_content: str, new_content: str) -> bool:
         # Replace (first occurrence only)
         updated_content = current_content.replace(old_content, new_content, 1)
 
+        quota = _get_quota()
+        old_size = os.path.getsize(file_path)
+        new_size = len(updated_content.encode("utf-8"))
+        allowed, _ = quota.check_write(file_path, new_size)
+        if not allowed:
+            return False
+
         # Write back
         with open(file_path, "w", encoding="utf-8") as f:
             f.write(updated_content)
+        quota.record(file_path, old_size, new_size)
+        _note_changed(file_path)
 
         return True
     except Exception:
@@ -160,6 +180,65 @@ def read_file(file_path: str) -> str:
         return f"Error: {e}"
 
 
+def read_files(
+    paths: list,
+    max_bytes_per_file: int = READ_FILES_MAX_BYTES_PER_FILE,
+    total_budget: int = READ_FILES_TOTAL_BUDGET,
+) -> list:
+    """
+    Read several files at once (concurrently), keeping only the head of each.
+
+    The budget is handed out in the order of paths: each file gets
+    min(max_bytes_per_file, what is left), and once the budget is used up
+    the remaining files are skipped without being opened.
+
+    Args:
+        paths: File paths to read
+        max_bytes_per_file: Bytes kept from the start of each file
+        total_budget: Bytes returned by the whole call
+
+    Returns:
+        List (same order as paths) of {path, size, content, truncated},
+        plus "skipped": True when the budget ran out or "error" if unreadable
+    """
+    results = []
+    allowances = []
+    remaining = total_budget
+    for path in paths:
+        try:
+            size = os.path.getsize(path)
+        except OSError as e:
+            results.append({"path": path, "size": 0, "content": "", "truncated": False, "error": str(e)})
+            allowances.append(0)
+            continue
+        allowance = min(max_bytes_per_file, remaining, size)
+        results.append({"path": path, "size": size, "content": "", "truncated": allowance < size})
+        if allowance <= 0 and size > 0:
+            results[-1]["skipped"] = True
+        allowances.append(allowance)
+        remaining -= allowance
+
+    jobs = [(i, allowance) for i, allowance in enumerate(allowances) if allowance > 0]
+    if jobs:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(READ_FILES_WORKERS, len(jobs))) as pool:
+            futures = {pool.submit(_read_head, results[i]["path"], allowance): i for i, allowance in jobs}
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i]["content"] = future.result()
+                except Exception as e:
+                    results[i]["error"] = str(e)
+    return results
+
+
+def _read_head(file_path: str, max_bytes: int) -> str:
+    """First max_bytes of a file as text (a multi-byte character cut at the end is dropped)."""
+    with open(file_path, "rb") as f:
+        data = f.read(max_bytes)
+    # final=False holds back an incomplete trailing sequence instead of replacing it
+    return codecs.getincrementaldecoder("utf-8")(errors="replace").decode(data, final=False)
+
+
 def list_files() -> str:
     """
     List files and directories in current working directory.
@@ -169,7 +248,12 @@ def list_files() -> str:
     """
     try:
         cwd = os.getcwd()
-        items = sorted(os.listdir(cwd))
+        root = _memory_root()
+        if cwd == root or cwd.startswith(root + os.sep):
+            # Served from the cached tree snapshot of the memory directory
+            items = _get_tree_snapshot(root).listdir(os.path.relpath(cwd, root))
+        else:
+            items = sorted(os.listdir(cwd))
         # Filter out hidden files and pycache
         items = [item for item in items if not item.startswith(".") and item != "__pycache__"]
         return "\n".join(items) if items else "(empty)"
@@ -188,7 +272,10 @@ def delete_file(file_path: str) -> bool:
         True if successful, False otherwise
     """
     try:
+        old_size = os.path.getsize(file_path)
         os.remove(file_path)
+        _get_quota().record(file_path, old_size, 0)
+        _note_changed(file_path)
         return True
     except Exception:
         return False
@@ -251,3 +338,63 @@ def check_if_dir_exists(dir_path: str) -> bool:
         True if directory exists, False otherwise
     """
     return os.path.isdir(dir_path)
+
+
+def _memory_root() -> str:
+    """Memory directory the running agent code is confined to (else the working directory)."""
+    return _get_allowed_path() or os.getcwd()
+
+
+def search(query: str, category: str = None, k: int = 10) -> list:
+    """
+    Search the knowledge base (tax_database + past_responses) by relevance.
+
+    Args:
+        query: Free-text query (Vietnamese or English, diacritics optional)
+        category: Optional category folder ("02_VAT") or name ("VAT")
+        k: Maximum documents (default 10, max 50)
+
+    Returns:
+        List of {doc_id, path, title, category, score, page, span, snippet},
+        best first; [] if the memory has no knowledge base
+    """
+    root = _memory_root()
+    if not _has_corpus(root):
+        return []
+    return _search_documents(root, query, category=category, k=k)
+
+
+def grep(pattern: str, path_glob: str = "*") -> list:
+    """
+    Find lines matching a regular expression in knowledge base documents.
+
+    Args:
+        pattern: Python regex (prefix with "(?i)" to ignore case)
+        path_glob: Limit to matching paths, e.g. "tax_database/02_VAT/*"
+
+    Returns:
+        Up to 50 matches as {doc_id, path, line, page, span, text};
+        [] if the memory has no knowledge base
+    """
+    root = _memory_root()
+    if not _has_corpus(root):
+        return []
+    return _grep_documents(root, pattern, path_glob)
+
+
+def read_passages(doc_id: int, spans: list = None) -> list:
+    """
+    Read parts of a knowledge base document found with search() or grep().
+
+    Args:
+        doc_id: Document id from a search/grep result
+        spans: List of (start, end) character offsets, e.g. [result["span"]];
+               None reads the start of the document
+
+    Returns:
+        List of {start, end, page, text} (4000 chars per span, 12000 per call)
+    """
+    root = _memory_root()
+    if not _has_corpus(root):
+        return []
+    return _read_document_passages(root, doc_id, spans)
@@ -9,6 +9,7 @@ from agent.settings import (
     MEMORY_SIZE_LIMIT,
     MEMORY_PATH,
 )
+from agent.quota import get_quota, walk_size
 
 
 def load_system_prompt() -> str:
@@ -34,17 +35,19 @@ def check_file_size_limit(file_path: str) -> bool:
 
 def check_dir_size_limit(dir_path: str) -> bool:
     """
-    Check if the directory size limit is respected.
+    Check if the directory size limit is respected (recursive size, from the quota ledger).
     """
-    return os.path.getsize(dir_path) <= DIR_SIZE_LIMIT
+    size = get_quota().size(dir_path)
+    if size is None:
+        size = walk_size(dir_path)
+    return size <= DIR_SIZE_LIMIT
 
 
 def check_memory_size_limit() -> bool:
     """
-    Check if the memory size limit is respected.
+    Check if the memory size limit is respected (total of the memory root, see agent.quota.get_quota).
     """
-    current_working_dir = os.getcwd()
-    return os.path.getsize(current_working_dir) <= MEMORY_SIZE_LIMIT
+    return get_quota().total() <= MEMORY_SIZE_LIMIT
 
 
 def check_size_limits(file_or_dir_path: str) -> bool:
@@ -0,0 +1,108 @@
+"""
+Corpus Module - Tax/Legal knowledge base tooling
+
+Utilities that operate on the tax_legal memory directory as a corpus
+rather than as individual markdown files:
+- SyntheticCorpusGenerator: Produce scaled synthetic corpora (30k / 300k / 1M
+  documents) that mirror the real tax_database shape, for performance testing
+- DocumentCatalog: SQLite catalog of every markdown document (category,
+  subcategory, language, year, format) with incremental filesystem refresh
+- extract_facts: Document number, issuing authority, issue date and "V/v"
+  subject parsed from official letter headers at index time
+- ReferenceGraph: Citation graph between documents (CSR adjacency, PageRank
+  authority scores, O(degree) expansion of hits to cited/citing documents)
+- DuplicateIndex: MinHash/LSH near-duplicate clusters with a canonical
+  document per cluster, used to show each document once in results
+- PassageIndex: Paragraph/page passages with file offsets, indexed for
+  BM25 passage search with highlight spans (SQLite FTS5)
+- QueryCache: Process-wide LRU cache of search results keyed on normalized
+  query terms, categories and the catalog generation
+- CorpusWatcher: inotify/polling watcher that applies file changes to the
+  catalog in batches and queues incremental reindexing
+- TreeSnapshot: Cached directory trie (file counts, sizes, mtimes) answering
+  listings and "folders with .md files" queries without walking the disk
+- publish_document: Atomic write of a new corpus document with write-through
+  catalog and passage indexing (used for approved responses)
+- search_documents / grep_documents / read_document_passages: Index-backed
+  search, regex grep and offset reads behind the agent's search(), grep()
+  and read_passages() tools
+- ClaimAligner: Local claim-to-source alignment (word shingles + inverted
+  index) used to insert "[Source: ...]" citations deterministically
+- KeywordMatcher: Aho-Corasick automaton matching a keyword set in one pass
+  with word-boundary checks (request categorization, query keywords)
+- shingles: Tokenization, shingle hashing and MinHash shared by the above
+- DocumentStore: Single-file pack of every document, each compressed
+  against a trained zstd (or zlib) dictionary, readable by doc_id via mmap
+- build_corpus: Versioned build of every derived artifact (catalog, passage
+  and FTS indexes, dedup clusters, citation ranks, document store, regenerated
+  tax-database-index.json), run at the end of extraction
+
+The memory directory layout is the same one the tax workflow agents use:
+    local-memory/tax_legal/
+      tax_database/<NN_Category>/<subcategory>/*.md
+      past_responses/<NN_Category>/*.md
+      tax-database-index.json
+      .index/                 # derived artifacts (catalog.sqlite, documents.pack, build.json, ...)
+"""
+
+from .alignment import ClaimAligner
+from .catalog import CatalogEntry, DocumentCatalog, get_catalog
+from .dedup import DuplicateIndex, get_duplicate_index
+from .doc_facts import DocumentFacts, extract_facts
+from .keywords import KeywordMatcher, get_keyword_matcher
+from .navigation import grep_documents, read_document_passages, search_documents
+from .passages import PassageHit, PassageIndex, get_passage_index
+from .publish import atomic_write_text, publish_document
+from .query_cache import QueryCache, get_query_cache
+from .reference_graph import ReferenceGraph, get_reference_graph
+from .shingles import MinHasher
+from .store import DocumentStore, get_document_store, read_document
+from .tree import TreeSnapshot, get_tree_snapshot
+from .watcher import CorpusWatcher, start_watcher
+from .synthetic import CorpusShape, SyntheticCorpusGenerator
+
+__all__ = [
+    "ClaimAligner",
+    "CatalogEntry",
+    "DocumentCatalog",
+    "get_catalog",
+    "DuplicateIndex",
+    "get_duplicate_index",
+    "DocumentFacts",
+    "extract_facts",
+    "KeywordMatcher",
+    "get_keyword_matcher",
+    "search_documents",
+    "grep_documents",
+    "read_document_passages",
+    "PassageHit",
+    "PassageIndex",
+    "get_passage_index",
+    "atomic_write_text",
+    "publish_document",
+    "QueryCache",
+    "get_query_cache",
+    "ReferenceGraph",
+    "get_reference_graph",
+    "MinHasher",
+    "DocumentStore",
+    "get_document_store",
+    "read_document",
+    "TreeSnapshot",
+    "get_tree_snapshot",
+    "CorpusWatcher",
+    "start_watcher",
+    "CorpusShape",
+    "SyntheticCorpusGenerator",
+    "build_corpus",
+    "read_build_manifest",
+]
+
+
+def __getattr__(name: str):
+    # corpus.build is imported on first use: importing it here would load it before
+    # `python -m corpus.build` runs it as __main__ (RuntimeWarning, two copies)
+    if name in ("build_corpus", "read_build_manifest"):
+        from . import build
+        return getattr(build, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,273 @@
+"""
+ClaimAligner - Local claim-to-source alignment for citations
+
+Maps the sentences of a drafted response to the source documents that
+support them, so "[Source: filename]" markers can be inserted
+deterministically instead of asking the LLM to rewrite the whole response.
+
+HOW IT WORKS:
+1. Each source is tokenized once (diacritic-folded words) into word-bigram
+   shingles and a unigram set; an inverted index maps every shingle to a
+   bitmask of the sources containing it
+2. Each claim (sentence of a non-header line) is scored per source with
+   set lookups only:
+       0.6 * bigram containment + 0.4 * IDF-weighted unigram containment
+3. Decision per claim:
+   - cited:       best >= CONFIDENT_SCORE and ahead of the runner-up by MIN_MARGIN
+   - ambiguous:   best >= MIN_SCORE but not clearly ahead (caller may ask the LLM)
+   - unsupported: best < MIN_SCORE
+   - skipped:     headers, short fragments, lines that already carry a citation
+4. render_citations() inserts markers at claim ends; consecutive sentences of
+   one line citing the same source get a single marker
+
+Cost is O(total source tokens) once plus O(claim tokens x matching sources)
+per claim, independent of source length.
+"""
+
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from corpus.shingles import shingle_hashes, token_hash, tokenize
+
+# Decision thresholds (scores are 0-1)
+CONFIDENT_SCORE = 0.35
+MIN_SCORE = 0.12
+MIN_MARGIN = 0.08
+
+# Claims shorter than this (in tokens) are not cited
+MIN_CLAIM_TOKENS = 5
+
+BIGRAM_WEIGHT = 0.6
+UNIGRAM_WEIGHT = 0.4
+
+CITATION_MARKER = "[Source: {source}]"
+_EXISTING_CITATION = re.compile(r"\[Source:[^\]]*\]")
+# Sentence boundary inside a line: terminal punctuation followed by an upper-case start
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[\"“(\[]?[A-ZÀ-ỸĐ0-9])")
+_LIST_PREFIX = re.compile(r"^\s*(?:[-*+•]|\d+[.)])\s+")
+
+
+@dataclass
+class Claim:
+    """One citable span of the response."""
+    start: int                 # Offset of the claim in the response
+    end: int                   # Offset just past the claim (citation insert point)
+    text: str
+    status: str = "skipped"    # cited | ambiguous | unsupported | skipped
+    source: Optional[str] = None
+    score: float = 0.0
+    candidates: List[Tuple[str, float]] = field(default_factory=list)
+
+
+class ClaimAligner:
+    """
+    Scores claims against a fixed set of source documents.
+    """
+
+    def __init__(self, sources: Dict[str, str], ngram: int = 2):
+        """
+        Initialize ClaimAligner (tokenizes and indexes every source once)
+
+        Args:
+            sources: {filename: content}
+            ngram: Shingle width in words
+        """
+        self.ngram = ngram
+        self.sources = sources
+        self.filenames: List[str] = list(sources)
+        self._shingle_index: Dict[int, int] = {}   # shingle hash -> source bitmask
+        self._token_index: Dict[int, int] = {}     # token hash -> source bitmask
+
+        for bit, filename in enumerate(self.filenames):
+            tokens = tokenize(sources[filename], min_length=2)
+            mask = 1 << bit
+            for shingle in shingle_hashes(tokens, ngram):
+                self._shingle_index[shingle] = self._shingle_index.get(shingle, 0) | mask
+            for token in set(tokens):
+                h = token_hash(token)
+                self._token_index[h] = self._token_index.get(h, 0) | mask
+
+        source_count = max(len(self.filenames), 1)
+        self._idf: Dict[int, float] = {
+            h: math.log((source_count + 1) / (bin(mask).count("1") + 0.5))
+            for h, mask in self._token_index.items()
+        }
+        self._unseen_idf = math.log((source_count + 1) / 0.5)
+
+    # =========================================================================
+    # SCORING
+    # =========================================================================
+
+    def score(self, text: str) -> List[Tuple[str, float]]:
+        """
+        Score a claim against every source.
+
+        Returns:
+            [(filename, score)] for sources with a non-zero score, best first
+        """
+        tokens = tokenize(text, min_length=2)
+        if not tokens:
+            return []
+
+        shingles = shingle_hashes(tokens, self.ngram)
+        bigram_hits = [0] * len(self.filenames)
+        for shingle in shingles:
+            for bit in _bits(self._shingle_index.get(shingle, 0)):
+                bigram_hits[bit] += 1
+
+        token_hashes = {token_hash(t) for t in tokens}
+        idf_total = sum(self._idf.get(h, self._unseen_idf) for h in token_hashes)
+        unigram_weight = [0.0] * len(self.filenames)
+        for h in token_hashes:
+            for bit in _bits(self._token_index.get(h, 0)):
+                unigram_weight[bit] += self._idf[h]
+
+        scored = []
+        for bit, filename in enumerate(self.filenames):
+            score = (
+                BIGRAM_WEIGHT * bigram_hits[bit] / len(shingles)
+                + UNIGRAM_WEIGHT * (unigram_weight[bit] / idf_total if idf_total else 0.0)
+            )
+            if score > 0:
+                scored.append((filename, round(score, 4)))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored
+
+    def classify(self, claim: Claim) -> Claim:
+        """Score a claim and set its status/source in place."""
+        claim.candidates = self.score(claim.text)[:3]
+        if not claim.candidates:
+            claim.status = "unsupported"
+            return claim
+
+        best_name, best = claim.candidates[0]
+        runner_up = claim.candidates[1][1] if len(claim.candidates) > 1 else 0.0
+        claim.score = best
+        if best < MIN_SCORE:
+            claim.status = "unsupported"
+        elif best >= CONFIDENT_SCORE and best - runner_up >= MIN_MARGIN:
+            claim.status = "cited"
+            claim.source = best_name
+        else:
+            claim.status = "ambiguous"
+        return claim
+
+    def best_source(self, text: str) -> Optional[str]:
+        """Source that clearly supports text, or None."""
+        claim = self.classify(Claim(0, len(text), text))
+        return claim.source
+
+    # =========================================================================
+    # ALIGNMENT
+    # =========================================================================
+
+    def align(self, response: str) -> List[Claim]:
+        """
+        Split a response into claims and classify each one.
+
+        Returns:
+            Claims in response order (including skipped ones)
+        """
+        claims = []
+        for claim in split_claims(response):
+            if claim.status != "skipped":
+                self.classify(claim)
+            claims.append(claim)
+        return claims
+
+    def snippet(self, filename: str, text: str, max_chars: int = 300) -> str:
+        """
+        The passage of a source that best overlaps text (for LLM disambiguation).
+        """
+        content = self.sources.get(filename, "")
+        claim_shingles = shingle_hashes(tokenize(text, min_length=2), self.ngram)
+        best_start, best_hits = 0, -1
+        step = max_chars // 2
+        for start in range(0, max(len(content) - step, 1), step):
+            window = content[start:start + max_chars]
+            hits = len(claim_shingles & shingle_hashes(tokenize(window, min_length=2), self.ngram))
+            if hits > best_hits:
+                best_start, best_hits = start, hits
+        return content[best_start:best_start + max_chars].strip()
+
+
+# ============================================================================
+# CLAIM SPLITTING AND RENDERING
+# ============================================================================
+
+def is_header(line: str) -> bool:
+    """Markdown headers, rules, label lines and short all-caps lines are not claims."""
+    line = line.strip()
+    return (
+        line.startswith("#")
+        or line.startswith("---")
+        or line.startswith("|")
+        or line.endswith(":")
+        or (line.isupper() and len(line) < 30)
+    )
+
+
+def split_claims(response: str) -> List[Claim]:
+    """
+    Split a response into sentence claims with their offsets.
+
+    Lines that are headers, tables or already cited produce "skipped" claims.
+    """
+    claims: List[Claim] = []
+    offset = 0
+    for line in response.splitlines(keepends=True):
+        body = line.rstrip("\r\n")
+        line_start = offset
+        offset += len(line)
+
+        if not body.strip() or is_header(body) or _EXISTING_CITATION.search(body):
+            continue
+
+        prefix = _LIST_PREFIX.match(body)
+        cursor = prefix.end() if prefix else 0
+        for part in _SENTENCE_BOUNDARY.split(body[cursor:]):
+            start = body.index(part, cursor)
+            end = start + len(part.rstrip())
+            cursor = end
+            claim = Claim(line_start + start, line_start + end, part.strip())
+            if len(tokenize(claim.text, min_length=2)) >= MIN_CLAIM_TOKENS:
+                claim.status = "pending"
+            claims.append(claim)
+    return claims
+
+
+def render_citations(response: str, claims: Sequence[Claim]) -> str:
+    """
+    Insert citation markers after cited claims.
+
+    Consecutive cited sentences on the same line that share a source get one
+    marker after the last of them.
+    """
+    cited = [c for c in claims if c.status == "cited" and c.source]
+    inserts: List[Tuple[int, str]] = []
+    for i, claim in enumerate(cited):
+        following = cited[i + 1] if i + 1 < len(cited) else None
+        same_line = following is not None and "\n" not in response[claim.end:following.start]
+        if same_line and following.source == claim.source:
+            continue
+        inserts.append((claim.end, " " + CITATION_MARKER.format(source=claim.source)))
+
+    pieces = []
+    last = 0
+    for position, marker in inserts:
+        pieces.append(response[last:position])
+        pieces.append(marker)
+        last = position
+    pieces.append(response[last:])
+    return "".join(pieces)
+
+
+def _bits(mask: int):
+    bit = 0
+    while mask:
+        if mask & 1:
+            yield bit
+        mask >>= 1
+        bit += 1
@@ -0,0 +1,286 @@
+"""
+Corpus Build - One versioned build of every derived artifact
+
+Extraction writes markdown; everything the tax workflow queries is derived
+from it. build_corpus() is the last stage of the extraction pipeline and
+brings all derived artifacts up to date in one pass, so query-time
+processes only open prebuilt files (SQLite with mmap I/O) instead of parsing
+markdown at startup or per query:
+
+1. Catalog: incremental refresh of the documents table (header facts,
+   facets, number lookups)
+2. Passages: passage store + FTS5 inverted index for every stale document,
+   rows of deleted documents pruned, FTS segments merged ('optimize')
+3. Dedup: MinHash signatures and near-duplicate clusters (doc_clusters)
+4. Citations: citation edges and PageRank authority (doc_rank)
+5. Document store: every document packed into .index/documents.pack,
+   dictionary-compressed per document (corpus/store.py)
+6. tax-database-index.json regenerated from the catalog (same schema the
+   conversion scripts wrote; entries keep their id and conversion_date)
+7. .index/build.json: manifest naming the catalog state (epoch/generation)
+   and the version of every component the artifacts were built with
+
+Every step is incremental, so a rebuild after a small extraction run only
+touches the changed documents. The dedup and citation builds record the
+catalog generation they were built at; get_duplicate_index() and
+get_reference_graph() load those stored results instead of rebuilding
+while the generation is unchanged.
+
+USAGE:
+    manifest = build_corpus(memory_path)
+    python -m corpus.build --memory-path ../local-memory/tax_legal
+    python -m corpus.build --status
+"""
+
+import json
+import os
+import sys
+import time
+import unicodedata
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.catalog import SCHEMA_VERSION, DocumentCatalog, get_catalog
+from corpus.dedup import DEDUP_VERSION, DuplicateIndex
+from corpus.doc_facts import EXTRACTOR_VERSION
+from corpus.passages import PASSAGE_VERSION, get_passage_index
+from corpus.publish import atomic_write_text
+from corpus.reference_graph import CITATION_EXTRACTOR_VERSION, ReferenceGraph
+from corpus.settings import BUILD_FILENAME, DEFAULT_MEMORY_PATH, INDEX_DIRNAME, INDEX_FILENAME
+from corpus.store import STORE_VERSION, build_store
+
+logger = get_logger(__name__)
+
+# Bump when the set of artifacts or the manifest layout changes
+BUILD_VERSION = 2
+
+# tax-database-index.json "version" field (schema shared with corpus/synthetic.py)
+INDEX_SCHEMA_VERSION = "1.0"
+
+
+def build_corpus(
+    memory_path: Path = DEFAULT_MEMORY_PATH,
+    write_index: bool = True,
+    retrain_store: bool = False
+) -> Dict[str, Any]:
+    """
+    Bring every derived artifact up to date and write the build manifest.
+
+    Args:
+        memory_path: Path to PRIMARY DATA directory (/local-memory/tax_legal/)
+        write_index: Regenerate tax-database-index.json from the catalog
+        retrain_store: Train a new document store dictionary (recompresses every document)
+
+    Returns:
+        The manifest written to .index/build.json
+    """
+    start_time = time.time()
+    catalog = get_catalog(Path(memory_path), refresh=False)
+    timings: Dict[str, float] = {}
+
+    def timed(name: str, step):
+        step_start = time.time()
+        result = step()
+        timings[name] = round(time.time() - step_start, 2)
+        return result
+
+    refreshed = timed("catalog", catalog.refresh)
+
+    passages = get_passage_index(catalog.memory_path)
+    pruned = timed("prune", passages.prune)
+    indexed = timed("passages", passages.build)
+    if passages.has_fts:
+        timed("optimize", lambda: _optimize_fts(catalog))
+
+    dedup_stats = timed("dedup", DuplicateIndex(catalog).build)
+    graph_stats = timed("citations", ReferenceGraph(catalog).build)
+    store_stats = timed("store", lambda: build_store(catalog, retrain=retrain_store))
+
+    documents = timed("index_json", lambda: write_document_index(catalog)) if write_index else None
+
+    generation = catalog.generation
+    built_at = datetime.now().isoformat(timespec="seconds")
+    manifest = {
+        "build_version": BUILD_VERSION,
+        "build_id": f"{generation}-{time.strftime('%Y%m%dT%H%M%S')}",
+        "built_at": built_at,
+        "catalog": {
+            "state": catalog.state_marker(generation),
+            "generation": generation,
+            "epoch": catalog.epoch,
+            "schema_version": SCHEMA_VERSION,
+            "facts_version": EXTRACTOR_VERSION,
+            "documents": catalog.count(collection=None),
+            **refreshed,
+        },
+        "passages": {
+            "version": PASSAGE_VERSION,
+            "fts": passages.has_fts,
+            "indexed": indexed,
+            "pruned": pruned,
+        },
+        "dedup": {"version": DEDUP_VERSION, **dedup_stats},
+        "citations": {"version": CITATION_EXTRACTOR_VERSION, **graph_stats},
+        "store": {"version": STORE_VERSION, **store_stats},
+        "index_json": {"written": write_index, "documents": documents},
+        "timings": timings,
+        "seconds": round(time.time() - start_time, 2),
+    }
+    atomic_write_text(
+        catalog.memory_path / INDEX_DIRNAME / BUILD_FILENAME,
+        json.dumps(manifest, indent=2, ensure_ascii=False) + "\n",
+    )
+    logger.info(f"Corpus build {manifest['build_id']} finished in {manifest['seconds']}s")
+    return manifest
+
+
+def read_build_manifest(memory_path: Path = DEFAULT_MEMORY_PATH) -> Optional[Dict[str, Any]]:
+    """The last build manifest (None if the corpus was never built or the file is unreadable)."""
+    manifest_file = Path(memory_path) / INDEX_DIRNAME / BUILD_FILENAME
+    try:
+        with open(manifest_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_build_current(catalog: DocumentCatalog, manifest: Optional[Dict[str, Any]] = None) -> bool:
+    """True if the last build was made from the catalog's current contents with current component versions."""
+    manifest = manifest if manifest is not None else read_build_manifest(catalog.memory_path)
+    if not manifest or manifest.get("build_version") != BUILD_VERSION:
+        return False
+    return (
+        manifest["catalog"].get("state") == catalog.state_marker()
+        and manifest["passages"].get("version") == PASSAGE_VERSION
+        and manifest["dedup"].get("version") == DEDUP_VERSION
+        and manifest["citations"].get("version") == CITATION_EXTRACTOR_VERSION
+        and manifest["store"].get("version") == STORE_VERSION
+    )
+
+
+def write_document_index(catalog: DocumentCatalog) -> int:
+    """
+    Regenerate tax-database-index.json from the catalog (atomic replace).
+    Paths are written NFC and formats in the catalog's form ("pdf", not
+    ".pdf"); the file is left untouched when only conversion_date would change.
+
+    Returns:
+        Number of documents in the index
+    """
+    documents: List[Dict[str, Any]] = []
+    total_bytes = 0
+    by_category: Counter = Counter()
+    by_format: Counter = Counter()
+    by_language: Counter = Counter()
+
+    with catalog.connection() as conn:
+        rows = conn.execute("""
+            SELECT path, collection, filename, name, category, subcategory, language,
+                   original_format, title, size_bytes, mtime_ns
+            FROM documents ORDER BY collection DESC, path
+        """).fetchall()
+
+    for row in rows:
+        previous = catalog._index_lookup(row["path"], row["filename"])
+        path = unicodedata.normalize("NFC", row["path"])
+        if row["collection"] == "tax_database":
+            path = path[len("tax_database/"):]
+        language = row["language"] or "Unknown"
+        documents.append({
+            "id": previous.get("id") or row["name"],
+            "filename": unicodedata.normalize("NFC", row["filename"]),
+            "path": path,
+            "category": row["category"],
+            "subcategory": row["subcategory"],
+            "language": language,
+            "original_format": row["original_format"],
+            "conversion_date": previous.get("conversion_date")
+                or datetime.fromtimestamp(row["mtime_ns"] / 1e9).date().isoformat(),
+            "file_size_kb": round(row["size_bytes"] / 1024, 1),
+            "title": row["title"],
+        })
+        total_bytes += row["size_bytes"]
+        by_category[row["category"]] += 1
+        by_format[row["original_format"]] += 1
+        by_language[language] += 1
+
+    index = {
+        "metadata": {
+            "total_documents": len(documents),
+            "total_size_gb": round(total_bytes / 1024 ** 3, 2),
+            "conversion_date": datetime.now().isoformat(),
+            "version": INDEX_SCHEMA_VERSION,
+            "note": "MemAgent-optimized tax and legal database (regenerated by corpus/build.py)",
+        },
+        "summary": {
+            "by_category": dict(sorted(by_category.items())),
+            "by_format": dict(sorted(by_format.items())),
+            "by_language": dict(sorted(by_language.items())),
+        },
+        "documents": documents,
+    }
+    index_file = catalog.memory_path / INDEX_FILENAME
+    existing = _load_index(index_file)
+    if existing is not None and _without_conversion_date(existing) == _without_conversion_date(index):
+        return len(documents)  # Unchanged: keep the tracked file (and its conversion_date) as is
+    atomic_write_text(index_file, json.dumps(index, indent=2, ensure_ascii=False) + "\n")
+    # The catalog caches the old file's entries; later rows should see the new one
+    catalog._index_entries = None
+    return len(documents)
+
+
+def _load_index(index_file: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(index_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _without_conversion_date(index: Dict[str, Any]) -> Dict[str, Any]:
+    metadata = {key: value for key, value in index.get("metadata", {}).items() if key != "conversion_date"}
+    return {**index, "metadata": metadata}
+
+
+def _optimize_fts(catalog: DocumentCatalog) -> None:
+    """Merge the FTS5 index segments so queries read one b-tree per term."""
+    with catalog.transaction() as conn:
+        conn.execute("INSERT INTO passage_fts(passage_fts) VALUES ('optimize')")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build every derived corpus artifact and write the build manifest")
+    parser.add_argument("--memory-path", default=str(DEFAULT_MEMORY_PATH))
+    parser.add_argument("--no-index-json", action="store_true", help="Leave tax-database-index.json untouched")
+    parser.add_argument("--retrain-store", action="store_true", help="Train a new document store dictionary")
+    parser.add_argument("--status", action="store_true", help="Print the last build manifest and whether it is current")
+    args = parser.parse_args(argv)
+
+    memory_path = Path(args.memory_path)
+    if args.status:
+        manifest = read_build_manifest(memory_path)
+        if manifest is None:
+            print("No build manifest")
+            return 1
+        current = is_build_current(get_catalog(memory_path), manifest)
+        print(json.dumps(manifest, indent=2, ensure_ascii=False))
+        print(f"current: {current}")
+        return 0 if current else 1
+
+    manifest = build_corpus(memory_path, write_index=not args.no_index_json, retrain_store=args.retrain_store)
+    print(json.dumps(manifest, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
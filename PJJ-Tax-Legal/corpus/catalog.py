@@ -0,0 +1,860 @@
+"""
+DocumentCatalog - SQLite catalog of the tax knowledge base
+
+Loads tax-database-index.json into an indexed SQLite database (WAL mode) and
+keeps it in sync with the filesystem, so retrieval code can narrow candidate
+sets with index lookups instead of re-walking category trees per search.
+
+WHAT IT ANSWERS (index lookups, no filesystem access):
+- "All CIT docs in subcategory X, Vietnamese, 2020-2024" -> find(...)
+- Facet counts for the UI (category, subcategory, language, year, format) -> facets(...)
+- Which folders under a category contain markdown files -> directories(...)
+- Which files live in a given folder -> find(folders=[...])
+- Exact lookup by document number ("5580/TCT-KK") -> lookup_number(...)
+- Most recent guidance in a category / on a subject -> latest(...)
+
+HEADER FACTS:
+Document number, issuing authority, issue date and "V/v" subject are parsed
+once per file at index time (corpus/doc_facts.py), so the queries above
+never scan document text.
+
+FRESHNESS:
+- refresh() stats every markdown file and only re-reads files whose size or
+  mtime changed; rows for deleted files are removed
+- refresh_paths() updates specific files (used by write paths that know
+  exactly what they changed)
+- Every refresh that changes a row bumps the catalog "generation" counter,
+  which caches can use as an invalidation key
+
+STORAGE:
+    <memory_path>/.index/catalog.sqlite
+"""
+
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.doc_facts import EXTRACTOR_VERSION, MIN_YEAR, extract_facts, fold_text, make_number_key, parse_number_query
+from corpus.settings import (
+    CATALOG_FILENAME,
+    CATALOG_REFRESH_INTERVAL,
+    COLLECTIONS,
+    DEFAULT_MEMORY_PATH,
+    INDEX_DIRNAME,
+    INDEX_FILENAME,
+)
+
+logger = get_logger(__name__)
+
+# Bump when the documents table layout changes (forces a rebuild).
+# The stored version also includes EXTRACTOR_VERSION so improved header
+# extraction re-indexes every document.
+# 3: rebuilt tables get the 'epoch' meta row (catalogs at 2 predate it)
+# 4: year taken from the parsed issue date before the filename prefix
+SCHEMA_VERSION = 4
+_STORED_VERSION = f"{SCHEMA_VERSION}.{EXTRACTOR_VERSION}"
+
+# Facet columns exposed to the UI
+FACET_COLUMNS = ("category_dir", "subcategory", "language", "year", "original_format")
+
+# "CV_2021_11_23_..." style date prefixes in filenames. Some conversions
+# produced bogus prefixes ("ND_1972_01_32_..."), so month/day are validated
+# and years outside MIN_DOCUMENT_YEAR..next year are ignored. The prefix is
+# only a fallback: the issue date parsed from the header decides the year.
+_FILENAME_DATE = re.compile(r"^[A-Za-z]+_((?:19|20)\d{2})_(0[1-9]|1[0-2])_(0[1-9]|[12]\d|3[01])_")
+MIN_DOCUMENT_YEAR = MIN_YEAR
+_MAX_DOCUMENT_YEAR = time.localtime().tm_year + 1
+_FRONTMATTER_LINE = re.compile(r'^([A-Za-z_]+):\s*"?(.*?)"?\s*$')
+_VIETNAMESE_CHARS = set("ăâđêôơưạảấầẩẫậắằẳẵặẹẻẽếềểễệỉịọỏốồổỗộớờởỡợụủứừửữựỳỵỷỹáàãéèíìóòõúùýĂÂĐÊÔƠƯ")
+
+
+@dataclass
+class CatalogEntry:
+    """One markdown document known to the catalog."""
+    doc_id: int
+    path: str             # Relative to memory_path, "/" separators
+    collection: str       # tax_database | past_responses
+    category_dir: str     # e.g. "02_VAT"
+    folder: str           # Parent directory relative to memory_path
+    filename: str
+    name: str             # Filename without .md (the index "id")
+    category: str
+    subcategory: str
+    language: str
+    original_format: str
+    title: str
+    year: Optional[int]
+    size_bytes: int
+    mtime_ns: int
+    doc_number: str       # e.g. "5580/TCT-KK" ("" if not found)
+    number_key: str       # Normalized lookup key, e.g. "5580/TCT"
+    authority: str        # Issuing body code, e.g. "TCT"
+    doc_type: str         # Normative document type, e.g. "TT"
+    issued_date: str      # ISO date, possibly partial ("2016-12-02", "2016-12", "2016")
+    subject: str          # "V/v ..." subject line
+
+    def absolute_path(self, memory_path: Path) -> Path:
+        return Path(memory_path) / self.path
+
+
+_ENTRY_FIELDS = [f.name for f in fields(CatalogEntry)]
+
+
+class DocumentCatalog:
+    """
+    Indexed SQLite catalog over tax_database/ and past_responses/.
+
+    Thread-safe: one connection guarded by a lock (Streamlit reruns scripts
+    on worker threads); WAL mode keeps other processes' reads non-blocking.
+    """
+
+    def __init__(self, memory_path: Path, db_path: Optional[Path] = None):
+        """
+        Initialize DocumentCatalog
+
+        Args:
+            memory_path: Path to PRIMARY DATA directory (/local-memory/tax_legal/)
+            db_path: SQLite file (default: <memory_path>/.index/catalog.sqlite)
+        """
+        self.memory_path = Path(memory_path)
+        self.db_path = Path(db_path) if db_path else self.memory_path / INDEX_DIRNAME / CATALOG_FILENAME
+        self._lock = threading.RLock()
+        self._index_entries: Optional[Dict[str, dict]] = None
+        self.last_refresh = 0.0
+        self.watched = False  # Set by CorpusWatcher: changes arrive as events, skip stat sweeps
+
+        try:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        except (OSError, sqlite3.OperationalError) as e:
+            # Read-only memory directory: keep the catalog in memory for this process
+            logger.warning(f"Cannot open catalog at {self.db_path} ({e}) - using in-memory catalog")
+            self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.create_function("fold", 1, _fold, deterministic=True)
+        self._configure()
+        self._ensure_schema()
+
+    # =========================================================================
+    # SCHEMA
+    # =========================================================================
+
+    def _configure(self) -> None:
+        with self._lock:
+            try:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.OperationalError:
+                pass  # e.g. :memory: databases
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("PRAGMA mmap_size=268435456")
+            self._conn.execute("PRAGMA temp_store=MEMORY")
+
+    def _ensure_schema(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is not None and row["value"] == _STORED_VERSION:
+                return
+
+            if row is not None:
+                logger.info(f"Catalog schema {row['value']} -> {_STORED_VERSION}: rebuilding")
+            self._conn.execute("DROP TABLE IF EXISTS documents")
+            self._conn.execute("""
+                CREATE TABLE documents (
+                    doc_id INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL UNIQUE,
+                    collection TEXT NOT NULL,
+                    category_dir TEXT NOT NULL,
+                    folder TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    subcategory TEXT NOT NULL,
+                    language TEXT NOT NULL,
+                    original_format TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    year INTEGER,
+                    size_bytes INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    doc_number TEXT NOT NULL,
+                    number_key TEXT NOT NULL,
+                    authority TEXT NOT NULL,
+                    doc_type TEXT NOT NULL,
+                    issued_date TEXT NOT NULL,
+                    subject TEXT NOT NULL
+                )
+            """)
+            self._conn.execute(
+                "CREATE INDEX idx_documents_facets "
+                "ON documents(collection, category_dir, subcategory, language, year)"
+            )
+            self._conn.execute("CREATE INDEX idx_documents_language ON documents(collection, language)")
+            self._conn.execute("CREATE INDEX idx_documents_year ON documents(collection, year)")
+            self._conn.execute("CREATE INDEX idx_documents_folder ON documents(folder)")
+            self._conn.execute("CREATE INDEX idx_documents_name ON documents(name)")
+            self._conn.execute("CREATE INDEX idx_documents_number ON documents(number_key)")
+            self._conn.execute("CREATE INDEX idx_documents_issued ON documents(collection, issued_date)")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (_STORED_VERSION,)
+            )
+            self._conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', '0')")
+            # doc_ids restart when the table is rebuilt; derived tables compare
+            # this epoch to detect that their doc_id references are stale
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('epoch', ?)", (str(time.time_ns()),)
+            )
+
+    # =========================================================================
+    # REFRESH
+    # =========================================================================
+
+    @property
+    def generation(self) -> int:
+        """Counter bumped by every refresh that changed at least one row."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+        return int(row["value"]) if row else 0
+
+    @property
+    def epoch(self) -> str:
+        """Identifier of the current documents table (changes when it is rebuilt)."""
+        return self.get_meta("epoch") or ""
+
+    def state_marker(self, generation: Optional[int] = None) -> str:
+        """"<epoch>/<generation>": identifies the catalog contents a derived index was built from."""
+        return f"{self.epoch}/{self.generation if generation is None else generation}"
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else None
+
+    def set_meta(self, conn: sqlite3.Connection, key: str, value: str) -> None:
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def reset_if_rebuilt(self, marker: str, tables: Sequence[str]) -> bool:
+        """
+        Clear derived tables whose doc_id references predate a catalog rebuild.
+
+        Args:
+            marker: Meta key under which the derived index records the epoch it was built for
+            tables: Derived tables (each with a doc_id column) to clear
+
+        Returns:
+            True if the tables were cleared
+        """
+        epoch = self.epoch
+        if self.get_meta(marker) == epoch:
+            return False
+        with self.transaction() as conn:
+            for table in tables:
+                conn.execute(f"DELETE FROM {table}")
+            self.set_meta(conn, marker, epoch)
+        return True
+
+    def refresh(self) -> Dict[str, int]:
+        """
+        Sync the catalog with the filesystem (stat sweep, re-read only changed files).
+
+        Returns:
+            {"added": n, "updated": n, "removed": n, "unchanged": n}
+        """
+        start_time = time.time()
+        on_disk = dict(self._scan_filesystem())
+
+        with self._lock:
+            known = {
+                row["path"]: (row["size_bytes"], row["mtime_ns"])
+                for row in self._conn.execute("SELECT path, size_bytes, mtime_ns FROM documents")
+            }
+
+        changed = [p for p, sig in on_disk.items() if known.get(p) != sig]
+        removed = [p for p in known if p not in on_disk]
+        added = sum(1 for p in changed if p not in known)
+
+        if changed or removed:
+            self._apply(changed, removed, on_disk)
+
+        self.last_refresh = time.time()
+        stats = {
+            "added": added,
+            "updated": len(changed) - added,
+            "removed": len(removed),
+            "unchanged": len(on_disk) - len(changed),
+        }
+        if changed or removed:
+            logger.info(f"Catalog refreshed in {(time.time() - start_time) * 1000:.1f}ms: {stats}")
+        return stats
+
+    def refresh_paths(self, paths: Iterable[Path]) -> Dict[str, int]:
+        """
+        Update the catalog for specific files (created, modified or deleted).
+
+        Args:
+            paths: Absolute paths or paths relative to memory_path
+
+        Returns:
+            {"updated": n, "removed": n}
+        """
+        present: Dict[str, Tuple[int, int]] = {}
+        removed: List[str] = []
+        for path in paths:
+            rel = self._relative(path)
+            if rel is None or not rel.endswith(".md"):
+                continue
+            try:
+                st = os.stat(self.memory_path / rel)
+                present[rel] = (st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                removed.append(rel)
+
+        # Skip files already cataloged with the same signature (e.g. written through write_paths)
+        with self._lock:
+            for rel in list(present) + removed:
+                row = self._conn.execute(
+                    "SELECT size_bytes, mtime_ns FROM documents WHERE path = ?", (rel,)
+                ).fetchone()
+                if rel in present and row is not None and tuple(row) == present[rel]:
+                    del present[rel]
+                elif rel in removed and row is None:
+                    removed.remove(rel)
+
+        if present or removed:
+            self._apply(list(present), removed, present)
+        return {"updated": len(present), "removed": len(removed)}
+
+    def _apply(self, changed: Sequence[str], removed: Sequence[str], signatures: Dict[str, Tuple[int, int]]) -> None:
+        """Write changed rows and delete removed rows in one transaction."""
+        rows = [self._build_row(path, *signatures[path]) for path in changed]
+        with self._lock, self._conn:
+            self.write_rows(self._conn, rows, removed)
+            self._bump_generation(self._conn)
+
+    def write_paths(self, conn: sqlite3.Connection, paths: Iterable[Path]) -> Dict[str, int]:
+        """
+        Catalog files that are already on disk, on an open transaction.
+
+        Bumps the generation like refresh_paths(), but lets the caller commit
+        the catalog rows together with its own statements (or roll them back).
+
+        Args:
+            conn: Connection from transaction()
+            paths: Absolute paths or paths relative to memory_path
+
+        Returns:
+            {relative path: doc_id}
+        """
+        rows = []
+        for path in paths:
+            rel = self._relative(path)
+            if rel is None or not rel.endswith(".md"):
+                raise ValueError(f"Not a corpus document: {path}")
+            st = os.stat(self.memory_path / rel)
+            rows.append(self._build_row(rel, st.st_size, st.st_mtime_ns))
+        self.write_rows(conn, rows)
+        self._bump_generation(conn)
+        return {
+            row["path"]: conn.execute("SELECT doc_id FROM documents WHERE path = ?", (row["path"],)).fetchone()[0]
+            for row in rows
+        }
+
+    @staticmethod
+    def _bump_generation(conn: sqlite3.Connection) -> None:
+        conn.execute("UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'generation'")
+
+    def write_rows(self, conn: sqlite3.Connection, rows: Sequence[dict], removed: Sequence[str] = ()) -> None:
+        """
+        Upsert document rows and delete removed paths on an open transaction.
+
+        Split out so write paths can combine catalog updates with other
+        statements in the same transaction.
+        """
+        columns = [c for c in _ENTRY_FIELDS if c != "doc_id"]
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != "path")
+        conn.executemany(
+            f"INSERT INTO documents ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT(path) DO UPDATE SET {updates}",
+            [tuple(row[c] for c in columns) for row in rows],
+        )
+        conn.executemany("DELETE FROM documents WHERE path = ?", [(p,) for p in removed])
+
+    def _scan_filesystem(self) -> Iterable[Tuple[str, Tuple[int, int]]]:
+        """Yield (relative path, (size, mtime_ns)) for every markdown file in the collections."""
+        for collection in COLLECTIONS:
+            stack = [self.memory_path / collection]
+            while stack:
+                current = stack.pop()
+                try:
+                    with os.scandir(current) as entries:
+                        for entry in entries:
+                            if entry.name.startswith("."):
+                                continue
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(Path(entry.path))
+                            elif entry.name.endswith(".md"):
+                                st = entry.stat()
+                                rel = os.path.relpath(entry.path, self.memory_path).replace(os.sep, "/")
+                                yield rel, (st.st_size, st.st_mtime_ns)
+                except FileNotFoundError:
+                    continue
+
+    def _relative(self, path: Path) -> Optional[str]:
+        path = Path(path)
+        if path.is_absolute():
+            try:
+                path = path.relative_to(self.memory_path)
+            except ValueError:
+                return None
+        rel = path.as_posix()
+        return rel if rel.split("/", 1)[0] in COLLECTIONS else None
+
+    def _build_row(self, rel: str, size_bytes: int, mtime_ns: int) -> dict:
+        """Assemble catalog metadata for one file (index entry, then frontmatter, then path)."""
+        parts = rel.split("/")
+        collection = parts[0]
+        category_dir = parts[1] if len(parts) > 2 else ""
+        filename = parts[-1]
+        name = filename[:-3]
+
+        head = self._read_head(rel)
+        frontmatter = _parse_frontmatter(head)
+        indexed = self._index_lookup(rel, filename)
+
+        def pick(key: str, default: str) -> str:
+            for source in (indexed, frontmatter):
+                value = str(source.get(key, "") or "").strip()
+                if value and value != "Unknown":
+                    return value
+            return default
+
+        if collection == "tax_database":
+            default_subcategory = parts[2] if len(parts) > 3 else category_dir
+        else:
+            default_subcategory = "Client Response"
+
+        language = pick("language", "")
+        if not language:
+            language = _detect_language(head)
+
+        facts = extract_facts(head, filename)
+        # Same source as latest()/order="recent" (issued_date), so year filters agree with them
+        year = int(facts.issued_date[:4]) if facts.issued_date else None
+        if year is None:
+            year_match = _FILENAME_DATE.match(filename)
+            year = int(year_match.group(1)) if year_match else None
+            if year is not None and not MIN_DOCUMENT_YEAR <= year <= _MAX_DOCUMENT_YEAR:
+                year = None
+        return {
+            "path": rel,
+            "collection": collection,
+            "category_dir": category_dir,
+            "folder": "/".join(parts[:-1]),
+            "filename": filename,
+            "name": name,
+            "category": pick("category", category_dir.split("_", 1)[-1] or "General"),
+            "subcategory": pick("subcategory", default_subcategory),
+            "language": language,
+            "original_format": pick("original_format", "md").lstrip(".").lower(),
+            "title": pick("title", name.replace("_", " ")),
+            "year": year,
+            "size_bytes": size_bytes,
+            "mtime_ns": mtime_ns,
+            **facts.to_dict(),
+        }
+
+    def _read_head(self, rel: str, limit: int = 8192) -> str:
+        try:
+            with open(self.memory_path / rel, "r", encoding="utf-8", errors="replace") as f:
+                return f.read(limit)
+        except OSError:
+            return ""
+
+    def _index_lookup(self, rel: str, filename: str) -> dict:
+        """Find the tax-database-index.json entry for a file (loaded lazily, once)."""
+        if self._index_entries is None:
+            self._index_entries = {}
+            index_file = self.memory_path / INDEX_FILENAME
+            if index_file.exists():
+                try:
+                    with open(index_file, "r", encoding="utf-8") as f:
+                        documents = json.load(f).get("documents", [])
+                except (OSError, ValueError) as e:
+                    logger.warning(f"Could not load {index_file}: {e}")
+                    documents = []
+                for doc in documents:
+                    # The conversion scripts wrote some paths decomposed (NFD); files are named NFC
+                    path = unicodedata.normalize("NFC", doc.get("path", ""))
+                    # tax_database paths are stored relative to tax_database/;
+                    # past responses are stored by filename only
+                    if path.startswith("past_responses/"):
+                        filename_key = unicodedata.normalize("NFC", doc.get("filename", ""))
+                        self._index_entries[f"past_responses:{filename_key}"] = doc
+                    else:
+                        self._index_entries[f"tax_database/{path}"] = doc
+        rel, filename = unicodedata.normalize("NFC", rel), unicodedata.normalize("NFC", filename)
+        return self._index_entries.get(rel) or self._index_entries.get(f"past_responses:{filename}", {})
+
+    # =========================================================================
+    # QUERIES
+    # =========================================================================
+
+    def find(
+        self,
+        collection: Optional[str] = "tax_database",
+        category_dirs: Optional[Sequence[str]] = None,
+        subcategories: Optional[Sequence[str]] = None,
+        languages: Optional[Sequence[str]] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+        folders: Optional[Sequence[str]] = None,
+        limit: Optional[int] = None,
+        order: str = "path"
+    ) -> List[CatalogEntry]:
+        """
+        Return catalog entries matching every given filter.
+
+        Args:
+            collection: "tax_database", "past_responses" or None for both
+            category_dirs: e.g. ["01_CIT", "02_VAT"]
+            subcategories: e.g. ["CIT_Incentives"]
+            languages: e.g. ["Vietnamese"]
+            year_from / year_to: Inclusive year range (documents without a year are excluded)
+            folders: Parent folders relative to memory_path
+            limit: Maximum rows
+            order: "path" or "recent" (newest issue date first, undated last)
+
+        Returns:
+            List of CatalogEntry
+        """
+        where, params = _where(collection, category_dirs, subcategories, languages, year_from, year_to, folders)
+        sql = f"SELECT {', '.join(_ENTRY_FIELDS)} FROM documents{where} ORDER BY {_ORDERS[order]}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [CatalogEntry(*row) for row in rows]
+
+    def facets(
+        self,
+        collection: Optional[str] = "tax_database",
+        category_dirs: Optional[Sequence[str]] = None,
+        subcategories: Optional[Sequence[str]] = None,
+        languages: Optional[Sequence[str]] = None,
+        year_from: Optional[int] = None,
+        year_to: Optional[int] = None,
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Count matching documents per facet value (for UI filters).
+
+        Returns:
+            {"category_dir": {"01_CIT": 1626, ...}, "language": {...}, "year": {...}, ...}
+        """
+        where, params = _where(collection, category_dirs, subcategories, languages, year_from, year_to, None)
+        result: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            for column in FACET_COLUMNS:
+                rows = self._conn.execute(
+                    f"SELECT {column} AS value, COUNT(*) AS n FROM documents{where} "
+                    f"GROUP BY {column} ORDER BY n DESC",
+                    params,
+                ).fetchall()
+                result[column] = {
+                    ("Unknown" if row["value"] is None else str(row["value"])): row["n"] for row in rows
+                }
+        return result
+
+    def count(self, **filters) -> int:
+        where, params = _where(
+            filters.get("collection", "tax_database"), filters.get("category_dirs"),
+            filters.get("subcategories"), filters.get("languages"),
+            filters.get("year_from"), filters.get("year_to"), filters.get("folders"),
+        )
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM documents{where}", params).fetchone()[0]
+
+    def directories(self, collection: str, category_dirs: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        Absolute paths of folders that directly contain markdown files.
+
+        Replaces per-search os.walk() pre-flattening of category trees.
+        """
+        where, params = _where(collection, category_dirs, None, None, None, None, None)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT folder FROM documents{where} ORDER BY folder", params
+            ).fetchall()
+        return [str(self.memory_path / row["folder"]) for row in rows]
+
+    def get(self, path: str) -> Optional[CatalogEntry]:
+        """Look up a document by path relative to memory_path."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_ENTRY_FIELDS)} FROM documents WHERE path = ?", (path,)
+            ).fetchone()
+        return CatalogEntry(*row) if row else None
+
+    def get_by_filename(self, filename: str, collection: Optional[str] = None) -> Optional[CatalogEntry]:
+        """Look up a document by filename (first match by path if the name is not unique)."""
+        name = filename[:-3] if filename.endswith(".md") else filename
+        sql = f"SELECT {', '.join(_ENTRY_FIELDS)} FROM documents WHERE name = ?"
+        params: list = [name]
+        if collection:
+            sql += " AND collection = ?"
+            params.append(collection)
+        with self._lock:
+            row = self._conn.execute(sql + " ORDER BY path LIMIT 1", params).fetchone()
+        return CatalogEntry(*row) if row else None
+
+    def lookup_number(self, query: str, collection: Optional[str] = None) -> List[CatalogEntry]:
+        """
+        Exact lookup by document number.
+
+        Args:
+            query: "5580/TCT-KK", "công văn số 5580/TCT", "219/2013/TT-BTC" or just "5580"
+            collection: Restrict to one collection (default: both)
+
+        Returns:
+            Matching entries, newest first
+        """
+        number, authority = parse_number_query(query)
+        if not number:
+            return []
+        key = make_number_key(number, authority)
+        if authority:
+            clause, params = "number_key = ?", [key]
+        else:
+            # Number only: match any issuing body
+            clause, params = "(number_key = ? OR number_key LIKE ?)", [key, key + "/%"]
+        if collection:
+            clause += " AND collection = ?"
+            params.append(collection)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(_ENTRY_FIELDS)} FROM documents WHERE {clause} ORDER BY {_ORDERS['recent']}",
+                params,
+            ).fetchall()
+        return [CatalogEntry(*row) for row in rows]
+
+    def latest(
+        self,
+        category_dirs: Optional[Sequence[str]] = None,
+        subject_terms: Optional[Sequence[str]] = None,
+        authorities: Optional[Sequence[str]] = None,
+        limit: int = 10,
+        collection: Optional[str] = "tax_database"
+    ) -> List[CatalogEntry]:
+        """
+        Most recently issued documents, optionally narrowed by subject terms.
+
+        Args:
+            category_dirs: e.g. ["02_VAT"]
+            subject_terms: Every term must appear in the "V/v" subject (case- and
+                diacritic-insensitive, since OCR often garbles tone marks)
+            authorities: Issuing body codes, e.g. ["TCT", "BTC"]
+            limit: Maximum rows
+            collection: "tax_database", "past_responses" or None for both
+
+        Returns:
+            Dated entries, newest first
+        """
+        where, params = _where(collection, category_dirs, None, None, None, None, None)
+        clauses = [where[len(" WHERE "):]] if where else []
+        clauses.append("issued_date != ''")
+        for term in subject_terms or []:
+            clauses.append("fold(subject) LIKE ?")
+            params.append(f"%{fold_text(term)}%")
+        if authorities:
+            clauses.append(f"authority IN ({', '.join('?' for _ in authorities)})")
+            params.extend(a.upper() for a in authorities)
+        sql = (
+            f"SELECT {', '.join(_ENTRY_FIELDS)} FROM documents WHERE {' AND '.join(clauses)} "
+            f"ORDER BY {_ORDERS['recent']} LIMIT {int(limit)}"
+        )
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [CatalogEntry(*row) for row in rows]
+
+    def get_by_id(self, doc_id: int) -> Optional[CatalogEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_ENTRY_FIELDS)} FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone()
+        return CatalogEntry(*row) if row else None
+
+    @contextmanager
+    def connection(self):
+        """Yield the catalog connection under the catalog lock (for read queries on derived tables)."""
+        with self._lock:
+            yield self._conn
+
+    @contextmanager
+    def transaction(self):
+        """Yield the catalog connection inside one write transaction."""
+        with self._lock, self._conn:
+            yield self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _fold(value: Optional[str]) -> str:
+    return fold_text(value) if value else ""
+
+
+_ORDERS = {
+    "path": "path",
+    "recent": "issued_date = '', issued_date DESC, path",
+}
+
+def _where(
+    collection: Optional[str],
+    category_dirs: Optional[Sequence[str]],
+    subcategories: Optional[Sequence[str]],
+    languages: Optional[Sequence[str]],
+    year_from: Optional[int],
+    year_to: Optional[int],
+    folders: Optional[Sequence[str]],
+) -> Tuple[str, list]:
+    clauses: List[str] = []
+    params: list = []
+
+    def any_of(column: str, values: Optional[Sequence[str]]) -> None:
+        if values:
+            values = list(values)
+            clauses.append(f"{column} IN ({', '.join('?' for _ in values)})")
+            params.extend(values)
+
+    if collection:
+        clauses.append("collection = ?")
+        params.append(collection)
+    any_of("category_dir", category_dirs)
+    any_of("subcategory", subcategories)
+    any_of("language", languages)
+    any_of("folder", folders)
+    if year_from is not None:
+        clauses.append("year >= ?")
+        params.append(int(year_from))
+    if year_to is not None:
+        clauses.append("year <= ?")
+        params.append(int(year_to))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _parse_frontmatter(head: str) -> Dict[str, str]:
+    """Parse the simple key: "value" frontmatter written by the conversion scripts."""
+    if not head.startswith("---"):
+        return {}
+    end = head.find("\n---", 3)
+    block = head[3:end] if end > 0 else head[3:]
+    values = {}
+    for line in block.splitlines():
+        match = _FRONTMATTER_LINE.match(line.strip())
+        if match:
+            values[match.group(1)] = match.group(2)
+    return values
+
+
+def _detect_language(head: str) -> str:
+    """Classify a document head as Vietnamese, English/Vietnamese, English or Unknown."""
+    end = head.find("\n---", 3) if head.startswith("---") else -1
+    body = head[end + 4:] if end > 0 else head
+    if body.count("(cid:") > 20:
+        return "Unknown"  # Undecodable PDF font glyphs
+    letters = [c for c in body if c.isalpha()]
+    if len(letters) < 40:
+        return "Unknown"
+    vietnamese = sum(1 for c in letters if c.lower() in _VIETNAMESE_CHARS)
+    ratio = vietnamese / len(letters)
+    if ratio > 0.03:
+        return "Vietnamese"
+    if ratio > 0.002:
+        return "English/Vietnamese"
+    return "English"
+
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+_catalogs: Dict[str, DocumentCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(memory_path: Path = DEFAULT_MEMORY_PATH, refresh: bool = True) -> DocumentCatalog:
+    """
+    Return the process-wide catalog for memory_path, refreshing it at most
+    once per CATALOG_REFRESH_INTERVAL seconds (never while a CorpusWatcher
+    keeps it up to date).
+
+    Args:
+        memory_path: Path to PRIMARY DATA directory (/local-memory/tax_legal/)
+        refresh: Run the incremental stat sweep if the interval has elapsed
+
+    Returns:
+        Shared DocumentCatalog instance
+    """
+    key = str(Path(memory_path).resolve())
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = DocumentCatalog(Path(key))
+            _catalogs[key] = catalog
+    if refresh and not catalog.watched and time.time() - catalog.last_refresh > CATALOG_REFRESH_INTERVAL:
+        catalog.refresh()
+    return catalog
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build/refresh the tax document catalog and print facets")
+    parser.add_argument("--memory-path", default=str(DEFAULT_MEMORY_PATH))
+    parser.add_argument("--category", action="append", help="Category directory filter (e.g. 01_CIT)")
+    parser.add_argument("--language", action="append")
+    parser.add_argument("--year-from", type=int)
+    parser.add_argument("--year-to", type=int)
+    parser.add_argument("--number", help="Look up a document number (e.g. 5580/TCT-KK)")
+    args = parser.parse_args(argv)
+
+    catalog = DocumentCatalog(Path(args.memory_path))
+    print(json.dumps(catalog.refresh(), indent=2))
+    if args.number:
+        for entry in catalog.lookup_number(args.number):
+            print(f"{entry.issued_date or '----------'}  {entry.doc_number:<24} {entry.path}")
+        return 0
+    filters = dict(
+        category_dirs=args.category, languages=args.language,
+        year_from=args.year_from, year_to=args.year_to,
+    )
+    start = time.perf_counter()
+    entries = catalog.find(**filters)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    print(f"{len(entries)} documents ({elapsed_us:.0f} us)")
+    print(json.dumps(catalog.facets(**filters), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,406 @@
+"""
+DuplicateIndex - Near-duplicate clustering for the tax knowledge base
+
+The same letter is often filed under several subfolders or converted twice
+("..._Trich.md" / "..._Trich_lap.md"). This module groups near-identical
+documents into clusters with one canonical doc_id so search results and LLM
+contexts can show each document once.
+
+BUILD (index time, incremental):
+1. Each document's body (frontmatter stripped, first MAX_FINGERPRINT_CHARS)
+   is reduced to word 5-gram shingles and a 64-value MinHash signature,
+   stored in doc_signatures; only files whose mtime changed are re-read
+2. LSH banding (16 bands x 4 rows) proposes candidate pairs; pairs whose
+   estimated Jaccard similarity is >= DUPLICATE_THRESHOLD are merged with
+   union-find
+3. Each cluster's canonical member is the tax_database copy with the most
+   content (then shortest path); assignments are stored in doc_clusters
+
+LOAD (query time):
+get_duplicate_index() first tries load(), which reads doc_clusters as left
+by the last build at the current catalog generation (corpus/build.py runs
+that build after extraction), so query processes start without reading or
+fingerprinting any document.
+
+Documents with too little real text (extraction stubs, empty OCR, binary
+.doc dumps, letter-spaced markup) are never clustered, since their boilerplate would make
+unrelated files look alike.
+
+USAGE:
+    index = get_duplicate_index(memory_path)
+    kept, duplicates = index.collapse(results, doc_id_of=lambda r: r["doc_id"])
+"""
+
+import os
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.catalog import DocumentCatalog, get_catalog
+from corpus.settings import DEFAULT_MEMORY_PATH
+from corpus.shingles import MinHasher, shingle_hashes, tokenize
+
+logger = get_logger(__name__)
+
+# Bump when fingerprinting changes (forces re-fingerprinting of every file)
+DEDUP_VERSION = 3
+
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+LSH_BANDS = 16                    # 16 bands x 4 rows: candidate threshold ~0.5
+DUPLICATE_THRESHOLD = 0.8         # Estimated Jaccard to count as near-duplicate
+MIN_SHINGLES = 30                 # Shorter documents are not clustered
+MIN_TEXT_DENSITY = 0.4            # Word characters / body characters (binary .doc dumps are ~0.2)
+MAX_FINGERPRINT_CHARS = 50_000
+
+T = TypeVar("T")
+
+_hasher = MinHasher(num_perm=NUM_PERM, seed=DEDUP_VERSION)
+
+
+def fingerprint(text: str) -> Optional[Tuple[int, ...]]:
+    """
+    MinHash signature of a document body, or None if it is too short to cluster.
+    """
+    if text.startswith("---"):
+        end = text.find("\n---", 3)
+        if end > 0:
+            text = text[end + 4:]
+    body = text[:MAX_FINGERPRINT_CHARS]
+    tokens = tokenize(body, min_length=2)
+    if sum(len(token) for token in tokens) < MIN_TEXT_DENSITY * len(body):
+        return None
+    shingles = shingle_hashes(tokens, SHINGLE_WORDS)
+    if len(shingles) < MIN_SHINGLES:
+        return None
+    return _hasher.signature(shingles)
+
+
+def collapse_texts(texts: Dict[str, str], threshold: float = DUPLICATE_THRESHOLD) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Drop near-duplicate entries from a {name: text} mapping (first occurrence wins).
+
+    For ad-hoc text sets that are not catalog documents (e.g. excerpts
+    selected for an LLM context).
+
+    Returns:
+        (kept {name: text}, duplicates {dropped name: kept name})
+    """
+    kept: Dict[str, str] = {}
+    signatures: List[Tuple[str, Tuple[int, ...]]] = []
+    duplicates: Dict[str, str] = {}
+    for name, text in texts.items():
+        signature = fingerprint(text)
+        if signature is not None:
+            match = next(
+                (other for other, sig in signatures if MinHasher.estimate_jaccard(signature, sig) >= threshold),
+                None,
+            )
+            if match is not None:
+                duplicates[name] = match
+                continue
+            signatures.append((name, signature))
+        kept[name] = text
+    return kept, duplicates
+
+
+class DuplicateIndex:
+    """
+    Near-duplicate clusters over catalog documents.
+    """
+
+    def __init__(self, catalog: DocumentCatalog):
+        """
+        Initialize DuplicateIndex
+
+        Args:
+            catalog: DocumentCatalog whose database stores signatures and clusters
+        """
+        self.catalog = catalog
+        self._lock = threading.RLock()
+        self.generation = -1
+        self._canonical: Dict[int, int] = {}          # doc_id -> canonical doc_id (clustered docs only)
+        self._members: Dict[int, List[int]] = {}      # canonical doc_id -> members (canonical first)
+        self._ensure_schema()
+
+    def _ensure_schema(self) -> None:
+        with self.catalog.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS doc_signatures (
+                    doc_id INTEGER PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    signature BLOB
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS doc_clusters (
+                    doc_id INTEGER PRIMARY KEY,
+                    cluster_id INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_doc_clusters_cluster ON doc_clusters(cluster_id)")
+
+    # =========================================================================
+    # BUILD
+    # =========================================================================
+
+    def build(self) -> Dict[str, int]:
+        """
+        Fingerprint new/changed documents and recompute clusters.
+
+        Returns:
+            {"documents": n, "fingerprinted": n, "clusters": n, "duplicates": n}
+        """
+        start_time = time.time()
+        generation = self.catalog.generation
+        self.catalog.reset_if_rebuilt("dedup_epoch", ("doc_signatures", "doc_clusters"))
+        fingerprinted = self._update_signatures()
+
+        with self.catalog.connection() as conn:
+            rows = conn.execute("""
+                SELECT d.doc_id, d.collection, d.size_bytes, d.path, s.signature
+                FROM documents d JOIN doc_signatures s ON s.doc_id = d.doc_id
+            """).fetchall()
+
+        documents = {row["doc_id"]: row for row in rows}
+        signatures = {
+            row["doc_id"]: array("I", row["signature"]) for row in rows if row["signature"] is not None
+        }
+        clusters = _cluster(signatures)
+
+        canonical: Dict[int, int] = {}
+        members: Dict[int, List[int]] = {}
+        for group in clusters:
+            ordered = sorted(group, key=lambda doc_id: _canonical_rank(documents[doc_id]))
+            members[ordered[0]] = ordered
+            for doc_id in ordered:
+                canonical[doc_id] = ordered[0]
+
+        with self.catalog.transaction() as conn:
+            conn.execute("DELETE FROM doc_clusters")
+            conn.executemany(
+                "INSERT INTO doc_clusters (doc_id, cluster_id) VALUES (?, ?)", list(canonical.items())
+            )
+            self.catalog.set_meta(conn, "dedup_built", self.catalog.state_marker(generation))
+
+        with self._lock:
+            self._canonical = canonical
+            self._members = members
+        self.generation = generation
+
+        stats = {
+            "documents": len(documents),
+            "fingerprinted": fingerprinted,
+            "clusters": len(members),
+            "duplicates": len(canonical) - len(members),
+        }
+        logger.info(f"Duplicate clusters built in {(time.time() - start_time) * 1000:.0f}ms: {stats}")
+        return stats
+
+    def load(self) -> bool:
+        """
+        Load the clusters stored by a build at the current catalog generation.
+
+        Returns:
+            False if no such build exists (call build())
+        """
+        generation = self.catalog.generation
+        if self.catalog.get_meta("dedup_built") != self.catalog.state_marker(generation):
+            return False
+        with self.catalog.connection() as conn:
+            rows = conn.execute("""
+                SELECT c.doc_id, c.cluster_id, d.collection, d.size_bytes, d.path
+                FROM doc_clusters c JOIN documents d ON d.doc_id = c.doc_id
+            """).fetchall()
+
+        groups: Dict[int, List[Any]] = {}
+        for row in rows:
+            groups.setdefault(row["cluster_id"], []).append(row)
+        canonical: Dict[int, int] = {}
+        members: Dict[int, List[int]] = {}
+        for cluster_id, group in groups.items():
+            ordered = [row["doc_id"] for row in sorted(group, key=_canonical_rank)]
+            members[cluster_id] = ordered
+            for doc_id in ordered:
+                canonical[doc_id] = cluster_id
+
+        with self._lock:
+            self._canonical = canonical
+            self._members = members
+        self.generation = generation
+        logger.info(f"Loaded {len(members)} duplicate clusters built at generation {generation}")
+        return True
+
+    def _update_signatures(self) -> int:
+        with self.catalog.connection() as conn:
+            stale = conn.execute("""
+                SELECT d.doc_id, d.path, d.mtime_ns FROM documents d
+                LEFT JOIN doc_signatures s ON s.doc_id = d.doc_id
+                WHERE s.doc_id IS NULL OR s.mtime_ns != d.mtime_ns OR s.version != ?
+            """, (DEDUP_VERSION,)).fetchall()
+
+        batch = []
+        for row in stale:
+            try:
+                with open(self.catalog.memory_path / row["path"], "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read(MAX_FINGERPRINT_CHARS + 4096)
+            except OSError:
+                text = ""
+            signature = fingerprint(text)
+            blob = array("I", signature).tobytes() if signature else None
+            batch.append((row["doc_id"], row["mtime_ns"], DEDUP_VERSION, blob))
+
+        with self.catalog.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO doc_signatures (doc_id, mtime_ns, version, signature) VALUES (?, ?, ?, ?)",
+                batch,
+            )
+            conn.execute("DELETE FROM doc_signatures WHERE doc_id NOT IN (SELECT doc_id FROM documents)")
+        return len(batch)
+
+    # =========================================================================
+    # QUERIES
+    # =========================================================================
+
+    def canonical(self, doc_id: int) -> int:
+        """Canonical doc_id of doc_id's cluster (doc_id itself if not clustered)."""
+        with self._lock:
+            return self._canonical.get(doc_id, doc_id)
+
+    def duplicates(self, doc_id: int) -> List[int]:
+        """Other members of doc_id's cluster."""
+        with self._lock:
+            members = self._members.get(self._canonical.get(doc_id, doc_id), [])
+            return [m for m in members if m != doc_id]
+
+    def collapse(
+        self,
+        items: Sequence[T],
+        doc_id_of: Callable[[T], Optional[int]]
+    ) -> Tuple[List[T], Dict[int, List[T]]]:
+        """
+        Keep the first item of every cluster, preserving order.
+
+        Args:
+            items: Ranked results
+            doc_id_of: Returns an item's doc_id (None = not a catalog document, always kept)
+
+        Returns:
+            (kept items, {index in kept: [dropped duplicate items]})
+        """
+        kept: List[T] = []
+        dropped: Dict[int, List[T]] = {}
+        position_of_cluster: Dict[int, int] = {}
+        for item in items:
+            doc_id = doc_id_of(item)
+            if doc_id is None:
+                kept.append(item)
+                continue
+            cluster = self.canonical(doc_id)
+            if cluster in position_of_cluster:
+                dropped.setdefault(position_of_cluster[cluster], []).append(item)
+                continue
+            position_of_cluster[cluster] = len(kept)
+            kept.append(item)
+        return kept, dropped
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _cluster(signatures: Dict[int, array]) -> List[List[int]]:
+    """LSH candidate generation + verified union-find; returns clusters of size >= 2."""
+    rows = NUM_PERM // LSH_BANDS
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        while parent.get(x, x) != x:
+            parent[x] = parent.get(parent[x], parent[x])
+            x = parent[x]
+        return x
+
+    for band in range(LSH_BANDS):
+        buckets: Dict[Tuple[int, ...], List[int]] = {}
+        lo = band * rows
+        for doc_id, signature in signatures.items():
+            buckets.setdefault(tuple(signature[lo:lo + rows]), []).append(doc_id)
+        for bucket in buckets.values():
+            if len(bucket) < 2:
+                continue
+            anchor = bucket[0]
+            for other in bucket[1:]:
+                if find(anchor) == find(other):
+                    continue
+                if MinHasher.estimate_jaccard(signatures[anchor], signatures[other]) >= DUPLICATE_THRESHOLD:
+                    parent[find(other)] = find(anchor)
+
+    groups: Dict[int, List[int]] = {}
+    for doc_id in parent:
+        groups.setdefault(find(doc_id), []).append(doc_id)
+    for root, group in groups.items():
+        if root not in group:
+            group.append(root)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def _canonical_rank(row: Any) -> Tuple:
+    """Sort key: tax_database first, then most content, then shortest path."""
+    return (row["collection"] != "tax_database", -row["size_bytes"], len(row["path"]), row["path"])
+
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+_indexes: Dict[str, DuplicateIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_duplicate_index(memory_path: Path = DEFAULT_MEMORY_PATH) -> DuplicateIndex:
+    """
+    Return the process-wide duplicate index, reloaded (or rebuilt if no build
+    matches) when the catalog generation changed.
+    """
+    catalog = get_catalog(memory_path)
+    key = str(catalog.memory_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = DuplicateIndex(catalog)
+            _indexes[key] = index
+        if index.generation != catalog.generation and not index.load():
+            index.build()
+    return index
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build near-duplicate clusters and print the largest ones")
+    parser.add_argument("--memory-path", default=str(DEFAULT_MEMORY_PATH))
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    index = get_duplicate_index(Path(args.memory_path))
+    largest = sorted(index._members.values(), key=len, reverse=True)[:args.top]
+    for members in largest:
+        print(f"{len(members)} copies:")
+        for doc_id in members:
+            entry = index.catalog.get_by_id(doc_id)
+            print(f"    {entry.path if entry else doc_id}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""
+Document Facts - Structured header facts from Vietnamese official letters
+
+Parses the header block of công văn / thông tư / nghị định documents:
+
+    Số: 5580/TCT-KK              Hà Nội, ngày 02 tháng 12 năm 2016
+    V/v hoàn thuế GTGT đối với
+    dự án đầu tư
+
+into a DocumentFacts record (document number, issuing authority code, issue
+date, subject). Runs once per document at catalog index time, so exact
+number lookups and "latest guidance" queries become index queries.
+
+OCR TOLERANCE:
+The corpus is largely OCR output ("Số:À394Ù /CTHN-TTHT", "ngày 30tháng10năm
+2013", "kháng 2 năm 2023"). Extraction therefore:
+- Maps common OCR digit confusions (O->0, l/I/|->1, S->5, ...) and rejects
+  numbers that still are not numeric instead of guessing
+- Accepts missing spaces and common misreads of "ngày/tháng/năm"
+- Keeps partial dates ("2023-02" or "2023") when day/month are unreadable
+- Falls back to the filename ("CV_2020_11_19_CV_4950_19112020_TCT_...")
+  for the number, authority and date
+"""
+
+import re
+import unicodedata
+from dataclasses import dataclass, asdict
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+# Bump when extraction rules change (forces catalog re-extraction)
+EXTRACTOR_VERSION = 2
+
+# Only the first part of a document carries the header
+HEADER_CHARS = 6000
+SUBJECT_MAX_CHARS = 240
+MIN_YEAR = 1945
+_MAX_YEAR = date.today().year
+
+# Legal document type codes that precede the issuing body ("49/2013/NĐ-CP",
+# "416/NQ-CP"). "CT" is deliberately absent: in this corpus it is almost
+# always "Cục Thuế" ("68814/CT-TTHT"), not "Chỉ thị".
+DOCUMENT_TYPES = {
+    "NĐ": "Nghị định", "ND": "Nghị định",
+    "TT": "Thông tư", "TTLT": "Thông tư liên tịch",
+    "QĐ": "Quyết định", "QD": "Quyết định",
+    "NQ": "Nghị quyết", "QH": "Luật",
+    "VBHN": "Văn bản hợp nhất", "TB": "Thông báo",
+    "CĐ": "Công điện", "CD": "Công điện", "GM": "Giấy mời",
+}
+
+_UNACCENTED_TYPES = {"ND": "NĐ", "QD": "QĐ", "CD": "CĐ"}
+
+_OCR_DIGITS = str.maketrans({
+    "O": "0", "o": "0", "Q": "0", "D": "0",
+    "I": "1", "l": "1", "|": "1", "i": "1", "]": "1", "!": "1",
+    "Z": "2", "z": "2",
+    "S": "5", "s": "5", "§": "5",
+    "G": "6", "b": "6",
+    "B": "8",
+    "g": "9", "q": "9",
+})
+
+_NUMBER_LINE = re.compile(
+    r"(?:^|\n)[^\n]{0,12}?S[ốôoóỗ6]\s*[:;.!]?\s*"
+    r"(?P<number>[^\s/]{1,8}(?:\s*/\s*(?:19|20)\d{2})?)\s*/\s*"
+    r"(?P<code>[A-ZĐ][A-ZĐa-z0-9&]*(?:\s*-\s*[A-ZĐ][A-ZĐa-z0-9&]*)*)"
+)
+_ENGLISH_NUMBER = re.compile(
+    r"\bNo\.?\s*:?\s*(?P<number>\d{1,6}(?:/(?:19|20)\d{2})?)/(?P<code>[A-Z][A-Z0-9&]*(?:-[A-Z][A-Z0-9&]*)*)"
+)
+_VIETNAMESE_DATE = re.compile(
+    r"ng[àaáả]y\s*(?P<day>\S{1,3}?)?\s*[tk]h[áaà]ng\s*(?P<month>\S{1,3}?)?\s*"
+    r"n[ăaâ]m\s*(?P<year>(?:19|20)\d{2})",
+    re.IGNORECASE,
+)
+_NUMERIC_DATE = re.compile(r"ng[àa]y\s*(?P<day>\d{1,2})/(?P<month>\d{1,2})/(?P<year>(?:19|20)\d{2})", re.IGNORECASE)
+_ENGLISH_DATE = re.compile(
+    r"(?P<month>January|February|March|April|May|June|July|August|September|October|November|December)"
+    r"\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?,?\s+(?P<year>(?:19|20)\d{2})"
+)
+_SUBJECT = re.compile(r"(?:^|\n)[^\n]{0,4}?V/[vV]\s*[:.]?\s*(?P<subject>[^\n]+)")
+# OCR'd "V/v" at the start of a header line: "VA ...", "V/y ...", "Vv ..."
+_SUBJECT_OCR = re.compile(r"(?:^|\n)\s*V\s*(?:/\s*[vVyY]|[AvV])[:.]?\s+(?P<subject>[a-zà-ỹđ][^\n]+)")
+# Lines that end the header block
+_HEADER_END = re.compile(r"\n\s*(?:Kính gửi|Căn cứ|Trả lời|Theo đề nghị)", re.IGNORECASE)
+_SUBJECT_STOP = re.compile(r"^\s*(?:Kính gửi|Căn cứ|Trả lời|---|#|\(|-)", re.IGNORECASE)
+
+_FILENAME_DATE = re.compile(r"^[A-Za-z]+_((?:19|20)\d{2})_(\d{2})_(\d{2})_")
+_FILENAME_NUMBER = re.compile(r"(?:^|_)(?:CV|TT|ND|NQ|QD)_(\d{2,6})(?=_)")
+_FILENAME_AUTHORITY = re.compile(r"\d{6,8}_?(TCT|TCHQ|BTC|CTHN|CTHCM|CTHP|CT)(?=[A-Z_])")
+
+_MONTHS_EN = {
+    name: i for i, name in enumerate(
+        ["January", "February", "March", "April", "May", "June", "July",
+         "August", "September", "October", "November", "December"], start=1)
+}
+
+
+@dataclass
+class DocumentFacts:
+    """Structured facts parsed from a document header (empty string = not found)."""
+    doc_number: str = ""     # Canonical number, e.g. "5580/TCT-KK", "219/2013/TT-BTC"
+    number_key: str = ""     # Lookup key: numeric part + issuing body, e.g. "5580/TCT"
+    authority: str = ""      # Issuing body code, e.g. "TCT", "BTC", "CTHN"
+    doc_type: str = ""       # Document type code for normative documents, e.g. "TT"
+    issued_date: str = ""    # ISO date, possibly partial ("2016-12-02", "2016-12", "2016")
+    subject: str = ""        # "V/v ..." subject line, without the prefix
+
+    def to_dict(self) -> Dict[str, str]:
+        return asdict(self)
+
+
+def extract_facts(text: str, filename: str = "") -> DocumentFacts:
+    """
+    Extract header facts from a document.
+
+    Args:
+        text: Document text (frontmatter allowed; only the head is inspected)
+        filename: Markdown filename, used as a fallback source
+
+    Returns:
+        DocumentFacts (fields that could not be read are empty strings)
+    """
+    head = _strip_frontmatter(text[:HEADER_CHARS + 1024])[:HEADER_CHARS]
+    header_end = _HEADER_END.search(head)
+    header = head[:header_end.start()] if header_end else head[:1500]
+
+    facts = DocumentFacts()
+    number, code = _parse_number(header)
+    if number:
+        facts.doc_number = f"{number}/{code}" if code else number
+        facts.doc_type, facts.authority = split_code(code, has_year="/" in number)
+
+    facts.issued_date = _parse_date(header)
+    facts.subject = _parse_subject(header)
+
+    if filename:
+        _apply_filename_fallbacks(facts, filename)
+    if facts.issued_date and not MIN_YEAR <= int(facts.issued_date[:4]) <= _MAX_YEAR:
+        facts.issued_date = ""  # OCR/filename noise ("2091", "2027")
+    if facts.doc_number:
+        numeric = re.match(r"\d+(?:/(?:19|20)\d{2})?", facts.doc_number).group(0)
+        facts.number_key = make_number_key(numeric, facts.authority)
+    return facts
+
+
+def make_number_key(number: str, authority: str = "") -> str:
+    """
+    Normalize a document number for exact lookup.
+
+    "5580" + "TCT" -> "5580/TCT"; "219/2013" + "BTC" -> "219/2013/BTC".
+    Leading zeros are dropped so "05/2012" matches "5/2012".
+    """
+    parts = [p.lstrip("0") or "0" for p in re.findall(r"\d+", number)]
+    if not parts:
+        return ""
+    key = "/".join(parts)
+    return f"{key}/{authority.upper()}" if authority else key
+
+
+def parse_number_query(query: str) -> Tuple[str, str]:
+    """
+    Parse a user-typed document number ("công văn 5580/TCT-KK", "TT 219/2013/TT-BTC", "5580").
+
+    Returns:
+        (number, authority) - authority may be empty
+    """
+    match = re.search(
+        r"(\d{1,6}(?:/(?:19|20)\d{2})?)(?:\s*/\s*([A-ZĐa-zđ][A-ZĐa-zđ0-9&]*(?:-[A-ZĐa-zđ0-9&]+)*))?",
+        query,
+    )
+    if not match:
+        return "", ""
+    number, code = match.group(1), (match.group(2) or "").upper()
+    _doc_type, authority = split_code(code, has_year="/" in number)
+    return number, authority
+
+
+# ============================================================================
+# FIELD PARSERS
+# ============================================================================
+
+def _parse_number(header: str) -> Tuple[str, str]:
+    for pattern in (_NUMBER_LINE, _ENGLISH_NUMBER):
+        match = pattern.search(header)
+        if not match:
+            continue
+        raw = re.sub(r"\s+", "", match.group("number"))
+        number = "/".join(_clean_digits(part) for part in raw.split("/"))
+        if not re.fullmatch(r"\d{1,6}(?:/(?:19|20)\d{2})?", number):
+            continue  # Unreadable digits: let the filename fallback decide
+        code = re.sub(r"\s+", "", match.group("code")).strip("-")
+        return number.lstrip("0") or "0", code
+    return "", ""
+
+
+def split_code(code: str, has_year: bool) -> Tuple[str, str]:
+    """Split "TT-BTC" into (doc_type, authority); "TCT-KK" into ("", "TCT")."""
+    segments = [s for s in code.split("-") if s]
+    if not segments:
+        return "", ""
+    first = segments[0].upper()
+    if first in DOCUMENT_TYPES and (has_year or len(segments) > 1):
+        return canonical_doc_type(first), (segments[1].upper() if len(segments) > 1 else "")
+    return "", first
+
+
+def canonical_doc_type(code: str) -> str:
+    """Map unaccented type codes to their canonical form ("ND" -> "NĐ")."""
+    code = code.upper()
+    return _UNACCENTED_TYPES.get(code, code)
+
+
+def _parse_date(header: str) -> str:
+    for pattern in (_VIETNAMESE_DATE, _NUMERIC_DATE, _ENGLISH_DATE):
+        match = pattern.search(header)
+        if not match:
+            continue
+        year = int(match.group("year"))
+        month_raw = match.group("month") or ""
+        if month_raw in _MONTHS_EN:
+            month = _MONTHS_EN[month_raw]
+        else:
+            month = _to_int(month_raw)
+        day = _to_int(match.group("day") or "")
+        return _iso_date(year, month, day)
+    return ""
+
+
+def _parse_subject(header: str) -> str:
+    match = _SUBJECT.search(header) or _SUBJECT_OCR.search(header)
+    if not match:
+        return ""
+    subject = [match.group("subject").strip()]
+    # Subjects wrap onto following lines that continue in lower case
+    rest = header[match.end():].lstrip("\n").splitlines()
+    for line in rest[:3]:
+        line = line.strip()
+        if not line or _SUBJECT_STOP.match(line) or not line[0].islower():
+            break
+        subject.append(line)
+    text = re.sub(r"\s+", " ", " ".join(subject)).strip(" .:;")
+    return text[:SUBJECT_MAX_CHARS]
+
+
+def _apply_filename_fallbacks(facts: DocumentFacts, filename: str) -> None:
+    name = filename[:-3] if filename.endswith(".md") else filename
+    if not facts.authority:
+        authority = _FILENAME_AUTHORITY.search(name)
+        if authority:
+            facts.authority = authority.group(1)
+    if not facts.doc_number:
+        # The first CV_<digits> token may be a date prefix ("CV_2020_11_19_...")
+        stripped = _FILENAME_DATE.sub("", name + "_", count=1)
+        number = _FILENAME_NUMBER.search("_" + stripped)
+        if number:
+            facts.doc_number = number.group(1).lstrip("0") or "0"
+
+    date_match = _FILENAME_DATE.match(name)
+    if date_match and len(facts.issued_date) < 10:
+        filename_date = _iso_date(*(int(g) for g in date_match.groups()))
+        # Prefer the filename date unless it contradicts a header year
+        if len(filename_date) == 10 and (
+            not facts.issued_date or facts.issued_date[:4] == filename_date[:4]
+        ):
+            facts.issued_date = filename_date
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def fold_text(text: str) -> str:
+    """Lowercase and strip Vietnamese diacritics ("Hoàn thuế" -> "hoan thue").
+
+    OCR frequently drops or swaps tone marks, so subject matching is done on
+    folded text.
+    """
+    decomposed = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _strip_frontmatter(text: str) -> str:
+    if text.startswith("---"):
+        end = text.find("\n---", 3)
+        if end > 0:
+            return text[end + 4:]
+    return text
+
+
+def _clean_digits(value: str) -> str:
+    return value.translate(_OCR_DIGITS)
+
+
+def _to_int(value: str) -> Optional[int]:
+    cleaned = _clean_digits(value)
+    return int(cleaned) if cleaned.isdigit() else None
+
+
+def _iso_date(year: int, month: Optional[int], day: Optional[int]) -> str:
+    """Return the most precise valid ISO date prefix."""
+    if not month or not 1 <= month <= 12:
+        return f"{year:04d}"
+    if day:
+        try:
+            return date(year, month, day).isoformat()
+        except ValueError:
+            pass
+    return f"{year:04d}-{month:02d}"
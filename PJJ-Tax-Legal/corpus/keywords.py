@@ -0,0 +1,194 @@
+"""
+KeywordMatcher - Aho-Corasick multi-keyword matching
+
+Keyword detection in the workflow used to loop over a keyword list and
+substring-test (or str.count) each keyword, i.e. one pass over the text per
+keyword. A KeywordMatcher compiles a keyword set once into an Aho-Corasick
+automaton and reports every occurrence of every keyword in a single linear
+pass, which keeps matching cheap when it runs over whole documents.
+
+BOUNDARIES:
+Plain substring tests produce false hits ("tp" in "http", "pit" in
+"capital", "cit" in "specific"). Each matcher checks word boundaries on
+its matches:
+- "word":  keyword must start and end at a word boundary (exact words/phrases)
+- "start": keyword must start at a word boundary (prefixes: "profit" matches "profits")
+- None:    plain substring matching (same hits as str.count, but overlaps are counted)
+
+Matching is case-insensitive (keywords and text are lowercased). Word
+characters are letters, digits and "_" (Vietnamese letters included).
+
+USAGE:
+    matcher = get_keyword_matcher(("value added", "vat", "invoice"), boundary="word")
+    matcher.counts("VAT invoice for value added tax")  # {"vat": 1, "invoice": 1, "value added": 1}
+    matcher.found(text)                                # distinct keywords, first-occurrence order
+    matcher.contains_any(document_text)                # stops at the first hit
+"""
+
+import threading
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+BOUNDARIES = ("word", "start", None)
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a fixed keyword set.
+
+    The keyword set is fixed at construction. Transitions resolved through
+    failure links are memoized per state on first use (a lazily built DFA);
+    each cache write stores the same value whichever thread makes it, so one
+    instance can be shared between threads.
+    """
+
+    def __init__(self, keywords: Iterable[str], boundary: Optional[str] = "word"):
+        """
+        Compile the automaton
+
+        Args:
+            keywords: Keywords/phrases (case-insensitive; duplicates and blanks ignored)
+            boundary: "word", "start" or None (see module docstring)
+        """
+        if boundary not in BOUNDARIES:
+            raise ValueError(f"boundary must be one of {BOUNDARIES}, got {boundary!r}")
+        self.boundary = boundary
+        self.keywords: List[str] = []
+        seen = set()
+        for keyword in keywords:
+            keyword = keyword.strip().lower()
+            if keyword and keyword not in seen:
+                seen.add(keyword)
+                self.keywords.append(keyword)
+
+        # State 0 is the root; _goto[state] maps a character to the next state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Tuple[int, ...]] = [()]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                next_state = self._goto[state].get(ch)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][ch] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (index,)
+
+        # Breadth-first: failure links, and outputs inherited along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+        # Memoized DFA transitions: _delta[state][ch] -> next state
+        self._delta: List[Dict[str, int]] = [dict(edges) for edges in self._goto]
+
+    def _resolve(self, state: int, ch: str) -> int:
+        """Follow failure links for a transition not yet in _delta, and memoize it."""
+        fallback = state
+        while fallback and ch not in self._goto[fallback]:
+            fallback = self._fail[fallback]
+        next_state = self._goto[fallback].get(ch, 0)
+        self._delta[state][ch] = next_state
+        return next_state
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    # =========================================================================
+    # MATCHING
+    # =========================================================================
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[str, int, int]]:
+        """
+        Yield (keyword, start, end) for every occurrence, in order of end offset.
+
+        Occurrences of different keywords may overlap ("income" inside
+        "personal income"); both are reported.
+        """
+        if not self.keywords:
+            return
+        text = text.lower()
+        delta, output, keywords = self._delta, self._output, self.keywords
+        check_start = self.boundary is not None
+        check_end = self.boundary == "word"
+        length = len(text)
+        state = 0
+        for position, ch in enumerate(text):
+            next_state = delta[state].get(ch)
+            state = self._resolve(state, ch) if next_state is None else next_state
+            if not output[state]:
+                continue
+            end = position + 1
+            if check_end and end < length and _is_word_char(text[end]):
+                continue
+            for index in output[state]:
+                keyword = keywords[index]
+                start = end - len(keyword)
+                if check_start and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                yield keyword, start, end
+
+    def counts(self, text: str) -> Dict[str, int]:
+        """{keyword: occurrences} for the keywords present in text."""
+        result: Dict[str, int] = {}
+        for keyword, _start, _end in self.iter_matches(text):
+            result[keyword] = result.get(keyword, 0) + 1
+        return result
+
+    def found(self, text: str) -> List[str]:
+        """Distinct keywords present in text, in order of first occurrence (by start offset)."""
+        first: Dict[str, int] = {}
+        for keyword, start, _end in self.iter_matches(text):
+            if keyword not in first or start < first[keyword]:
+                first[keyword] = start
+        return sorted(first, key=first.get)
+
+    def contains_any(self, text: str) -> bool:
+        """True if at least one keyword occurs in text (stops at the first hit)."""
+        for _match in self.iter_matches(text):
+            return True
+        return False
+
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+_matchers: Dict[Tuple[Tuple[str, ...], Optional[str]], KeywordMatcher] = {}
+_matchers_lock = threading.Lock()
+
+
+def get_keyword_matcher(keywords: Iterable[str], boundary: Optional[str] = "word") -> KeywordMatcher:
+    """
+    Return the process-wide matcher for a keyword set, compiled on first use.
+
+    Args:
+        keywords: Keywords/phrases (order does not matter)
+        boundary: "word", "start" or None
+
+    Returns:
+        Shared KeywordMatcher instance
+    """
+    key = (tuple(sorted({k.strip().lower() for k in keywords if k.strip()})), boundary)
+    with _matchers_lock:
+        matcher = _matchers.get(key)
+        if matcher is None:
+            matcher = KeywordMatcher(key[0], boundary)
+            _matchers[key] = matcher
+    return matcher
@@ -0,0 +1,291 @@
+"""
+Navigation - Index-backed search, grep and passage reads for agent tools
+
+agent.tools exposes these to sandboxed agent code as search(), grep() and
+read_passages(), so a memory-navigation question takes one tool call instead
+of chdir-ing through folders and reading every file:
+
+- search_documents: BM25 passage search ranked per document (near-duplicates
+  collapsed), with the best passage as snippet and its file offsets
+- grep_documents: regex search line by line; the passage index narrows the
+  candidate documents to those containing the pattern's longest literal
+- read_document_passages: text of given (start, end) offsets of a document
+
+Results are plain dicts/lists so they print readably in tool results.
+
+USAGE:
+    results = search_documents(memory_path, "hoàn thuế GTGT xuất khẩu", category="02_VAT", k=5)
+    lines = grep_documents(memory_path, r"5580/TCT-\\w+", "tax_database/02_VAT/*")
+    passages = read_document_passages(memory_path, results[0]["doc_id"], [results[0]["span"]])
+"""
+
+import fnmatch
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.catalog import CatalogEntry, get_catalog
+from corpus.dedup import get_duplicate_index
+from corpus.passages import MAX_INDEXED_CHARS, get_passage_index, query_terms
+from corpus.settings import COLLECTIONS
+from corpus.store import read_document
+
+logger = get_logger(__name__)
+
+SNIPPET_CHARS = 400
+MAX_SEARCH_RESULTS = 50
+MAX_GREP_RESULTS = 50
+MAX_GREP_LINE_CHARS = 300
+MAX_READ_CHARS = 4000             # Per span
+MAX_READ_TOTAL_CHARS = 12000      # Per call
+
+_PAGE_MARKER = re.compile(r"^--- PAGE (\d+) ---\s*$", re.MULTILINE)
+# One regex atom (escape with its arguments, character class or single
+# character) and the quantifier applied to it
+_ATOM = re.compile(
+    r"(\\(?:x[0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|U[0-9a-fA-F]{8}|N\{[^}]*\}|0[0-7]{0,2}|[0-7]{3}|\d{1,2}|.)"
+    r"|\[(?:\\.|[^\]])*\]"
+    r"|.)"
+    r"((?:[?*+]|\{[\d,]*\})\??)?",
+    re.DOTALL
+)
+_METACHARACTERS = set(".^$()[]{}|*+?\\")
+
+
+def has_corpus(memory_path: Path) -> bool:
+    """True if memory_path holds at least one corpus collection."""
+    return any((Path(memory_path) / collection).is_dir() for collection in COLLECTIONS)
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+def search_documents(
+    memory_path: Path,
+    query: str,
+    category: Optional[str] = None,
+    k: int = 10
+) -> List[Dict[str, Any]]:
+    """
+    Rank documents for a free-text query.
+
+    Args:
+        memory_path: Path to PRIMARY DATA directory (/local-memory/tax_legal/)
+        query: Free-text query (Vietnamese or English, diacritics optional)
+        category: Category folder ("02_VAT"), its name ("VAT") or catalog category
+        k: Maximum documents
+
+    Returns:
+        [{doc_id, path, title, category, score, page, span, snippet}] best first;
+        span is the (start, end) file offset of the snippet passage
+    """
+    terms = query_terms(query)
+    if not terms:
+        return []
+    k = max(1, min(int(k), MAX_SEARCH_RESULTS))
+    catalog = get_catalog(Path(memory_path))
+    index = get_passage_index(catalog.memory_path)
+
+    entries = _scope(catalog.find(collection=None), category=category)
+    ranked = index.rank_documents(terms, doc_ids=[e.doc_id for e in entries], limit=k * 4)
+    ranked, _ = get_duplicate_index(catalog.memory_path).collapse(ranked, lambda item: item[0])
+
+    results = []
+    for doc_id, score in ranked[:k]:
+        entry = catalog.get_by_id(doc_id)
+        hits = index.best_passages(doc_id, terms, max_chars=SNIPPET_CHARS)
+        best = hits[0] if hits else None
+        results.append({
+            "doc_id": doc_id,
+            "path": entry.path,
+            "title": entry.title,
+            "category": entry.category_dir,
+            "score": round(score, 2),
+            "page": best.page if best else 0,
+            "span": (best.start, best.end) if best else (0, 0),
+            "snippet": " ".join(best.text.split())[:SNIPPET_CHARS] if best else "",
+        })
+    return results
+
+
+# ============================================================================
+# GREP
+# ============================================================================
+
+def grep_documents(
+    memory_path: Path,
+    pattern: str,
+    path_glob: str = "*",
+    max_results: int = MAX_GREP_RESULTS
+) -> List[Dict[str, Any]]:
+    """
+    Regex search over document lines.
+
+    Args:
+        memory_path: Path to PRIMARY DATA directory (/local-memory/tax_legal/)
+        pattern: Python regular expression (use "(?i)" for case-insensitive)
+        path_glob: fnmatch pattern on paths relative to memory_path ("*" matches across "/")
+        max_results: Maximum matching lines
+
+    Returns:
+        [{doc_id, path, line, page, span, text}] in path order; span is the
+        (start, end) file offset of the match
+
+    Raises:
+        re.error: pattern is not a valid regular expression
+    """
+    regex = re.compile(pattern)
+    max_results = max(1, min(int(max_results), MAX_GREP_RESULTS * 4))
+    catalog = get_catalog(Path(memory_path))
+    entries = _scope(catalog.find(collection=None), path_glob=path_glob)
+
+    # Stripped: the index keeps lines without their trailing whitespace
+    literal = required_literal(pattern).strip()
+    if literal:
+        # The passage index (passages + lines outside them) only covers the first
+        # MAX_INDEXED_CHARS of a document; longer documents are always scanned
+        index = get_passage_index(catalog.memory_path)
+        indexed = [e.doc_id for e in entries if e.size_bytes <= MAX_INDEXED_CHARS]
+        candidates = set(index.documents_containing(literal, indexed))
+        entries = [e for e in entries if e.doc_id in candidates or e.size_bytes > MAX_INDEXED_CHARS]
+
+    results: List[Dict[str, Any]] = []
+    for entry in entries:
+        text = read_document(catalog, entry)
+        offset, page = 0, 0
+        for number, line in enumerate(text.splitlines(keepends=True), start=1):
+            marker = _PAGE_MARKER.match(line)
+            if marker:
+                page = int(marker.group(1))
+            match = regex.search(line)
+            if match:
+                results.append({
+                    "doc_id": entry.doc_id,
+                    "path": entry.path,
+                    "line": number,
+                    "page": page,
+                    "span": (offset + match.start(), offset + match.end()),
+                    "text": line.strip()[:MAX_GREP_LINE_CHARS],
+                })
+                if len(results) >= max_results:
+                    return results
+            offset += len(line)
+    return results
+
+
+def required_literal(pattern: str, min_length: int = 3) -> str:
+    """
+    Longest literal text every match of pattern must contain ("" if none is safe to use).
+
+    Conservative: patterns with alternation, groups with options or inline
+    flags, or the verbose flag yield "". Character classes, escapes other than
+    escaped punctuation ("\\x35", "\\d", "\\N{...}", octal, backreferences) and
+    other metacharacters split literals; a character followed by ?, * or
+    {...} is dropped from its literal, one followed by + ends it.
+    """
+    flags = re.match(r"\(\?([aiLmsux]+)\)", pattern)
+    if flags:
+        if "x" in flags.group(1):
+            return ""  # Verbose: whitespace and comments are not literal
+        pattern = pattern[flags.end():]
+    if "|" in pattern or "(?" in pattern or re.search(r"\)[?*{]", pattern):
+        return ""
+
+    literals: List[str] = []
+    current = ""
+    for match in _ATOM.finditer(pattern):
+        atom, quantifier = match.groups()
+        if len(atom) == 1 and atom not in _METACHARACTERS:
+            char = atom
+        elif len(atom) == 2 and atom[0] == "\\" and not (atom[1].isalnum() or atom[1] == "_"):
+            char = atom[1]  # Escaped punctuation is the character itself
+        else:
+            char = None
+        if char is None or (quantifier and quantifier[0] != "+"):
+            literals.append(current)
+            current = ""
+            continue
+        current += char
+        if quantifier:
+            literals.append(current)
+            current = ""
+    literals.append(current)
+    literals = [part for part in literals if len(part.strip()) >= min_length]
+    return max(literals, key=len) if literals else ""
+
+
+# ============================================================================
+# READ
+# ============================================================================
+
+def read_document_passages(
+    memory_path: Path,
+    doc_id: int,
+    spans: Optional[Sequence[Sequence[int]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Read parts of a document by file offset.
+
+    Args:
+        memory_path: Path to PRIMARY DATA directory (/local-memory/tax_legal/)
+        doc_id: Catalog document id (from search/grep results)
+        spans: [(start, end)] character offsets; None = start of the document
+
+    Returns:
+        [{start, end, page, text}] - each span capped at MAX_READ_CHARS and
+        the call at MAX_READ_TOTAL_CHARS; [] if doc_id is unknown
+    """
+    catalog = get_catalog(Path(memory_path))
+    entry = catalog.get_by_id(int(doc_id))
+    if entry is None:
+        return []
+    text = read_document(catalog, entry)
+
+    results = []
+    budget = MAX_READ_TOTAL_CHARS
+    for start, end in spans or [(0, MAX_READ_CHARS)]:
+        start = max(0, int(start))
+        end = min(len(text), int(end), start + MAX_READ_CHARS, start + budget)
+        if end <= start:
+            continue
+        results.append({"start": start, "end": end, "page": _page_at(text, start), "text": text[start:end]})
+        budget -= end - start
+        if budget <= 0:
+            break
+    return results
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _scope(
+    entries: List[CatalogEntry],
+    category: Optional[str] = None,
+    path_glob: Optional[str] = None
+) -> List[CatalogEntry]:
+    """Filter catalog entries by category and/or path glob."""
+    if category:
+        wanted = category.strip().lower()
+        entries = [
+            e for e in entries
+            if wanted in (e.category_dir.lower(), e.category_dir.lower().partition("_")[2], e.category.lower())
+        ]
+    if path_glob and path_glob not in ("*", "**"):
+        entries = [e for e in entries if fnmatch.fnmatch(e.path, path_glob)]
+    return entries
+
+
+def _page_at(text: str, offset: int) -> int:
+    """Page number in effect at offset (0 = no page markers before it)."""
+    markers = list(_PAGE_MARKER.finditer(text, 0, offset))
+    return int(markers[-1].group(1)) if markers else 0
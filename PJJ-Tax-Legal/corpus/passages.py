@@ -0,0 +1,651 @@
+"""
+PassageIndex - Passage-level search over catalog documents
+
+Documents are split once into passages (paragraphs merged/split to a
+target size, never crossing a "--- PAGE N ---" boundary). Each passage keeps
+its character offsets into the file and its page number, and its folded
+text is indexed in an SQLite FTS5 table stored in the catalog database, so a
+query returns the best-scoring passages (BM25) with highlight spans instead
+of re-splitting and re-scanning every file on every request.
+
+INDEXING (lazy, incremental):
+- ensure(doc_ids) indexes only documents that are new, changed (mtime) or
+  were indexed by an older PASSAGE_VERSION; search() calls it for the
+  documents it is restricted to, so callers never pay for the whole corpus
+- build() indexes every catalog document (CLI / warm-up)
+
+Lines that no single passage holds in full (frontmatter, page markers,
+lines a long paragraph was cut inside) are stored per document in
+passage_gaps, so documents_containing() sees every line of the indexed
+text without those lines becoming searchable passages.
+
+If the SQLite build has no FTS5, passages are still stored and search()
+scores the candidate passages in Python with the same BM25 formula.
+
+USAGE:
+    index = get_passage_index(memory_path)
+    hits = index.search(["hoàn thuế", "export"], doc_ids=[12, 40])
+    excerpt, spans = format_excerpt(index.best_passages(doc_id, terms, max_chars=3000))
+"""
+
+import math
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.catalog import DocumentCatalog, get_catalog
+from corpus.doc_facts import fold_text
+from corpus.settings import DEFAULT_MEMORY_PATH
+from corpus.store import read_document
+
+logger = get_logger(__name__)
+
+# Bump when passage splitting changes (forces re-indexing of every document)
+# 2: passage_gaps (lines outside any single passage) written with the passages
+PASSAGE_VERSION = 2
+
+MIN_PASSAGE_CHARS = 200           # Shorter paragraphs are merged with the next one
+MAX_PASSAGE_CHARS = 1200          # Longer paragraphs are split at line boundaries
+MAX_INDEXED_CHARS = 400_000       # Per document
+MAX_RANKED_PASSAGES = 2000        # Passages considered when ranking documents
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_PAGE_MARKER = re.compile(r"^--- PAGE (\d+) ---\s*$")
+_PAGE_BREAK = re.compile(r"^--- PAGE BREAK ---\s*$")
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+# Folded query words that carry no meaning on their own (English + Vietnamese)
+_STOP_WORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "are", "was", "were", "has",
+    "have", "will", "would", "should", "could", "what", "which", "when", "where",
+    "how", "does", "can", "into", "about", "our", "their", "them", "they", "any",
+    "cua", "cac", "nhung", "va", "la", "co", "duoc", "cho", "voi", "trong", "theo",
+    "nay", "khi", "thi", "mot", "nhu", "ve", "tai", "den", "tu", "de", "hoac",
+}
+
+
+@dataclass
+class Passage:
+    """A span of a document."""
+    ordinal: int               # Position within the document
+    start: int                 # Character offset in the file
+    end: int
+    page: int                  # 0 = document has no page markers
+
+
+@dataclass
+class PassageHit:
+    """A passage returned by search, with highlight spans relative to text."""
+    passage_id: int
+    doc_id: int
+    ordinal: int
+    page: int
+    start: int
+    end: int
+    score: float
+    text: str = ""
+    highlights: List[Tuple[int, int]] = field(default_factory=list)
+
+
+# ============================================================================
+# SPLITTING
+# ============================================================================
+
+def split_passages(text: str) -> List[Passage]:
+    """
+    Split a markdown document into passages with file offsets and page numbers.
+
+    Frontmatter is skipped; page markers and page-break lines end a passage
+    and are not part of any passage.
+    """
+    offset = 0
+    if text.startswith("---"):
+        end = text.find("\n---", 3)
+        if end > 0:
+            offset = text.find("\n", end + 4)
+            offset = len(text) if offset < 0 else offset + 1
+
+    passages: List[Passage] = []
+    page = 0
+    block_start: Optional[int] = None
+    block_end = 0
+
+    def close(force: bool) -> None:
+        nonlocal block_start
+        if block_start is None:
+            return
+        if not force and block_end - block_start < MIN_PASSAGE_CHARS:
+            return
+        _append_block(text, block_start, block_end, page, passages)
+        block_start = None
+
+    for line in text[offset:].splitlines(keepends=True):
+        line_start, offset = offset, offset + len(line)
+        stripped = line.strip()
+        marker = _PAGE_MARKER.match(stripped)
+        if marker or _PAGE_BREAK.match(stripped):
+            close(force=True)
+            if marker:
+                page = int(marker.group(1))
+            continue
+        if not stripped:
+            close(force=False)
+            continue
+        if block_start is None:
+            block_start = line_start
+        block_end = line_start + len(line.rstrip())
+    close(force=True)
+    return passages
+
+
+def _append_block(text: str, start: int, end: int, page: int, passages: List[Passage]) -> None:
+    """Append text[start:end] as one or more passages of at most MAX_PASSAGE_CHARS."""
+    while end - start > MAX_PASSAGE_CHARS:
+        cut = text.rfind("\n", start + MIN_PASSAGE_CHARS, start + MAX_PASSAGE_CHARS)
+        if cut < 0:
+            cut = text.rfind(" ", start + MIN_PASSAGE_CHARS, start + MAX_PASSAGE_CHARS)
+        if cut < 0:
+            cut = start + MAX_PASSAGE_CHARS
+        passages.append(Passage(len(passages), start, cut, page))
+        start = cut
+        while start < end and text[start].isspace():
+            start += 1
+    if end > start:
+        passages.append(Passage(len(passages), start, end, page))
+
+
+def uncovered_lines(text: str, passages: Sequence[Passage]) -> List[str]:
+    """
+    Non-blank lines of text that no single passage contains in full.
+
+    That is the frontmatter, page markers and page breaks, and every line a
+    passage boundary falls inside; with the passages, these cover every
+    line, so a line-level substring match is in one or the other.
+    """
+    lines: List[str] = []
+    offset = 0
+    current = 0
+    for line in text.splitlines(keepends=True):
+        start, end = offset, offset + len(line.rstrip())
+        offset += len(line)
+        if end == start:
+            continue
+        while current < len(passages) and passages[current].end < end:
+            current += 1
+        if current == len(passages) or passages[current].start > start:
+            lines.append(line.rstrip())
+    return lines
+
+
+# ============================================================================
+# QUERY TERMS AND HIGHLIGHTING
+# ============================================================================
+
+def query_terms(query: str, min_length: int = 3) -> List[str]:
+    """Folded, de-duplicated content words of a free-text query."""
+    terms: List[str] = []
+    for word in _WORD.findall(fold_text(query)):
+        if len(word) >= min_length and word not in _STOP_WORDS and word not in terms:
+            terms.append(word)
+    return terms
+
+
+def highlight_spans(text: str, terms: Sequence[str]) -> List[Tuple[int, int]]:
+    """
+    (start, end) spans of every term occurrence in text, matched on folded text.
+
+    Multi-word terms match as phrases; matches must start and end on word
+    boundaries.
+    """
+    folded, origin = _fold_with_offsets(text)
+    spans = []
+    for words in {tuple(_WORD.findall(fold_text(t))) for t in terms}:
+        if not words:
+            continue
+        pattern = r"\b" + r"\W+".join(re.escape(w) for w in words) + r"\b"
+        for match in re.finditer(pattern, folded):
+            spans.append((origin[match.start()], origin[match.end() - 1] + 1))
+
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _fold_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """fold_text() plus, for every folded character, its offset in text."""
+    chars: List[str] = []
+    origin: List[int] = []
+    for i, c in enumerate(text):
+        folded = fold_text(c) if ord(c) > 127 else c.lower()
+        chars.append(folded)
+        origin.extend([i] * len(folded))
+    return "".join(chars), origin
+
+
+def _fts_query(terms: Sequence[str]) -> str:
+    phrases = []
+    for term in terms:
+        words = _WORD.findall(fold_text(term))
+        if words:
+            phrases.append('"' + " ".join(words) + '"')
+    return " OR ".join(dict.fromkeys(phrases))
+
+
+# ============================================================================
+# INDEX
+# ============================================================================
+
+class PassageIndex:
+    """
+    Passage store and BM25 passage search over catalog documents.
+    """
+
+    def __init__(self, catalog: DocumentCatalog):
+        """
+        Initialize PassageIndex
+
+        Args:
+            catalog: DocumentCatalog whose database stores the passages
+        """
+        self.catalog = catalog
+        self.generation = -1
+        self.has_fts = True
+        self._ensure_schema()
+
+    def _ensure_schema(self) -> None:
+        with self.catalog.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS passages (
+                    passage_id INTEGER PRIMARY KEY,
+                    doc_id INTEGER NOT NULL,
+                    ordinal INTEGER NOT NULL,
+                    start INTEGER NOT NULL,
+                    end INTEGER NOT NULL,
+                    page INTEGER NOT NULL,
+                    body TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_passages_doc ON passages(doc_id, ordinal)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS passage_gaps (
+                    doc_id INTEGER PRIMARY KEY,
+                    body TEXT NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS passage_state (
+                    doc_id INTEGER PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    version INTEGER NOT NULL
+                )
+            """)
+            try:
+                conn.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS passage_fts USING fts5(
+                        body, content='passages', content_rowid='passage_id', tokenize='unicode61'
+                    )
+                """)
+            except sqlite3.OperationalError as e:
+                logger.warning(f"SQLite FTS5 unavailable ({e}); passage search will score in Python")
+                self.has_fts = False
+
+        tables = ("passages", "passage_gaps", "passage_state")
+        if self.catalog.reset_if_rebuilt("passage_epoch", tables) and self.has_fts:
+            with self.catalog.transaction() as conn:
+                conn.execute("INSERT INTO passage_fts(passage_fts) VALUES ('delete-all')")
+
+    # =========================================================================
+    # INDEXING
+    # =========================================================================
+
+    def build(self) -> int:
+        """Index every stale catalog document; returns the number (re)indexed."""
+        with self.catalog.connection() as conn:
+            doc_ids = [row[0] for row in conn.execute("SELECT doc_id FROM documents")]
+        count = self.ensure(doc_ids)
+        self.generation = self.catalog.generation
+        return count
+
+    def ensure(self, doc_ids: Iterable[int]) -> int:
+        """
+        Index the given documents if they are new, changed or outdated.
+
+        Returns:
+            Number of documents (re)indexed
+        """
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return 0
+        start_time = time.time()
+        stale = []
+        with self.catalog.connection() as conn:
+            for chunk in _chunks(doc_ids, 500):
+                stale += conn.execute(f"""
+                    SELECT d.doc_id, d.path, d.mtime_ns FROM documents d
+                    LEFT JOIN passage_state s ON s.doc_id = d.doc_id
+                    WHERE d.doc_id IN ({','.join('?' * len(chunk))})
+                      AND (s.doc_id IS NULL OR s.mtime_ns != d.mtime_ns OR s.version != ?)
+                """, (*chunk, PASSAGE_VERSION)).fetchall()
+        if not stale:
+            return 0
+
+        documents = []
+        for row in stale:
+            try:
+                with open(self.catalog.memory_path / row["path"], "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read(MAX_INDEXED_CHARS)
+            except OSError:
+                text = ""
+            documents.append((row["doc_id"], row["mtime_ns"], text))
+
+        with self.catalog.transaction() as conn:
+            for doc_id, mtime_ns, text in documents:
+                self.write_document(conn, doc_id, mtime_ns, text)
+        logger.info(f"Indexed passages of {len(documents)} documents in {(time.time() - start_time) * 1000:.0f}ms")
+        return len(documents)
+
+    def write_document(self, conn: sqlite3.Connection, doc_id: int, mtime_ns: int, text: str) -> int:
+        """
+        Replace one document's passages on an open transaction.
+
+        Split out so write paths can index a document in the same transaction
+        that adds it to the catalog.
+
+        Returns:
+            Number of passages written
+        """
+        self._delete_document(conn, doc_id)
+        text = text[:MAX_INDEXED_CHARS]
+        passages = split_passages(text)
+        gaps = uncovered_lines(text, passages)
+        if gaps:
+            conn.execute(
+                "INSERT INTO passage_gaps (doc_id, body) VALUES (?, ?)", (doc_id, fold_text("\n".join(gaps)))
+            )
+        for p in passages:
+            body = fold_text(text[p.start:p.end])
+            cursor = conn.execute(
+                "INSERT INTO passages (doc_id, ordinal, start, end, page, body) VALUES (?, ?, ?, ?, ?, ?)",
+                (doc_id, p.ordinal, p.start, p.end, p.page, body),
+            )
+            if self.has_fts:
+                conn.execute("INSERT INTO passage_fts (rowid, body) VALUES (?, ?)", (cursor.lastrowid, body))
+        conn.execute(
+            "INSERT OR REPLACE INTO passage_state (doc_id, mtime_ns, version) VALUES (?, ?, ?)",
+            (doc_id, mtime_ns, PASSAGE_VERSION),
+        )
+        return len(passages)
+
+    def prune(self) -> int:
+        """Drop passages of documents no longer in the catalog; returns the number of documents."""
+        with self.catalog.transaction() as conn:
+            gone = [row[0] for row in conn.execute(
+                "SELECT doc_id FROM passage_state WHERE doc_id NOT IN (SELECT doc_id FROM documents)"
+            )]
+            for doc_id in gone:
+                self._delete_document(conn, doc_id)
+                conn.execute("DELETE FROM passage_state WHERE doc_id = ?", (doc_id,))
+        return len(gone)
+
+    def _delete_document(self, conn: sqlite3.Connection, doc_id: int) -> None:
+        if self.has_fts:
+            conn.execute("""
+                INSERT INTO passage_fts (passage_fts, rowid, body)
+                SELECT 'delete', passage_id, body FROM passages WHERE doc_id = ?
+            """, (doc_id,))
+        conn.execute("DELETE FROM passages WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM passage_gaps WHERE doc_id = ?", (doc_id,))
+
+    # =========================================================================
+    # SEARCH
+    # =========================================================================
+
+    def search(
+        self,
+        terms: Sequence[str],
+        doc_ids: Optional[Sequence[int]] = None,
+        limit: int = 20,
+        with_text: bool = True
+    ) -> List[PassageHit]:
+        """
+        Best-scoring passages for a set of terms (any term may match).
+
+        Args:
+            terms: Words or phrases (folded before matching)
+            doc_ids: Restrict to these documents (indexed on demand); None = all indexed passages
+            limit: Maximum hits
+            with_text: Load passage text and highlight spans from the files
+
+        Returns:
+            Hits ordered by score (higher is better)
+        """
+        query = _fts_query(terms)
+        if not query:
+            return []
+        if doc_ids is not None:
+            doc_ids = list(doc_ids)
+            if not doc_ids:
+                return []
+            self.ensure(doc_ids)
+
+        scope, params = "", []
+        if doc_ids is not None:
+            scope = f"AND p.doc_id IN ({','.join('?' * len(doc_ids))})"
+            params = list(doc_ids)
+
+        with self.catalog.connection() as conn:
+            if self.has_fts:
+                rows = conn.execute(f"""
+                    SELECT p.passage_id, p.doc_id, p.ordinal, p.page, p.start, p.end, -bm25(passage_fts) AS score
+                    FROM passage_fts JOIN passages p ON p.passage_id = passage_fts.rowid
+                    WHERE passage_fts MATCH ? {scope}
+                    ORDER BY bm25(passage_fts) LIMIT ?
+                """, (query, *params, limit)).fetchall()
+                hits = [PassageHit(*row) for row in rows]
+            else:
+                rows = conn.execute(f"""
+                    SELECT p.passage_id, p.doc_id, p.ordinal, p.page, p.start, p.end, p.body
+                    FROM passages p WHERE 1 = 1 {scope}
+                """, params).fetchall()
+                hits = _score_in_python(rows, terms)[:limit]
+
+        if with_text:
+            self._load_text(hits, terms)
+        return hits
+
+    def rank_documents(
+        self,
+        terms: Sequence[str],
+        doc_ids: Optional[Sequence[int]] = None,
+        limit: int = 20
+    ) -> List[Tuple[int, float]]:
+        """
+        Documents ordered by their best passage score.
+
+        Returns:
+            [(doc_id, score)] for documents with at least one matching passage
+        """
+        best: Dict[int, float] = {}
+        for hit in self.search(terms, doc_ids=doc_ids, limit=MAX_RANKED_PASSAGES, with_text=False):
+            best.setdefault(hit.doc_id, hit.score)
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def best_passages(self, doc_id: int, terms: Sequence[str], max_chars: int = 3000) -> List[PassageHit]:
+        """
+        Highest-scoring passages of one document that fit in max_chars, in document order.
+        """
+        selected: List[PassageHit] = []
+        used = 0
+        for hit in self.search(terms, doc_ids=[doc_id], limit=50, with_text=False):
+            length = hit.end - hit.start
+            if used + length > max_chars and selected:
+                continue
+            selected.append(hit)
+            used += length + 2
+            if used >= max_chars:
+                break
+        selected.sort(key=lambda h: h.ordinal)
+        self._load_text(selected, terms)
+        return selected
+
+    def documents_containing(self, literal: str, doc_ids: Optional[Sequence[int]] = None) -> List[int]:
+        """
+        Documents with a line containing literal (folded substring match, any word position).
+
+        Used as a prefilter for regex grep: passages and passage_gaps together
+        hold every line, so a literal within one line is never missed; only
+        the first MAX_INDEXED_CHARS of each document are covered.
+
+        Args:
+            literal: Text that every match must contain
+            doc_ids: Restrict to these documents (indexed on demand); None = all indexed passages
+        """
+        if doc_ids is not None:
+            doc_ids = list(doc_ids)
+            self.ensure(doc_ids)
+        pattern = "%" + re.sub(r"([\\%_])", r"\\\1", fold_text(literal)) + "%"
+        with self.catalog.connection() as conn:
+            found = {row[0] for row in conn.execute("""
+                SELECT doc_id FROM passages WHERE body LIKE ?1 ESCAPE '\\'
+                UNION SELECT doc_id FROM passage_gaps WHERE body LIKE ?1 ESCAPE '\\'
+            """, (pattern,))}
+        if doc_ids is not None:
+            found.intersection_update(doc_ids)
+        return sorted(found)
+
+    def _load_text(self, hits: List[PassageHit], terms: Sequence[str]) -> None:
+        """Fill hit.text from the document store or files (one read per document) and compute highlights."""
+        texts: Dict[int, str] = {}
+        for hit in hits:
+            if hit.doc_id not in texts:
+                entry = self.catalog.get_by_id(hit.doc_id)
+                texts[hit.doc_id] = read_document(self.catalog, entry, MAX_INDEXED_CHARS) if entry else ""
+            hit.text = texts[hit.doc_id][hit.start:hit.end]
+            hit.highlights = highlight_spans(hit.text, terms)
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def format_excerpt(hits: Sequence[PassageHit]) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    Join passages into one excerpt, labelling page changes.
+
+    Returns:
+        (excerpt, highlight spans shifted to excerpt offsets)
+    """
+    parts = []
+    spans: List[Tuple[int, int]] = []
+    length = 0
+    last_page = None
+    for hit in hits:
+        if hit.page and hit.page != last_page:
+            label = f"[Page {hit.page}]"
+            parts.append(label)
+            length += len(label) + 2
+            last_page = hit.page
+        text = hit.text.rstrip()
+        stripped = text.lstrip()
+        shift = length - (len(text) - len(stripped))
+        spans.extend((start + shift, end + shift) for start, end in hit.highlights if end <= len(text))
+        parts.append(stripped)
+        length += len(stripped) + 2
+    return "\n\n".join(parts), spans
+
+
+def _score_in_python(rows: Sequence[sqlite3.Row], terms: Sequence[str]) -> List[PassageHit]:
+    """BM25 over candidate passages (used only without FTS5)."""
+    phrases = [" ".join(_WORD.findall(fold_text(t))) for t in terms]
+    phrases = [p for p in dict.fromkeys(phrases) if p]
+    if not rows or not phrases:
+        return []
+    lengths = [len(_WORD.findall(row["body"])) for row in rows]
+    average = sum(lengths) / len(lengths) or 1.0
+    frequencies = [
+        [len(re.findall(r"\b" + re.escape(p) + r"\b", row["body"])) for p in phrases] for row in rows
+    ]
+    document_frequency = [sum(1 for f in frequencies if f[i]) for i in range(len(phrases))]
+    idf = [math.log(1 + (len(rows) - n + 0.5) / (n + 0.5)) for n in document_frequency]
+
+    hits = []
+    for row, length, tf in zip(rows, lengths, frequencies):
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average)
+        score = sum(idf[i] * f * (BM25_K1 + 1) / (f + norm) for i, f in enumerate(tf) if f)
+        if score > 0:
+            hits.append(PassageHit(*tuple(row)[:6], score=score))
+    hits.sort(key=lambda h: h.score, reverse=True)
+    return hits
+
+
+def _chunks(items: List[int], size: int) -> Iterable[List[int]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+_indexes: Dict[str, PassageIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_passage_index(memory_path: Path = DEFAULT_MEMORY_PATH) -> PassageIndex:
+    """
+    Return the process-wide passage index for a memory directory.
+
+    Documents are indexed lazily by search()/ensure(), so this is cheap.
+    """
+    catalog = get_catalog(memory_path)
+    key = str(catalog.memory_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = PassageIndex(catalog)
+            _indexes[key] = index
+    return index
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Search document passages (indexes the corpus on first use)")
+    parser.add_argument("query", help="Free-text query")
+    parser.add_argument("--memory-path", default=str(DEFAULT_MEMORY_PATH))
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    index = get_passage_index(Path(args.memory_path))
+    index.build()
+    for hit in index.search(query_terms(args.query), limit=args.limit):
+        entry = index.catalog.get_by_id(hit.doc_id)
+        text = hit.text
+        for start, end in reversed(hit.highlights):
+            text = f"{text[:start]}**{text[start:end]}**{text[end:]}"
+        page = f" p.{hit.page}" if hit.page else ""
+        print(f"{hit.score:6.2f}  {entry.path if entry else hit.doc_id}{page}")
+        print("        " + " ".join(text.split())[:300])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
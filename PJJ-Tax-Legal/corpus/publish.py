@@ -0,0 +1,100 @@
+"""
+Publish - Atomic, write-through additions to the knowledge base
+
+publish_document() puts a new markdown file into a corpus collection and
+makes it searchable in one step. It writes the file atomically (temp file,
+fsync, rename), then adds the catalog row and the passage index entries in a
+single SQLite transaction. If indexing fails, the file change is undone.
+
+Because the catalog generation is bumped in that transaction, query caches
+and the duplicate/citation indexes see the new document on their next use.
+A running CorpusWatcher sees the rename too, but refresh_paths() skips files
+whose catalog signature is already current, so nothing is indexed twice.
+
+USAGE:
+    entry = publish_document(memory_path, "past_responses/02_VAT/Title-ab12cd34.md", markdown)
+"""
+
+import os
+import sys
+from pathlib import Path
+from typing import Union
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.catalog import CatalogEntry, get_catalog
+from corpus.passages import get_passage_index
+
+logger = get_logger(__name__)
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    """
+    Write text to path atomically (readers see the old file or the new one, never a partial one).
+
+    The temp file is hidden (dot-prefixed) so watchers and catalog sweeps ignore it.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.parent / f".{path.name}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+def publish_document(memory_path: Union[str, Path], rel_path: str, text: str) -> CatalogEntry:
+    """
+    Atomically write a markdown document into the corpus and index it write-through.
+
+    Args:
+        memory_path: Path to PRIMARY DATA directory (/local-memory/tax_legal/)
+        rel_path: Target path relative to memory_path (must be inside a collection, .md)
+        text: Full markdown including frontmatter
+
+    Returns:
+        The document's catalog entry
+
+    Raises:
+        ValueError: rel_path is not a corpus document path
+        OSError / sqlite3.Error: write or indexing failed (the previous file, if any, is restored)
+    """
+    catalog = get_catalog(Path(memory_path), refresh=False)
+    passages = get_passage_index(catalog.memory_path)
+    target = catalog.memory_path / rel_path
+    if catalog.memory_path.resolve() not in target.resolve().parents:
+        raise ValueError(f"Not a corpus document: {rel_path}")
+
+    backup = target.parent / f".{target.name}.bak"
+    had_previous = target.exists()
+    if had_previous:
+        os.replace(target, backup)
+
+    try:
+        atomic_write_text(target, text)
+        with catalog.transaction() as conn:
+            doc_ids = catalog.write_paths(conn, [rel_path])
+            doc_id = next(iter(doc_ids.values()))
+            passages.write_document(conn, doc_id, os.stat(target).st_mtime_ns, text)
+    except Exception:
+        # Undo the file change so disk and catalog stay consistent
+        if had_previous:
+            os.replace(backup, target)
+        elif target.exists():
+            target.unlink()
+        raise
+
+    if had_previous:
+        backup.unlink()
+    entry = catalog.get_by_id(doc_id)
+    logger.info(f"Published {rel_path} (doc_id {doc_id}, generation {catalog.generation})")
+    return entry
@@ -0,0 +1,158 @@
+"""
+QueryCache - Process-wide LRU cache for search results
+
+Step 2 (past responses) and Step 4 (tax database) searches are expensive
+and users often repeat or slightly reword the same request; Streamlit reruns
+also re-trigger them. Results are cached under:
+
+    (memory path, namespace, normalized search keywords, category set, corpus generation)
+
+- memory path: the corpus root, so two corpora open in one process (e.g. a
+  synthetic test corpus next to the real one) never share entries even when
+  their catalogs reach the same generation
+- normalized keywords: the keywords the search actually runs with (the
+  caller extracts them), folded, de-duplicated and sorted, so case, accents
+  and word order do not change the key. Keying on the keywords rather than
+  a generic tokenization of the request matters: "0%" and "5%" are
+  keywords, and two requests that differ only in the rate must not share
+  results
+- category set: order-insensitive
+- corpus generation: DocumentCatalog.generation, bumped by any refresh that
+  changed a document, so a corpus change makes every older entry of that
+  corpus unreachable (stale entries are dropped on the next put for that
+  corpus, and age out via LRU anyway)
+
+Only non-empty results should be cached: an empty result may come from a
+transient failure, and retrying it is cheap compared with pinning it.
+
+USAGE:
+    cache = get_query_cache()
+    key = cache.make_key(catalog.memory_path, "past_responses", keywords, categories, catalog.generation)
+    result = cache.get(key)
+    if result is None:
+        result = expensive_search()
+        if result:
+            cache.put(key, result)
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Sequence, Tuple, Union
+
+from corpus.doc_facts import fold_text
+from corpus.settings import QUERY_CACHE_MAX_ENTRIES
+
+CacheKey = Tuple[str, str, Tuple[str, ...], Tuple[str, ...], int]
+
+
+class QueryCache:
+    """
+    Size-bounded, thread-safe LRU cache with hit/miss metrics.
+
+    Values are deep-copied on put and get, so callers may mutate what they
+    receive without corrupting the cache.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES):
+        """
+        Initialize QueryCache
+
+        Args:
+            max_entries: Entries kept before least-recently-used eviction
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generations: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(
+        memory_path: Union[str, Path],
+        namespace: str,
+        keywords: Sequence[str],
+        categories: Optional[Sequence[str]],
+        generation: int
+    ) -> CacheKey:
+        """Build a cache key from the search keywords of a request against the corpus at memory_path."""
+        return (
+            str(Path(memory_path).resolve()),
+            namespace,
+            tuple(sorted({fold_text(keyword).strip() for keyword in keywords} - {""})),
+            tuple(sorted(set(categories or []))),
+            generation,
+        )
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        """Cached value for key, or None."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            value = self._entries[key]
+        return copy.deepcopy(value)
+
+    def put(self, key: CacheKey, value: Any) -> None:
+        """Store a value, evicting least-recently-used entries beyond max_entries."""
+        value = copy.deepcopy(value)
+        with self._lock:
+            corpus, generation = key[0], key[-1]
+            known = self._generations.get(corpus)
+            if known is None or generation > known:
+                if known is not None:
+                    self._drop_older_than(corpus, generation)
+                self._generations[corpus] = generation
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss metrics."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _drop_older_than(self, corpus: str, generation: int) -> None:
+        stale = [key for key in self._entries if key[0] == corpus and key[-1] < generation]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_cache: Optional[QueryCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_query_cache() -> QueryCache:
+    """Return the process-wide query cache (shared by all sessions)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = QueryCache()
+        return _cache
@@ -0,0 +1,529 @@
+"""
+ReferenceGraph - Cross-reference graph between tax documents
+
+Official letters cite other letters, decrees and circulars ("công văn số
+3054/CT-THNVDT", "Thông tư 219/2013/TT-BTC", "Nghị định 218"). This module
+resolves those citations to catalog doc_ids, keeps the adjacency in compact
+CSR arrays and precomputes a PageRank authority score per document.
+
+BUILD (index time, incremental):
+1. Citations are extracted once per file and stored as raw reference keys
+   in the catalog database (table doc_citations); only files whose mtime
+   changed since the last build are re-read
+2. Raw keys are resolved against the catalog's number_key / doc_type columns
+   (cheap, redone on every build so new documents pick up old citations)
+3. Out- and in-adjacency are packed into CSR arrays (array('I') offsets +
+   targets); PageRank is computed by power iteration and persisted to
+   doc_rank so SQL queries can order by authority
+
+LOAD (query time):
+get_reference_graph() first tries load(), which takes the ranks stored in
+doc_rank by the last build at the current catalog generation and only
+re-packs the adjacency from doc_citations - no document is read and
+PageRank is not recomputed.
+
+QUERIES (in memory, no file access):
+- cites(doc_id) / cited_by(doc_id): O(degree) slices of the CSR arrays
+- expand(doc_ids): hits plus their cited and citing documents, by authority
+- authority(doc_id): PageRank scaled so the corpus average is 1.0
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.catalog import DocumentCatalog, get_catalog
+from corpus.doc_facts import canonical_doc_type, make_number_key, split_code
+from corpus.settings import DEFAULT_MEMORY_PATH
+
+logger = get_logger(__name__)
+
+# Bump when citation patterns change (forces re-extraction of every file)
+CITATION_EXTRACTOR_VERSION = 1
+
+# Only the first part of very large documents is scanned for citations
+MAX_SCAN_CHARS = 200_000
+
+# A citation that resolves to more documents than this is too ambiguous
+# ("Thông tư 01") to be a useful edge
+MAX_TARGETS_PER_CITATION = 8
+
+PAGERANK_DAMPING = 0.85
+PAGERANK_MAX_ITERATIONS = 100
+PAGERANK_TOLERANCE = 1e-9
+
+# "công văn số 3054/CT-THNVDT", "văn bản số 10356/BTC-CST", "CV 2562/TCT-CS"
+# (Patterns spell out case variants instead of re.IGNORECASE, which is several
+# times slower on this mostly-Vietnamese text.)
+_LETTER_REF = re.compile(
+    r"(?:[Cc][ôo]ng\s*v[ăa]n|C[ÔO]NG\s*V[ĂA]N|[Vv][ăa]n\s*b[ảa]n|\bCV)\s*(?:[Ss][ốo]\s*)?(\d{1,6})\s*/\s*"
+    r"([A-ZĐ][A-ZĐ0-9&]*(?:\s?-\s?[A-ZĐ][A-ZĐ0-9&]*)*)"
+)
+# "219/2013/TT-BTC", "218/2013/NĐ-CP", "14/2008/QH12"
+_NORMATIVE_REF = re.compile(
+    r"(?<![\d/])(\d{1,4})\s*/\s*((?:19|20)\d{2})\s*/\s*([A-ZĐ]{1,5})(?:\s*-\s*([A-ZĐ][A-ZĐ0-9]*))?"
+)
+# "Thông tư 219", "Nghị định số 218", "Circular 219", "Decree 218"
+_SHORT_REF = re.compile(
+    r"([Tt]hông\s*tư|THÔNG\s*TƯ|[Nn]ghị\s*định|NGHỊ\s*ĐỊNH|[Qq]uyết\s*định|QUYẾT\s*ĐỊNH|"
+    r"[Nn]ghị\s*quyết|NGHỊ\s*QUYẾT|[Cc]ircular|[Dd]ecree|[Dd]ecision|[Rr]esolution)"
+    r"\s*(?:[Ss]ố\s*|No\.?\s*)?(\d{1,4})(?!\s*/?\s*\d)(?!\s*/\s*(?:19|20)\d{2})"
+)
+# Substrings of every pattern above; lines without any of them are skipped
+# before the regexes run (most of a letter's text cites nothing)
+_LINE_HINTS = (
+    "/", "hông tư", "HÔNG TƯ", "ghị định", "GHỊ ĐỊNH", "uyết định", "UYẾT ĐỊNH",
+    "ghị quyết", "GHỊ QUYẾT", "ircular", "ecree", "ecision", "esolution",
+)
+_SHORT_TYPES = {
+    "thông tư": "TT", "circular": "TT",
+    "nghị định": "NĐ", "decree": "NĐ",
+    "quyết định": "QĐ", "decision": "QĐ",
+    "nghị quyết": "NQ", "resolution": "NQ",
+}
+
+
+def extract_citations(text: str) -> Set[str]:
+    """
+    Extract raw reference keys from document text.
+
+    Keys:
+        "key:<number_key>"          fully qualified ("key:3054/CT", "key:219/2013/BTC")
+        "type:<doc_type>:<number>"  short form ("type:TT:219")
+
+    Args:
+        text: Document text
+
+    Returns:
+        Set of reference keys
+    """
+    text = _candidate_lines(text[:MAX_SCAN_CHARS])
+    keys: Set[str] = set()
+
+    for match in _LETTER_REF.finditer(text):
+        code = re.sub(r"\s+", "", match.group(2)).upper()
+        _doc_type, authority = split_code(code, has_year=False)
+        if authority:
+            keys.add("key:" + make_number_key(match.group(1), authority))
+
+    for match in _NORMATIVE_REF.finditer(text):
+        number, year, first, second = match.groups()
+        if second:
+            doc_type, authority = split_code(f"{first}-{second}", has_year=True)
+        else:
+            doc_type, authority = "", first  # "14/2008/QH12" style laws
+        if authority:
+            keys.add("key:" + make_number_key(f"{number}/{year}", authority))
+        if doc_type:
+            keys.add(f"type:{doc_type}:{make_number_key(f'{number}/{year}')}")
+
+    for match in _SHORT_REF.finditer(text):
+        doc_type = _SHORT_TYPES.get(re.sub(r"\s+", " ", match.group(1)).lower())
+        if doc_type:
+            keys.add(f"type:{doc_type}:{make_number_key(match.group(2))}")
+
+    return keys
+
+
+class ReferenceGraph:
+    """
+    Citation graph over catalog documents with CSR adjacency and PageRank.
+    """
+
+    def __init__(self, catalog: DocumentCatalog):
+        """
+        Initialize ReferenceGraph
+
+        Args:
+            catalog: DocumentCatalog whose database stores citations and ranks
+        """
+        self.catalog = catalog
+        self._lock = threading.RLock()
+        self.generation = -1
+
+        # CSR adjacency indexed by dense node number (_node_of maps doc_id ->
+        # node, _doc_ids maps node -> doc_id)
+        self._doc_ids = array("I")
+        self._node_of: Dict[int, int] = {}
+        self._out_offsets = array("I", [0])
+        self._out_targets = array("I")
+        self._in_offsets = array("I", [0])
+        self._in_targets = array("I")
+        self._rank = array("d")
+
+        self._ensure_schema()
+
+    def _ensure_schema(self) -> None:
+        with self.catalog.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS doc_citations (
+                    doc_id INTEGER NOT NULL,
+                    ref TEXT NOT NULL,
+                    PRIMARY KEY (doc_id, ref)
+                ) WITHOUT ROWID
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS doc_citation_state (
+                    doc_id INTEGER PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    version INTEGER NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS doc_rank (
+                    doc_id INTEGER PRIMARY KEY,
+                    authority REAL NOT NULL,
+                    cites INTEGER NOT NULL,
+                    cited_by INTEGER NOT NULL
+                )
+            """)
+
+    # =========================================================================
+    # BUILD
+    # =========================================================================
+
+    def build(self) -> Dict[str, int]:
+        """
+        Bring citations up to date with the catalog, then rebuild adjacency and ranks.
+
+        Returns:
+            {"documents": n, "extracted": n, "edges": n}
+        """
+        start_time = time.time()
+        generation = self.catalog.generation
+        extracted = self._update_citations()
+        edges = self._load_graph()
+        self._persist_ranks(generation)
+        self.generation = generation
+
+        stats = {"documents": len(self._doc_ids), "extracted": extracted, "edges": edges}
+        logger.info(f"Reference graph built in {(time.time() - start_time) * 1000:.0f}ms: {stats}")
+        return stats
+
+    def _update_citations(self) -> int:
+        """Re-extract citations for new/changed documents; drop rows for deleted ones."""
+        # Catalog was rebuilt: stored doc_ids no longer refer to the same files
+        self.catalog.reset_if_rebuilt("graph_epoch", ("doc_citations", "doc_citation_state", "doc_rank"))
+
+        with self.catalog.connection() as conn:
+            stale = conn.execute("""
+                SELECT d.doc_id, d.path, d.mtime_ns FROM documents d
+                LEFT JOIN doc_citation_state s ON s.doc_id = d.doc_id
+                WHERE s.doc_id IS NULL OR s.mtime_ns != d.mtime_ns OR s.version != ?
+            """, (CITATION_EXTRACTOR_VERSION,)).fetchall()
+
+        batch: List[Tuple[int, int, Set[str]]] = []
+        for row in stale:
+            text = _read_text(self.catalog.memory_path / row["path"])
+            batch.append((row["doc_id"], row["mtime_ns"], extract_citations(text)))
+
+        with self.catalog.transaction() as conn:
+            for doc_id, mtime_ns, refs in batch:
+                conn.execute("DELETE FROM doc_citations WHERE doc_id = ?", (doc_id,))
+                conn.executemany(
+                    "INSERT INTO doc_citations (doc_id, ref) VALUES (?, ?)",
+                    [(doc_id, ref) for ref in sorted(refs)],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO doc_citation_state (doc_id, mtime_ns, version) VALUES (?, ?, ?)",
+                    (doc_id, mtime_ns, CITATION_EXTRACTOR_VERSION),
+                )
+            for table in ("doc_citations", "doc_citation_state", "doc_rank"):
+                conn.execute(f"DELETE FROM {table} WHERE doc_id NOT IN (SELECT doc_id FROM documents)")
+        return len(batch)
+
+    def load(self) -> bool:
+        """
+        Load the graph stored by a build at the current catalog generation.
+
+        Returns:
+            False if no such build exists (call build())
+        """
+        generation = self.catalog.generation
+        if self.catalog.get_meta("graph_built") != self.catalog.state_marker(generation):
+            return False
+        with self.catalog.connection() as conn:
+            ranks = {row["doc_id"]: row["authority"] for row in conn.execute("SELECT doc_id, authority FROM doc_rank")}
+        edges = self._load_graph(ranks)
+        self.generation = generation
+        logger.info(f"Loaded reference graph built at generation {generation}: {edges} edges")
+        return True
+
+    def _load_graph(self, ranks: Optional[Dict[int, float]] = None) -> int:
+        """Resolve raw citations to doc_ids and pack CSR adjacency (PageRank is computed unless ranks are given)."""
+        with self.catalog.connection() as conn:
+            documents = conn.execute("SELECT doc_id, number_key, doc_type FROM documents ORDER BY doc_id").fetchall()
+            citations = conn.execute("SELECT doc_id, ref FROM doc_citations").fetchall()
+
+        by_key: Dict[str, List[int]] = {}
+        for row in documents:
+            if not row["number_key"]:
+                continue
+            by_key.setdefault("key:" + row["number_key"], []).append(row["doc_id"])
+            if row["doc_type"]:
+                numeric = row["number_key"].split("/")
+                doc_type = canonical_doc_type(row["doc_type"])
+                # "type:TT:219" and "type:TT:219/2013" both resolve to 219/2013/TT-BTC
+                by_key.setdefault(f"type:{doc_type}:{numeric[0]}", []).append(row["doc_id"])
+                if len(numeric) > 2:
+                    by_key.setdefault(f"type:{doc_type}:{numeric[0]}/{numeric[1]}", []).append(row["doc_id"])
+
+        doc_ids = array("I", (row["doc_id"] for row in documents))
+        node_of = {doc_id: node for node, doc_id in enumerate(doc_ids)}
+
+        out_sets: Dict[int, Set[int]] = {}
+        for row in citations:
+            targets = by_key.get(row["ref"])
+            source = node_of.get(row["doc_id"])
+            if not targets or source is None or len(targets) > MAX_TARGETS_PER_CITATION:
+                continue
+            bucket = out_sets.setdefault(source, set())
+            for target in targets:
+                node = node_of[target]
+                if node != source:
+                    bucket.add(node)
+
+        node_count = len(doc_ids)
+        out_offsets, out_targets = _pack_csr(node_count, out_sets)
+        in_sets: Dict[int, Set[int]] = {}
+        for source, targets in out_sets.items():
+            for target in targets:
+                in_sets.setdefault(target, set()).add(source)
+        in_offsets, in_targets = _pack_csr(node_count, in_sets)
+
+        if ranks is None:
+            rank = _pagerank(node_count, out_offsets, in_offsets, in_targets)
+        else:
+            rank = array("d", (ranks.get(doc_id, 0.0) for doc_id in doc_ids))
+
+        with self._lock:
+            self._doc_ids = doc_ids
+            self._node_of = node_of
+            self._out_offsets, self._out_targets = out_offsets, out_targets
+            self._in_offsets, self._in_targets = in_offsets, in_targets
+            self._rank = rank
+        return len(out_targets)
+
+    def _persist_ranks(self, generation: int) -> None:
+        with self._lock:
+            rows = [
+                (
+                    doc_id,
+                    self._rank[node],
+                    self._out_offsets[node + 1] - self._out_offsets[node],
+                    self._in_offsets[node + 1] - self._in_offsets[node],
+                )
+                for node, doc_id in enumerate(self._doc_ids)
+            ]
+        with self.catalog.transaction() as conn:
+            conn.execute("DELETE FROM doc_rank")
+            conn.executemany(
+                "INSERT INTO doc_rank (doc_id, authority, cites, cited_by) VALUES (?, ?, ?, ?)", rows
+            )
+            self.catalog.set_meta(conn, "graph_built", self.catalog.state_marker(generation))
+
+    # =========================================================================
+    # QUERIES
+    # =========================================================================
+
+    def cites(self, doc_id: int) -> List[int]:
+        """Documents cited by doc_id (highest authority first)."""
+        return self._neighbors(doc_id, self._out_offsets, self._out_targets)
+
+    def cited_by(self, doc_id: int) -> List[int]:
+        """Documents citing doc_id (highest authority first)."""
+        return self._neighbors(doc_id, self._in_offsets, self._in_targets)
+
+    def authority(self, doc_id: int) -> float:
+        """PageRank scaled so the average document scores 1.0 (0.0 if unknown)."""
+        with self._lock:
+            node = self._node_of.get(doc_id)
+            return self._rank[node] if node is not None else 0.0
+
+    def expand(
+        self,
+        doc_ids: Sequence[int],
+        direction: str = "both",
+        per_document: int = 5,
+        limit: Optional[int] = None
+    ) -> List[int]:
+        """
+        Related documents for a set of hits, excluding the hits themselves.
+
+        Args:
+            doc_ids: Hit doc_ids
+            direction: "cites", "cited_by" or "both"
+            per_document: Maximum neighbors taken per hit
+            limit: Maximum total results
+
+        Returns:
+            doc_ids ordered by authority (highest first)
+        """
+        seen = set(doc_ids)
+        related: Set[int] = set()
+        for doc_id in doc_ids:
+            neighbors: List[int] = []
+            if direction in ("cites", "both"):
+                neighbors.extend(self.cites(doc_id))
+            if direction in ("cited_by", "both"):
+                neighbors.extend(self.cited_by(doc_id))
+            neighbors.sort(key=self.authority, reverse=True)
+            related.update(n for n in neighbors[:per_document] if n not in seen)
+        ordered = sorted(related, key=self.authority, reverse=True)
+        return ordered[:limit] if limit else ordered
+
+    def rank_folders(self, folders: Sequence[str]) -> List[str]:
+        """
+        Order catalog folders (relative to memory_path) by their most authoritative document.
+
+        Not by total authority: every uncited document gets the same teleport
+        share of PageRank, so a sum mostly measures folder size. Ties (folders
+        without cited documents) are broken by citations received, then by name.
+
+        Returns:
+            Folders, most authoritative first
+        """
+        if not folders:
+            return []
+        placeholders = ", ".join("?" for _ in folders)
+        with self.catalog.connection() as conn:
+            rows = conn.execute(
+                f"SELECT d.folder, MAX(COALESCE(r.authority, 0)) AS top, SUM(COALESCE(r.cited_by, 0)) AS cited "
+                f"FROM documents d LEFT JOIN doc_rank r ON r.doc_id = d.doc_id "
+                f"WHERE d.folder IN ({placeholders}) GROUP BY d.folder",
+                list(folders),
+            ).fetchall()
+        scores = {row["folder"]: (row["top"], row["cited"]) for row in rows}
+        return sorted(folders, key=lambda f: tuple(-v for v in scores.get(f, (0.0, 0))) + (f,))
+
+    def _neighbors(self, doc_id: int, offsets: array, targets: array) -> List[int]:
+        with self._lock:
+            node = self._node_of.get(doc_id)
+            if node is None:
+                return []
+            nodes = targets[offsets[node]:offsets[node + 1]]
+            return [self._doc_ids[n] for n in sorted(nodes, key=lambda n: -self._rank[n])]
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+def _candidate_lines(text: str) -> str:
+    """Keep lines that may hold a citation, each joined with its successor
+    (citations often wrap: "Thông tư số\n219/2013/TT-BTC")."""
+    lines = text.split("\n")
+    kept = []
+    for i, line in enumerate(lines):
+        if any(hint in line for hint in _LINE_HINTS):
+            kept.append(line + "\n" + lines[i + 1] if i + 1 < len(lines) else line)
+    return "\n".join(kept)
+
+
+def _read_text(path: Path) -> str:
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read(MAX_SCAN_CHARS)
+    except OSError:
+        return ""
+
+
+def _pack_csr(node_count: int, adjacency: Dict[int, Set[int]]) -> Tuple[array, array]:
+    offsets = array("I", [0]) * (node_count + 1)
+    targets = array("I")
+    for node in range(node_count):
+        neighbors = adjacency.get(node)
+        if neighbors:
+            targets.extend(sorted(neighbors))
+        offsets[node + 1] = len(targets)
+    return offsets, targets
+
+
+def _pagerank(node_count: int, out_offsets: array, in_offsets: array, in_targets: array) -> array:
+    """Power-iteration PageRank; dangling mass is spread uniformly. Scaled to mean 1.0."""
+    if node_count == 0:
+        return array("d")
+    out_degree = [out_offsets[n + 1] - out_offsets[n] for n in range(node_count)]
+    dangling = [n for n in range(node_count) if out_degree[n] == 0]
+    rank = [1.0 / node_count] * node_count
+    base = (1.0 - PAGERANK_DAMPING) / node_count
+
+    for _iteration in range(PAGERANK_MAX_ITERATIONS):
+        share = [rank[n] / out_degree[n] if out_degree[n] else 0.0 for n in range(node_count)]
+        dangling_share = PAGERANK_DAMPING * sum(rank[n] for n in dangling) / node_count
+        new_rank = [
+            base + dangling_share + PAGERANK_DAMPING * sum(share[s] for s in in_targets[in_offsets[n]:in_offsets[n + 1]])
+            for n in range(node_count)
+        ]
+        delta = sum(abs(a - b) for a, b in zip(new_rank, rank))
+        rank = new_rank
+        if delta < PAGERANK_TOLERANCE:
+            break
+
+    return array("d", (r * node_count for r in rank))
+
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+_graphs: Dict[str, ReferenceGraph] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_reference_graph(memory_path: Path = DEFAULT_MEMORY_PATH) -> ReferenceGraph:
+    """
+    Return the process-wide reference graph, reloaded (or rebuilt if no build
+    matches) when the catalog generation changed.
+
+    Args:
+        memory_path: Path to PRIMARY DATA directory (/local-memory/tax_legal/)
+
+    Returns:
+        Shared ReferenceGraph instance
+    """
+    catalog = get_catalog(memory_path)
+    key = str(catalog.memory_path)
+    with _graphs_lock:
+        graph = _graphs.get(key)
+        if graph is None:
+            graph = ReferenceGraph(catalog)
+            _graphs[key] = graph
+        if graph.generation != catalog.generation and not graph.load():
+            graph.build()
+    return graph
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the citation graph and print the most cited documents")
+    parser.add_argument("--memory-path", default=str(DEFAULT_MEMORY_PATH))
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    graph = get_reference_graph(Path(args.memory_path))
+    with graph.catalog.connection() as conn:
+        rows = conn.execute(
+            "SELECT d.doc_number, d.path, r.authority, r.cited_by FROM doc_rank r "
+            "JOIN documents d ON d.doc_id = r.doc_id ORDER BY r.authority DESC LIMIT ?",
+            (args.top,),
+        ).fetchall()
+    for row in rows:
+        print(f"{row['authority']:8.2f}  {row['cited_by']:4d}  {row['doc_number'] or '-':<20} {row['path']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
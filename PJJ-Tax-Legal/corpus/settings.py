@@ -0,0 +1,43 @@
+"""
+Settings and Configuration for Corpus Module
+"""
+
+import os
+import warnings
+from pathlib import Path
+
+# Default knowledge base (same directory tax_app.py passes to TaxOrchestrator)
+DEFAULT_MEMORY_PATH = Path(__file__).resolve().parent.parent.parent / "local-memory" / "tax_legal"
+
+# Collections searched by the tax workflow (relative to memory_path)
+COLLECTIONS = ("tax_database", "past_responses")
+
+# Legacy document index written by the conversion scripts
+INDEX_FILENAME = "tax-database-index.json"
+
+# Derived artifacts live in a hidden directory inside memory_path
+# (list_files() hides dot-directories from the agent)
+INDEX_DIRNAME = ".index"
+CATALOG_FILENAME = "catalog.sqlite"
+BUILD_FILENAME = "build.json"  # Manifest of the last corpus build (see corpus/build.py)
+STORE_FILENAME = "documents.pack"  # Packed compressed documents (see corpus/store.py)
+
+# Catalog
+CATALOG_REFRESH_INTERVAL = 30  # Seconds between filesystem stat sweeps in get_catalog()
+
+# Directory tree snapshot (see corpus/tree.py)
+TREE_REFRESH_INTERVAL = 2.0  # Seconds between directory mtime sweeps when no watcher is running
+
+# Search result cache (Step 2 / Step 4)
+QUERY_CACHE_MAX_ENTRIES = 256
+
+# Filesystem watcher (see corpus/watcher.py)
+# TAX_CORPUS_WATCHER: "auto" (inotify, else polling), "inotify", "polling" or "off"
+WATCHER_MODES = ("auto", "inotify", "polling", "off")
+WATCHER_MODE = os.getenv("TAX_CORPUS_WATCHER", "auto").strip().lower()
+if WATCHER_MODE not in WATCHER_MODES:
+    warnings.warn(f"TAX_CORPUS_WATCHER={WATCHER_MODE!r} is not one of {', '.join(WATCHER_MODES)}; using 'auto'")
+    WATCHER_MODE = "auto"
+WATCHER_DEBOUNCE = 0.5       # Seconds without events before a batch is applied
+WATCHER_MAX_DELAY = 2.0      # Upper bound on how long a batch can be held back
+WATCHER_POLL_INTERVAL = 2.0  # Stat sweep interval of the polling backend
@@ -0,0 +1,139 @@
+"""
+Shingles - Tokenization, word shingles and MinHash signatures
+
+Shared text-similarity primitives for the corpus tools:
+- tokenize(): diacritic-folded word tokens (OCR often drops Vietnamese tone
+  marks, so "thuế" and "thue" must compare equal)
+- shingle_hashes(): hashed word n-grams as a set of 32-bit ints
+- MinHasher: fixed-size MinHash signatures for Jaccard estimation
+
+Hashing uses zlib.crc32 so values are stable across processes and runs
+(Python's hash() is salted per process), which lets signatures be stored.
+"""
+
+import random
+import re
+import zlib
+from typing import Iterable, List, Sequence, Set, Tuple
+
+from corpus.doc_facts import fold_text
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_MASK_64 = (1 << 64) - 1
+_EMPTY_BIN = 1 << 40
+_DENSIFY_SALT = 0x9E3779B1
+
+
+def tokenize(text: str, min_length: int = 1) -> List[str]:
+    """
+    Split text into folded (lowercase, diacritic-free) word tokens.
+
+    Args:
+        text: Any text
+        min_length: Drop tokens shorter than this
+
+    Returns:
+        List of tokens in order
+    """
+    return [w for w in _WORD.findall(fold_text(text)) if len(w) >= min_length]
+
+
+def token_hash(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def shingle_hashes(tokens: Sequence[str], n: int = 3) -> Set[int]:
+    """
+    Hash every word n-gram of a token sequence.
+
+    Sequences shorter than n yield one shingle of the whole sequence.
+
+    Args:
+        tokens: Output of tokenize()
+        n: Shingle width in words
+
+    Returns:
+        Set of 32-bit shingle hashes
+    """
+    if not tokens:
+        return set()
+    if len(tokens) < n:
+        return {token_hash(" ".join(tokens))}
+    return {token_hash(" ".join(tokens[i:i + n])) for i in range(len(tokens) - n + 1)}
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def containment(part: Set[int], whole: Set[int]) -> float:
+    """Fraction of `part` found in `whole` (asymmetric; good for claim-in-source)."""
+    if not part:
+        return 0.0
+    return len(part & whole) / len(part)
+
+
+class MinHasher:
+    """
+    MinHash signatures via one-permutation hashing with rotation densification.
+
+    Each shingle hash is mixed once and assigned to one of num_perm bins by
+    its low bits; a bin keeps the minimum of its values. Empty bins borrow
+    from the next non-empty bin. This costs O(shingles) per document instead
+    of O(shingles x num_perm) for classic k-permutation MinHash, with the
+    same Jaccard estimator. Signatures from the same (num_perm, seed) are
+    comparable across runs.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        """
+        Initialize MinHasher
+
+        Args:
+            num_perm: Signature length (more = lower estimation error, ~1/sqrt(num_perm))
+            seed: Seed for the hash mixing
+        """
+        self.num_perm = num_perm
+        self.seed = seed
+        rng = random.Random(seed)
+        self._multiplier = rng.randrange(1, _MERSENNE_PRIME) | 1
+        self._offset = rng.randrange(0, _MERSENNE_PRIME)
+
+    def signature(self, hashes: Iterable[int]) -> Tuple[int, ...]:
+        """
+        Compute the MinHash signature of a shingle hash set.
+
+        Returns:
+            Tuple of num_perm 32-bit values (all _MAX_HASH for an empty set)
+        """
+        k = self.num_perm
+        bins = [_EMPTY_BIN] * k
+        multiplier, offset = self._multiplier, self._offset
+        for h in hashes:
+            mixed = ((h * multiplier + offset) % _MERSENNE_PRIME) & _MASK_64
+            slot = mixed % k
+            value = (mixed >> 20) & _MAX_HASH
+            if value < bins[slot]:
+                bins[slot] = value
+
+        if all(b == _EMPTY_BIN for b in bins):
+            return tuple([_MAX_HASH] * k)
+        # Densify: an empty bin takes the next non-empty bin's value, salted by distance
+        signature = list(bins)
+        for i in range(k):
+            if bins[i] == _EMPTY_BIN:
+                distance = 1
+                while bins[(i + distance) % k] == _EMPTY_BIN:
+                    distance += 1
+                signature[i] = (bins[(i + distance) % k] + distance * _DENSIFY_SALT) & _MAX_HASH
+        return tuple(signature)
+
+    @staticmethod
+    def estimate_jaccard(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+        if not sig_a or len(sig_a) != len(sig_b):
+            return 0.0
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
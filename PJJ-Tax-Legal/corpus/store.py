@@ -0,0 +1,458 @@
+"""
+DocumentStore - Packed, dictionary-compressed document store
+
+The markdown corpus is mostly official-letter boilerplate repeated across
+thousands of files ("CỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM", "Kính gửi: Cục
+Thuế ..."). The store packs every catalog document into one file, each
+document compressed on its own against a dictionary trained on the corpus,
+so the whole knowledge base stays small enough to live in the page cache
+and any document is still fetched by doc_id with one lookup and one
+decompression.
+
+CODECS:
+- zstd (zstandard package, if installed): zstandard.train_dictionary() on a
+  sample of documents, level ZSTD_LEVEL
+- zlib (fallback, standard library): a 32 KB preset dictionary (zdict) made
+  of the lines that recur across most documents; raw deflate streams
+
+FILE LAYOUT (<memory_path>/.index/documents.pack, native byte order):
+    header      magic "TXDS", version, codec, dictionary length, document
+                count, directory offset, epoch length
+    epoch       catalog epoch (UTF-8, as Catalog.epoch returns it)
+    dictionary  codec dictionary bytes
+    blobs       one compressed document after another
+    directory   four column arrays sorted by doc_id: doc_id (u32),
+                offset (u64), length (u32), mtime_ns (i64)
+
+Readers mmap the file and cast the directory columns in place (no parsing
+at open); get() is a binary search plus one decompression. A document whose
+catalog mtime differs from the stored one (edited after the last build) is
+not served, so callers fall back to the file on disk.
+
+BUILD (incremental): build_store() copies the compressed blobs of unchanged
+documents from the previous pack (same epoch, same dictionary) and only
+compresses new or changed ones; the file is replaced atomically.
+
+USAGE:
+    build_store(catalog)                                  # corpus/build.py does this
+    text = read_document(catalog, entry)                  # store, else the file
+    python -m corpus.store --memory-path ../local-memory/tax_legal [--retrain] [--get DOC_ID]
+"""
+
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.catalog import CatalogEntry, DocumentCatalog, get_catalog
+from corpus.settings import DEFAULT_MEMORY_PATH, INDEX_DIRNAME, STORE_FILENAME
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+    zstandard = None
+
+logger = get_logger(__name__)
+
+# Bump when the file layout changes (older packs are then rebuilt from scratch)
+# 2: the catalog epoch is stored as its string (1 stored int(epoch), so '' never matched)
+STORE_VERSION = 2
+
+CODEC_ZSTD = 1
+CODEC_ZLIB = 2
+CODEC_NAMES = {CODEC_ZSTD: "zstd", CODEC_ZLIB: "zlib"}
+
+ZSTD_LEVEL = 9
+ZSTD_DICT_SIZE = 112 * 1024
+ZLIB_LEVEL = 6                        # 9 gains <1% on this corpus at ~1.5x the time
+ZLIB_DICT_SIZE = 32 * 1024            # deflate window: zlib ignores dictionary bytes beyond this
+DICT_SAMPLE_DOCUMENTS = 2000          # Documents sampled (evenly over doc_ids) to train the dictionary
+DICT_SAMPLE_CHARS = 16_384            # Head of each sampled document used for training
+MIN_DICT_LINE_CHARS = 8
+
+_MAGIC = b"TXDS"
+_HEADER = struct.Struct("=4sHBxIIQH6x")  # magic, version, codec, dict_len, count, directory offset, epoch_len
+
+
+# ============================================================================
+# CODECS
+# ============================================================================
+
+def default_codec() -> int:
+    return CODEC_ZSTD if ZSTD_AVAILABLE else CODEC_ZLIB
+
+
+def train_dictionary(codec: int, samples: List[bytes]) -> bytes:
+    """Dictionary for codec trained on sample documents (b"" if there is too little to train on)."""
+    if not samples:
+        return b""
+    if codec == CODEC_ZSTD:
+        try:
+            return zstandard.train_dictionary(ZSTD_DICT_SIZE, samples).as_bytes()
+        except zstandard.ZstdError as e:
+            logger.warning(f"zstd dictionary training failed ({e}); compressing without a dictionary")
+            return b""
+    return _zlib_dictionary(samples)
+
+
+def _zlib_dictionary(samples: List[bytes]) -> bytes:
+    """
+    Lines repeated across documents, most valuable last (deflate matches
+    nearer the end of the dictionary with shorter distances).
+    """
+    document_frequency: Counter = Counter()
+    for sample in samples:
+        lines = {line.strip() for line in sample.split(b"\n")}
+        document_frequency.update(line for line in lines if len(line) >= MIN_DICT_LINE_CHARS)
+    recurring = [(count * len(line), line) for line, count in document_frequency.items() if count > 1]
+    recurring.sort(reverse=True)
+
+    chosen: List[bytes] = []
+    size = 0
+    for _score, line in recurring:
+        if size + len(line) + 1 > ZLIB_DICT_SIZE:
+            continue
+        chosen.append(line)
+        size += len(line) + 1
+    return b"\n".join(reversed(chosen))
+
+
+class _Compressor:
+    """Compresses one document at a time against a fixed dictionary."""
+
+    def __init__(self, codec: int, dictionary: bytes):
+        self.codec = codec
+        self.dictionary = dictionary
+        if codec == CODEC_ZSTD:
+            dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+            self._zstd = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=dict_data)
+
+    def compress(self, data: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return self._zstd.compress(data)
+        compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15, zdict=self.dictionary) \
+            if self.dictionary else zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15)
+        return compressor.compress(data) + compressor.flush()
+
+
+# ============================================================================
+# READER
+# ============================================================================
+
+class DocumentStore:
+    """
+    Read-only view of a pack file (mmap; safe to share between threads).
+    """
+
+    def __init__(self, path: Path):
+        """
+        Open a pack file
+
+        Args:
+            path: Pack file written by build_store()
+
+        Raises:
+            OSError: file cannot be opened
+            ValueError: not a pack file, unsupported version or codec
+        """
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self.signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if st.st_size else b""
+
+        if len(self._mm) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a document store")
+        magic, version, codec, dict_len, count, directory, epoch_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or version != STORE_VERSION:
+            raise ValueError(f"{self.path}: unsupported document store (version {version})")
+        if codec not in CODEC_NAMES or (codec == CODEC_ZSTD and not ZSTD_AVAILABLE):
+            raise ValueError(f"{self.path}: codec {CODEC_NAMES.get(codec, codec)} is not available")
+
+        self.codec = codec
+        start = _HEADER.size + epoch_len
+        self.epoch = bytes(self._mm[_HEADER.size:start]).decode("utf-8")
+        self.dictionary = bytes(self._mm[start:start + dict_len])
+        view = memoryview(self._mm)
+        self._doc_ids = view[directory:directory + 4 * count].cast("I")
+        directory += 4 * count
+        self._offsets = view[directory:directory + 8 * count].cast("Q")
+        directory += 8 * count
+        self._lengths = view[directory:directory + 4 * count].cast("I")
+        directory += 4 * count
+        self._mtimes = view[directory:directory + 8 * count].cast("q")
+        self._local = threading.local()
+
+    def __len__(self) -> int:
+        return len(self._doc_ids)
+
+    def __contains__(self, doc_id: int) -> bool:
+        return self._position(doc_id) is not None
+
+    def _position(self, doc_id: int) -> Optional[int]:
+        position = bisect_left(self._doc_ids, doc_id)
+        if position < len(self._doc_ids) and self._doc_ids[position] == doc_id:
+            return position
+        return None
+
+    def mtime_ns(self, doc_id: int) -> Optional[int]:
+        """Source mtime recorded for doc_id (None if not stored)."""
+        position = self._position(doc_id)
+        return self._mtimes[position] if position is not None else None
+
+    def raw(self, doc_id: int) -> Optional[bytes]:
+        """Compressed blob of doc_id (None if not stored)."""
+        position = self._position(doc_id)
+        if position is None:
+            return None
+        offset = self._offsets[position]
+        return self._mm[offset:offset + self._lengths[position]]
+
+    def get(self, doc_id: int, mtime_ns: Optional[int] = None) -> Optional[str]:
+        """
+        Text of a document.
+
+        Args:
+            doc_id: Catalog document id
+            mtime_ns: Current catalog mtime; a stored copy of another version is not returned
+
+        Returns:
+            The document text, or None if it is not stored (or stale)
+        """
+        position = self._position(doc_id)
+        if position is None or (mtime_ns is not None and self._mtimes[position] != mtime_ns):
+            return None
+        offset = self._offsets[position]
+        return self._decompress(self._mm[offset:offset + self._lengths[position]]).decode("utf-8")
+
+    def _decompress(self, blob: bytes) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            # Decompressor objects are not thread-safe; keep one per thread
+            decompressor = getattr(self._local, "zstd", None)
+            if decompressor is None:
+                dict_data = zstandard.ZstdCompressionDict(self.dictionary) if self.dictionary else None
+                decompressor = self._local.zstd = zstandard.ZstdDecompressor(dict_data=dict_data)
+            return decompressor.decompress(blob)
+        if self.dictionary:
+            return zlib.decompressobj(-15, zdict=self.dictionary).decompress(blob)
+        return zlib.decompress(blob, -15)
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def store_path(memory_path: Path) -> Path:
+    return Path(memory_path) / INDEX_DIRNAME / STORE_FILENAME
+
+
+def build_store(catalog: DocumentCatalog, retrain: bool = False, codec: Optional[int] = None) -> Dict[str, object]:
+    """
+    Write the pack file for every catalog document (incremental, atomic replace).
+
+    Args:
+        catalog: Catalog listing the documents to store
+        retrain: Train a new dictionary even if the previous pack's can be reused
+        codec: CODEC_ZSTD or CODEC_ZLIB (default: zstd when installed)
+
+    Returns:
+        {"codec", "documents", "compressed", "reused", "raw_bytes", "stored_bytes", "dictionary_bytes", "ratio"}
+    """
+    start_time = time.time()
+    codec = codec or default_codec()
+    path = store_path(catalog.memory_path)
+    epoch = catalog.epoch
+    epoch_bytes = epoch.encode("utf-8")
+
+    with catalog.connection() as conn:
+        rows = conn.execute("SELECT doc_id, path, mtime_ns FROM documents ORDER BY doc_id").fetchall()
+
+    previous = _open_existing(path)
+    if previous is not None and (retrain or previous.codec != codec):
+        previous = None
+    if previous is not None:
+        dictionary = previous.dictionary
+    else:
+        step = max(1, len(rows) // DICT_SAMPLE_DOCUMENTS)
+        samples = [
+            _read_bytes(catalog.memory_path / row["path"])[:DICT_SAMPLE_CHARS] for row in rows[::step]
+        ]
+        dictionary = train_dictionary(codec, [sample for sample in samples if sample])
+    reusable = previous is not None and previous.epoch == epoch
+    compressor = _Compressor(codec, dictionary)
+
+    tmp = path.parent / f".{path.name}.{os.getpid()}.tmp"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    doc_ids, offsets, lengths, mtimes = [], [], [], []
+    compressed = reused = 0
+    try:
+        with open(tmp, "wb") as f:
+            f.write(b"\0" * _HEADER.size)
+            f.write(epoch_bytes)
+            f.write(dictionary)
+            offset = _HEADER.size + len(epoch_bytes) + len(dictionary)
+            for row in rows:
+                blob = None
+                if reusable and previous.mtime_ns(row["doc_id"]) == row["mtime_ns"]:
+                    blob = previous.raw(row["doc_id"])
+                if blob is not None:
+                    reused += 1
+                else:
+                    blob = compressor.compress(_read_bytes(catalog.memory_path / row["path"]))
+                    compressed += 1
+                f.write(blob)
+                doc_ids.append(row["doc_id"])
+                offsets.append(offset)
+                lengths.append(len(blob))
+                mtimes.append(row["mtime_ns"])
+                offset += len(blob)
+
+            padding = -offset % 8
+            f.write(b"\0" * padding)
+            directory = offset + padding
+            count = len(doc_ids)
+            for typecode, column in (("I", doc_ids), ("Q", offsets), ("I", lengths), ("q", mtimes)):
+                f.write(array(typecode, column).tobytes())
+
+            f.seek(0)
+            f.write(_HEADER.pack(_MAGIC, STORE_VERSION, codec, len(dictionary), count, directory, len(epoch_bytes)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+    stored_bytes = sum(lengths)
+    with catalog.connection() as conn:
+        raw_bytes = conn.execute("SELECT COALESCE(SUM(size_bytes), 0) FROM documents").fetchone()[0]
+    stats = {
+        "codec": CODEC_NAMES[codec],
+        "documents": len(doc_ids),
+        "compressed": compressed,
+        "reused": reused,
+        "raw_bytes": raw_bytes,
+        "stored_bytes": stored_bytes,
+        "dictionary_bytes": len(dictionary),
+        "ratio": round(raw_bytes / stored_bytes, 2) if stored_bytes else 0.0,
+    }
+    logger.info(f"Document store written in {(time.time() - start_time) * 1000:.0f}ms: {stats}")
+    return stats
+
+
+def _open_existing(path: Path) -> Optional[DocumentStore]:
+    if not path.exists():
+        return None
+    try:
+        return DocumentStore(path)
+    except (OSError, ValueError) as e:
+        logger.info(f"Not reusing {path}: {e}")
+        return None
+
+
+def _read_bytes(path: Path) -> bytes:
+    """File text as UTF-8 bytes, decoded the way the readers decode it (universal newlines, errors replaced)."""
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read().encode("utf-8")
+    except OSError:
+        return b""
+
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+_stores: Dict[str, Optional[DocumentStore]] = {}
+_stores_lock = threading.Lock()
+
+
+def get_document_store(memory_path: Path = DEFAULT_MEMORY_PATH) -> Optional[DocumentStore]:
+    """
+    Return the process-wide store for memory_path, reopened when a build replaced
+    the pack file (None if there is no usable pack).
+    """
+    path = store_path(memory_path)
+    try:
+        st = path.stat()
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+    except OSError:
+        signature = None
+    key = str(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if signature is None:
+            store = None
+        elif store is None or store.signature != signature:
+            store = _open_existing(path)
+        _stores[key] = store
+    return store
+
+
+def read_document(catalog: DocumentCatalog, entry: CatalogEntry, limit: Optional[int] = None) -> str:
+    """
+    Text of a catalog document: from the store when it holds the current
+    version, otherwise from the markdown file ("" if neither is readable).
+    """
+    store = get_document_store(catalog.memory_path)
+    text = None
+    if store is not None and store.epoch == catalog.epoch:
+        text = store.get(entry.doc_id, entry.mtime_ns)
+    if text is None:
+        try:
+            with open(entry.absolute_path(catalog.memory_path), "r", encoding="utf-8", errors="replace") as f:
+                return f.read() if limit is None else f.read(limit)
+        except OSError:
+            return ""
+    return text if limit is None else text[:limit]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Build the packed document store and print its compression ratio")
+    parser.add_argument("--memory-path", default=str(DEFAULT_MEMORY_PATH))
+    parser.add_argument("--retrain", action="store_true", help="Train a new dictionary and recompress everything")
+    parser.add_argument("--zlib", action="store_true", help="Use the zlib codec even if zstandard is installed")
+    parser.add_argument("--get", type=int, metavar="DOC_ID", help="Print one document and the lookup time")
+    args = parser.parse_args(argv)
+
+    catalog = get_catalog(Path(args.memory_path))
+    if args.get is None:
+        print(json.dumps(build_store(catalog, args.retrain, CODEC_ZLIB if args.zlib else None), indent=2))
+        return 0
+
+    store = get_document_store(catalog.memory_path)
+    if store is None:
+        print("No document store; run without --get first")
+        return 1
+    start = time.perf_counter()
+    text = store.get(args.get)
+    elapsed_us = (time.perf_counter() - start) * 1e6
+    if text is None:
+        print(f"Document {args.get} is not stored")
+        return 1
+    print(text)
+    print(f"\n{len(text)} chars in {elapsed_us:.0f} us ({CODEC_NAMES[store.codec]})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
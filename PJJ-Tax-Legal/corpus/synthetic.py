@@ -0,0 +1,505 @@
+"""
+SyntheticCorpusGenerator - Scaled test corpora for the tax knowledge base
+
+Produces synthetic corpora of 30k, 300k or 1M documents that mirror the shape
+of the real local-memory/tax_legal corpus, so searcher, recommender and
+indexing performance can be measured at the scale we expect to grow into.
+
+SHAPE TAKEN FROM THE REAL CORPUS (CorpusShape.from_memory):
+- Category/subcategory tree under tax_database/ (with per-folder weights)
+- Past responses tree under past_responses/ (scaled by the same ratio)
+- Frontmatter schemas actually found in the markdown files
+- Language and original_format distributions from tax-database-index.json
+- Document length distribution (file_size_kb) from tax-database-index.json
+- Body text: lines sampled from real documents (Vietnamese letters for
+  tax_database, English/Vietnamese memos for past_responses)
+
+OUTPUT (drop-in replacement for the memory_path used by TaxOrchestrator):
+    <output_dir>/
+      tax_database/<NN_Category>/<subcategory>/*.md
+      past_responses/<NN_Category>/*.md
+      tax-database-index.json   (same schema as the real index)
+
+Usage:
+    python corpus/synthetic.py --output /tmp/synthetic_30k --size 30k
+    python corpus/synthetic.py --output /tmp/synthetic_1m --size 1m --length-scale 0.25
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+from bisect import bisect_right
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import accumulate
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.settings import DEFAULT_MEMORY_PATH, INDEX_FILENAME
+
+logger = get_logger(__name__)
+
+
+# ============================================================================
+# CORPUS SHAPE
+# ============================================================================
+
+class _WeightedChoice:
+    """Weighted sampler over a fixed population (O(log n) per draw)."""
+
+    def __init__(self, items: List, weights: List[float]):
+        if not items:
+            raise ValueError("Cannot sample from an empty population")
+        self.items = items
+        self.cumulative = list(accumulate(weights))
+        self.total = self.cumulative[-1]
+
+    def draw(self, rng: random.Random):
+        return self.items[bisect_right(self.cumulative, rng.random() * self.total)]
+
+
+@dataclass
+class CorpusShape:
+    """
+    Statistical shape of a real tax_legal corpus.
+
+    Every field is derived from the memory directory on disk so the synthetic
+    corpus follows whatever the real corpus looks like at generation time.
+    """
+    # (collection, relative folder) -> document count, e.g.
+    # ("tax_database", "02_VAT/CV 2018") -> 57
+    folders: Dict[Tuple[str, str], int] = field(default_factory=dict)
+    # Top-level category folder -> index category label ("01_CIT" -> "CIT")
+    category_labels: Dict[str, str] = field(default_factory=dict)
+    # Index language label -> count
+    languages: Dict[str, int] = field(default_factory=dict)
+    # Index original_format -> count
+    formats: Dict[str, int] = field(default_factory=dict)
+    # Empirical document sizes in KB
+    sizes_kb: List[float] = field(default_factory=list)
+    # Frontmatter key tuples found in real files -> count
+    frontmatter_schemas: Dict[Tuple[str, ...], int] = field(default_factory=dict)
+    # Body line banks sampled from real documents
+    vietnamese_lines: List[str] = field(default_factory=list)
+    english_lines: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_memory(
+        cls,
+        memory_path: Path = DEFAULT_MEMORY_PATH,
+        sample_documents: int = 400,
+        seed: int = 0
+    ) -> "CorpusShape":
+        """
+        Measure the shape of the corpus stored at memory_path.
+
+        Args:
+            memory_path: Path to PRIMARY DATA directory (/local-memory/tax_legal/)
+            sample_documents: How many real documents to read for line banks
+            seed: Seed for the document sample
+
+        Returns:
+            CorpusShape describing the real corpus
+        """
+        memory_path = Path(memory_path)
+        shape = cls()
+        rng = random.Random(seed)
+
+        # Folder tree (from the filesystem - the index paths are partly stale)
+        md_files: Dict[str, List[Path]] = {"tax_database": [], "past_responses": []}
+        for collection in md_files:
+            base = memory_path / collection
+            if not base.is_dir():
+                continue
+            for root, _dirs, files in os.walk(base):
+                names = [f for f in files if f.endswith(".md")]
+                if not names:
+                    continue
+                rel = os.path.relpath(root, base)
+                if rel == ".":
+                    continue
+                shape.folders[(collection, rel.replace(os.sep, "/"))] = len(names)
+                md_files[collection].extend(Path(root) / n for n in names)
+
+        # Distributions from the index file
+        index_file = memory_path / INDEX_FILENAME
+        label_votes: Dict[str, Counter] = {}
+        if index_file.exists():
+            with open(index_file, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            for doc in index.get("documents", []):
+                shape.languages[doc.get("language", "Unknown")] = \
+                    shape.languages.get(doc.get("language", "Unknown"), 0) + 1
+                fmt = str(doc.get("original_format", "md")).lstrip(".").lower()
+                shape.formats[fmt] = shape.formats.get(fmt, 0) + 1
+                if doc.get("file_size_kb"):
+                    shape.sizes_kb.append(float(doc["file_size_kb"]))
+                top = doc.get("path", "").split("/", 1)[0]
+                label_votes.setdefault(top, Counter())[doc.get("category", "General")] += 1
+        else:
+            logger.warning(f"Index file not found: {index_file} - using filesystem sizes only")
+
+        shape.category_labels = {
+            top: votes.most_common(1)[0][0] for top, votes in label_votes.items()
+        }
+
+        if not shape.sizes_kb:
+            shape.sizes_kb = [
+                p.stat().st_size / 1024 for files in md_files.values() for p in files
+            ] or [1.0]
+        if not shape.languages:
+            shape.languages = {"Vietnamese": 1}
+        if not shape.formats:
+            shape.formats = {"pdf": 1}
+
+        # Frontmatter schemas and line banks from a sample of real documents
+        sample = rng.sample(md_files["tax_database"], min(sample_documents, len(md_files["tax_database"])))
+        sample += md_files["past_responses"]
+        for path in sample:
+            try:
+                content = path.read_text(encoding="utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+            keys, body = _split_frontmatter(content)
+            if keys:
+                shape.frontmatter_schemas[keys] = shape.frontmatter_schemas.get(keys, 0) + 1
+            bank = shape.english_lines if "past_responses" in path.parts else shape.vietnamese_lines
+            bank.extend(line for line in (l.strip() for l in body.splitlines()) if len(line) >= 20)
+
+        if not shape.frontmatter_schemas:
+            shape.frontmatter_schemas = {
+                ("title", "category", "subcategory", "source_folder", "conversion_date", "original_format"): 1
+            }
+        if not shape.vietnamese_lines:
+            shape.vietnamese_lines = ["Căn cứ quy định tại Luật Quản lý thuế và các văn bản hướng dẫn thi hành."]
+        if not shape.english_lines:
+            shape.english_lines = list(shape.vietnamese_lines)
+
+        logger.info(
+            f"Measured corpus shape: {sum(shape.folders.values())} documents in "
+            f"{len(shape.folders)} folders, {len(shape.frontmatter_schemas)} frontmatter schemas, "
+            f"{len(shape.vietnamese_lines)} VI lines / {len(shape.english_lines)} EN lines"
+        )
+        return shape
+
+    @property
+    def total_documents(self) -> int:
+        return sum(self.folders.values())
+
+
+def _split_frontmatter(content: str) -> Tuple[Tuple[str, ...], str]:
+    """Return (frontmatter key tuple, body) for a markdown document."""
+    if not content.startswith("---"):
+        return (), content
+    end = content.find("\n---", 3)
+    if end < 0:
+        return (), content
+    keys = tuple(
+        line.split(":", 1)[0].strip()
+        for line in content[3:end].splitlines()
+        if ":" in line
+    )
+    return keys, content[end + 4:]
+
+
+# ============================================================================
+# GENERATOR
+# ============================================================================
+
+# Issuing bodies and subjects used for synthetic official-letter headers
+_AUTHORITIES = ["TCT-CS", "TCT-KK", "TCT-DNL", "CT-TTHT", "CTHN-TTHT", "CT-THNVDT", "TCHQ-TXNK", "BTC-CST"]
+_CITIES = ["Hà Nội", "TP. Hồ Chí Minh", "Đà Nẵng", "Hải Phòng", "Bình Dương"]
+_SUBJECT_WORDS = [
+    "chính sách thuế", "hoàn thuế GTGT", "thuế TNDN", "ưu đãi thuế", "hóa đơn điện tử",
+    "thuế nhà thầu", "chi phí được trừ", "thuế TNCN", "kê khai thuế", "chuyển nhượng vốn",
+]
+
+
+class SyntheticCorpusGenerator:
+    """
+    Generate synthetic tax corpora that follow a measured CorpusShape.
+
+    Generation is deterministic for a given (shape, seed, size) and streams
+    documents to disk, so memory use stays flat even for 1M documents.
+    """
+
+    PRESETS = {
+        "30k": 30_000,
+        "300k": 300_000,
+        "1m": 1_000_000,
+    }
+
+    def __init__(self, shape: CorpusShape, seed: int = 42):
+        """
+        Initialize SyntheticCorpusGenerator
+
+        Args:
+            shape: Measured shape of the real corpus
+            seed: Random seed (same seed -> same corpus)
+        """
+        self.shape = shape
+        self.seed = seed
+
+        folders = list(shape.folders.items())
+        self._folder_choice = _WeightedChoice([f for f, _ in folders], [c for _, c in folders])
+        self._language_choice = _WeightedChoice(list(shape.languages), list(shape.languages.values()))
+        self._format_choice = _WeightedChoice(list(shape.formats), list(shape.formats.values()))
+        self._schema_choice = _WeightedChoice(
+            list(shape.frontmatter_schemas), list(shape.frontmatter_schemas.values())
+        )
+
+    @classmethod
+    def resolve_size(cls, size: str) -> int:
+        """Translate a preset name ("30k", "300k", "1m") or integer string into a document count."""
+        key = str(size).strip().lower()
+        if key in cls.PRESETS:
+            return cls.PRESETS[key]
+        return int(key.replace("_", ""))
+
+    def generate(
+        self,
+        output_dir: Path,
+        total_documents: int,
+        length_scale: float = 1.0,
+        progress_every: int = 10_000
+    ) -> Dict[str, int]:
+        """
+        Write a synthetic corpus of total_documents documents to output_dir.
+
+        Args:
+            output_dir: Destination memory directory (created if missing)
+            total_documents: Number of documents to generate
+            length_scale: Multiplier applied to sampled document sizes
+                          (use < 1.0 to keep 1M-document corpora small on disk)
+            progress_every: Log progress every N documents
+
+        Returns:
+            Stats dict: documents, bytes, folders, seconds
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        rng = random.Random(self.seed)
+        start_time = time.time()
+
+        logger.info(f"Generating {total_documents:,} synthetic documents into {output_dir}")
+
+        by_category: Counter = Counter()
+        by_language: Counter = Counter()
+        by_format: Counter = Counter()
+        total_bytes = 0
+        created_dirs = set()
+        conversion_date = date.today().isoformat()
+
+        index_path = output_dir / INDEX_FILENAME
+        with open(index_path, "w", encoding="utf-8") as index_file:
+            # Documents are streamed first; metadata/summary are appended once known
+            index_file.write('{\n  "documents": [\n')
+
+            for i in range(total_documents):
+                collection, folder = self._folder_choice.draw(rng)
+                top = folder.split("/", 1)[0]
+                category = self.shape.category_labels.get(top, top.split("_", 1)[-1])
+                subcategory = folder.split("/", 1)[1] if "/" in folder else top
+                language = self._language_choice.draw(rng)
+                original_format = self._format_choice.draw(rng)
+                size_kb = max(0.2, rng.choice(self.shape.sizes_kb) * length_scale)
+
+                doc_id, title, header = self._letter_identity(rng, i)
+                if collection == "past_responses":
+                    language, original_format = "English/Vietnamese", "docx"
+                    category = "Past Advice"
+                    doc_id = f"Synthetic advice {i:07d}"
+                    title = doc_id
+                    header = ""
+
+                frontmatter = self._frontmatter(
+                    rng, title, doc_id, category, subcategory, language,
+                    original_format, conversion_date
+                )
+                body = self._body(rng, int(size_kb * 1024) - len(frontmatter), header, collection)
+                content = frontmatter + body
+
+                target_dir = output_dir / collection / folder
+                if target_dir not in created_dirs:
+                    target_dir.mkdir(parents=True, exist_ok=True)
+                    created_dirs.add(target_dir)
+                filename = f"{doc_id}.md"
+                data = content.encode("utf-8")
+                with open(target_dir / filename, "wb") as f:
+                    f.write(data)
+
+                total_bytes += len(data)
+                by_category[category] += 1
+                by_language[language] += 1
+                by_format[original_format] += 1
+
+                # Index paths mirror the real index: tax_database paths are relative
+                # to tax_database/, past responses keep their collection prefix
+                rel_path = f"{folder}/{filename}" if collection == "tax_database" \
+                    else f"past_responses/{folder}/{filename}"
+                entry = {
+                    "id": doc_id,
+                    "filename": filename,
+                    "path": rel_path,
+                    "category": category,
+                    "subcategory": subcategory,
+                    "language": language,
+                    "original_format": original_format,
+                    "conversion_date": conversion_date,
+                    "file_size_kb": round(len(data) / 1024, 1),
+                    "title": title,
+                }
+                prefix = "    " if i == 0 else ",\n    "
+                index_file.write(prefix + json.dumps(entry, ensure_ascii=False))
+
+                if progress_every and (i + 1) % progress_every == 0:
+                    logger.info(f"  ... {i + 1:,}/{total_documents:,} documents ({total_bytes / 1e6:.0f} MB)")
+
+            index_file.write("\n  ],\n")
+            tail = {
+                "metadata": {
+                    "total_documents": total_documents,
+                    "total_size_gb": round(total_bytes / 1024 ** 3, 2),
+                    "conversion_date": conversion_date,
+                    "synthetic": True,
+                    "seed": self.seed,
+                    "length_scale": length_scale,
+                },
+                "summary": {
+                    "by_category": dict(sorted(by_category.items())),
+                    "by_format": dict(sorted(by_format.items())),
+                    "by_language": dict(sorted(by_language.items())),
+                },
+            }
+            index_file.write(json.dumps(tail, ensure_ascii=False, indent=2)[1:].lstrip("\n"))
+
+        elapsed = time.time() - start_time
+        stats = {
+            "documents": total_documents,
+            "bytes": total_bytes,
+            "folders": len(created_dirs),
+            "seconds": round(elapsed, 1),
+        }
+        logger.info(f"Synthetic corpus complete: {stats}")
+        return stats
+
+    # =========================================================================
+    # DOCUMENT PIECES
+    # =========================================================================
+
+    def _letter_identity(self, rng: random.Random, i: int) -> Tuple[str, str, str]:
+        """Build (doc_id, title, header) for a synthetic official letter (công văn)."""
+        issued = date(rng.randint(2008, 2024), rng.randint(1, 12), rng.randint(1, 28))
+        number = rng.randint(1, 9999)
+        authority = rng.choice(_AUTHORITIES)
+        subject = rng.choice(_SUBJECT_WORDS)
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", authority).strip("_")
+        doc_id = (
+            f"CV_{issued.year}_{issued.month:02d}_{issued.day:02d}_CV_{number}_"
+            f"{issued.strftime('%d%m%Y')}_{slug}_S{i:07d}"
+        )
+        title = doc_id.replace("_", " ")
+        header = (
+            "BỘ TÀI CHÍNH CỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM\n"
+            "TỔNG CỤC THUẾ Độc lập - Tự do - Hạnh phúc\n\n"
+            f"Số: {number}/{authority} {rng.choice(_CITIES)}, ngày {issued.day:02d} "
+            f"tháng {issued.month:02d} năm {issued.year}\n"
+            f"V/v {subject}\n\n"
+        )
+        return doc_id, title, header
+
+    def _frontmatter(
+        self,
+        rng: random.Random,
+        title: str,
+        doc_id: str,
+        category: str,
+        subcategory: str,
+        language: str,
+        original_format: str,
+        conversion_date: str
+    ) -> str:
+        """Render frontmatter using one of the schemas found in the real corpus."""
+        values = {
+            "title": title,
+            "original_title": doc_id,
+            "document_type": "Advice" if category == "Past Advice" else "Document",
+            "reference_number": "N/A",
+            "date_issued": "Unknown",
+            "authority_issued": "Vietnam Tax Authority",
+            "category": category,
+            "subcategory": subcategory,
+            "language": language,
+            "keywords": f"{category}, Regulations, Tax",
+            "source_folder": subcategory,
+            "source": "Past Advices" if category == "Past Advice" else "General Master Resource Folder",
+            "conversion_date": conversion_date,
+            "original_format": original_format,
+            "has_sections": "true",
+            "pages_or_size": f"{rng.randint(1, 40)} pages",
+        }
+        lines = ["---"]
+        for key in self._schema_choice.draw(rng):
+            value = str(values.get(key, "Unknown")).replace('"', "'")
+            lines.append(f'{key}: "{value}"')
+        lines.append("---\n\n")
+        return "\n".join(lines)
+
+    def _body(self, rng: random.Random, target_bytes: int, header: str, collection: str) -> str:
+        """Assemble a body of roughly target_bytes from the real-line bank."""
+        bank = self.shape.english_lines if collection == "past_responses" else self.shape.vietnamese_lines
+        parts = [header] if header else []
+        size = len(header.encode("utf-8"))
+        page = 1
+        while size < target_bytes:
+            line = rng.choice(bank)
+            parts.append(line)
+            size += len(line.encode("utf-8")) + 1
+            # Mirror OCR output: blank-line paragraphs and page markers
+            if rng.random() < 0.08:
+                parts.append("")
+            if collection == "tax_database" and rng.random() < 0.01:
+                page += 1
+                parts.append(f"\n--- PAGE BREAK ---\n\n--- PAGE {page} ---")
+        return "\n".join(parts) + "\n"
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Generate a synthetic tax corpus for scaling tests")
+    parser.add_argument("--memory-path", default=str(DEFAULT_MEMORY_PATH),
+                        help="Real tax_legal memory directory to measure")
+    parser.add_argument("--output", required=True, help="Destination directory for the synthetic corpus")
+    parser.add_argument("--size", default="30k", help="30k, 300k, 1m or an explicit document count")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--length-scale", type=float, default=1.0,
+                        help="Scale sampled document sizes (e.g. 0.25 for a 1M corpus on a laptop)")
+    args = parser.parse_args(argv)
+
+    shape = CorpusShape.from_memory(Path(args.memory_path), seed=args.seed)
+    generator = SyntheticCorpusGenerator(shape, seed=args.seed)
+    stats = generator.generate(
+        Path(args.output),
+        generator.resolve_size(args.size),
+        length_scale=args.length_scale,
+    )
+    print(json.dumps(stats, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,375 @@
+"""
+TreeSnapshot - Cached directory tree of a memory directory
+
+An in-memory trie of the directories under a root, with each directory's
+files (size, mtime) and lazily computed recursive totals. Listings,
+recursive file listings and "directories containing .md files" queries are
+answered from memory instead of os.listdir / os.walk per call.
+
+REFRESH (incremental):
+- apply_paths(paths): re-stat just the given files/directories (called for
+  CorpusWatcher batches and by agent.tools after each write)
+- refresh(): one stat per directory; only directories whose mtime changed
+  (entries added, removed or renamed) are re-listed. In-place edits of an
+  existing file do not change its directory's mtime, so file sizes are only
+  as fresh as the last apply_paths/build for that file
+- build(): full rescan
+
+get_tree_snapshot() attaches the snapshot to the running CorpusWatcher for
+its root if there is one (and catches up with refresh() after the watcher
+restarts); otherwise, including after the watcher stopped or died, it calls
+refresh() at most every TREE_REFRESH_INTERVAL seconds.
+
+Hidden files and directories (".index/", editor swap files) are left out.
+
+USAGE:
+    tree = get_tree_snapshot(memory_path)
+    tree.listdir("tax_database/02_VAT")
+    tree.files("tax_database/02_VAT", suffix=".md")
+    tree.directories_containing(".md", under=["tax_database/02_VAT"])
+"""
+
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.settings import TREE_REFRESH_INTERVAL
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class DirSummary:
+    """Recursive totals of a directory."""
+    file_count: int
+    total_size: int
+    md_count: int
+    latest_mtime_ns: int
+
+
+class _Node:
+    """One directory of the trie."""
+
+    __slots__ = ("name", "parent", "dirs", "files", "mtime_ns", "_summary")
+
+    def __init__(self, name: str, parent: Optional["_Node"]):
+        self.name = name
+        self.parent = parent
+        self.dirs: Dict[str, "_Node"] = {}
+        self.files: Dict[str, Tuple[int, int]] = {}   # name -> (size, mtime_ns)
+        self.mtime_ns = 0
+        self._summary: Optional[DirSummary] = None
+
+    def invalidate(self) -> None:
+        """Drop cached totals of this directory and its ancestors."""
+        node = self
+        while node is not None and node._summary is not None:
+            node._summary = None
+            node = node.parent
+
+    def summary(self) -> DirSummary:
+        if self._summary is None:
+            total = DirSummary(
+                file_count=len(self.files),
+                total_size=sum(size for size, _ in self.files.values()),
+                md_count=sum(1 for name in self.files if name.endswith(".md")),
+                latest_mtime_ns=max((mtime for _, mtime in self.files.values()), default=self.mtime_ns),
+            )
+            for child in self.dirs.values():
+                sub = child.summary()
+                total.file_count += sub.file_count
+                total.total_size += sub.total_size
+                total.md_count += sub.md_count
+                total.latest_mtime_ns = max(total.latest_mtime_ns, sub.latest_mtime_ns)
+            self._summary = total
+        return self._summary
+
+
+def _is_hidden(name: str) -> bool:
+    return name.startswith(".")
+
+
+class TreeSnapshot:
+    """
+    Directory trie of one root, refreshed incrementally.
+
+    Paths are relative to the root with "/" separators ("" = the root).
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        """
+        Initialize TreeSnapshot (scans the whole tree once)
+
+        Args:
+            root: Directory to snapshot
+        """
+        self.root = Path(root).resolve()
+        self._lock = threading.RLock()
+        self._root_node = _Node("", None)
+        self.refreshed_at = 0.0
+        self.watched = False
+        self._watching: Optional[Tuple[object, int]] = None  # (watcher, its start count) the listener follows
+        self.build()
+
+    # =========================================================================
+    # REFRESH
+    # =========================================================================
+
+    def build(self) -> None:
+        """Rescan the whole tree."""
+        start_time = time.time()
+        node = _Node("", None)
+        self._scan(node, self.root, recursive=True)
+        with self._lock:
+            self._root_node = node
+            self.refreshed_at = time.time()
+        summary = node.summary()
+        logger.info(
+            f"Tree snapshot of {self.root}: {summary.file_count} files, "
+            f"{summary.total_size} bytes in {(time.time() - start_time) * 1000:.0f}ms"
+        )
+
+    def refresh(self) -> int:
+        """
+        Re-list directories whose mtime changed.
+
+        Returns:
+            Number of directories re-listed
+        """
+        changed = 0
+        with self._lock:
+            stack = [(self._root_node, self.root)]
+            while stack:
+                node, path = stack.pop()
+                try:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                if mtime_ns != node.mtime_ns:
+                    self._scan(node, path, recursive=False)
+                    changed += 1
+                stack.extend((child, path / name) for name, child in node.dirs.items())
+            self.refreshed_at = time.time()
+        return changed
+
+    def apply_paths(self, paths: Iterable[str]) -> None:
+        """
+        Re-stat changed files or directories (relative paths; missing = removed).
+        """
+        with self._lock:
+            for rel in paths:
+                parts = [p for p in rel.replace(os.sep, "/").split("/") if p]
+                if not parts or any(_is_hidden(p) for p in parts):
+                    continue
+                parent = self._node(parts[:-1], create=True)
+                name = parts[-1]
+                path = self.root.joinpath(*parts)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    parent.files.pop(name, None)
+                    parent.dirs.pop(name, None)
+                    parent.invalidate()
+                    continue
+                if os.path.isdir(path):
+                    parent.files.pop(name, None)
+                    child = parent.dirs.get(name) or _Node(name, parent)
+                    parent.dirs[name] = child
+                    self._scan(child, path, recursive=True)
+                else:
+                    parent.dirs.pop(name, None)
+                    parent.files[name] = (st.st_size, st.st_mtime_ns)
+                parent.invalidate()
+
+    def _scan(self, node: _Node, path: Path, recursive: bool) -> None:
+        """Re-list one directory (and, if recursive, everything below it)."""
+        files: Dict[str, Tuple[int, int]] = {}
+        dirs: Dict[str, _Node] = {}
+        try:
+            node.mtime_ns = os.stat(path).st_mtime_ns
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if _is_hidden(entry.name):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            child = node.dirs.get(entry.name) or _Node(entry.name, node)
+                            dirs[entry.name] = child
+                            if recursive or entry.name not in node.dirs:
+                                self._scan(child, Path(entry.path), recursive=True)
+                        elif entry.is_file():
+                            st = entry.stat()
+                            files[entry.name] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        node.files = files
+        node.dirs = dirs
+        node.invalidate()
+
+    def _node(self, parts: Sequence[str], create: bool = False) -> Optional[_Node]:
+        node = self._root_node
+        for part in parts:
+            child = node.dirs.get(part)
+            if child is None:
+                if not create:
+                    return None
+                child = _Node(part, node)
+                node.dirs[part] = child
+                node.invalidate()
+            node = child
+        return node
+
+    def _lookup(self, rel: str) -> Optional[_Node]:
+        return self._node([p for p in rel.replace(os.sep, "/").split("/") if p and p != "."])
+
+    # =========================================================================
+    # QUERIES
+    # =========================================================================
+
+    def exists(self, rel: str) -> bool:
+        """True if rel is a known directory."""
+        with self._lock:
+            return self._lookup(rel) is not None
+
+    def listdir(self, rel: str = "") -> List[str]:
+        """
+        Sorted names of the directories and files directly in rel.
+
+        Raises:
+            FileNotFoundError: rel is not a known directory
+        """
+        with self._lock:
+            node = self._lookup(rel)
+            if node is None:
+                raise FileNotFoundError(f"Directory not found: {rel}")
+            return sorted([*node.dirs, *node.files])
+
+    def files(self, rel: str = "", suffix: Optional[str] = None, recursive: bool = True) -> List[str]:
+        """
+        Relative paths of files below rel, sorted.
+
+        Args:
+            rel: Directory to list ("" = root)
+            suffix: Keep only names ending with this (e.g. ".md")
+            recursive: Include subdirectories
+        """
+        results: List[str] = []
+        with self._lock:
+            node = self._lookup(rel)
+            if node is None:
+                return []
+            prefix = "/".join(p for p in rel.replace(os.sep, "/").split("/") if p and p != ".")
+            stack = [(node, prefix)]
+            while stack:
+                current, path = stack.pop()
+                for name in current.files:
+                    if suffix is None or name.endswith(suffix):
+                        results.append(f"{path}/{name}" if path else name)
+                if recursive:
+                    stack.extend((child, f"{path}/{name}" if path else name) for name, child in current.dirs.items())
+        return sorted(results)
+
+    def directories_containing(self, suffix: str = ".md", under: Optional[Sequence[str]] = None) -> List[str]:
+        """
+        Relative paths of directories that directly contain a file ending with suffix.
+
+        Args:
+            suffix: File name suffix
+            under: Only search below these directories (None = whole tree)
+        """
+        results = []
+        with self._lock:
+            for base in (under if under is not None else [""]):
+                node = self._lookup(base)
+                if node is None:
+                    continue
+                base = base.strip("/")
+                stack = [(node, base)]
+                while stack:
+                    current, path = stack.pop()
+                    if any(name.endswith(suffix) for name in current.files):
+                        results.append(path)
+                    stack.extend((child, f"{path}/{name}" if path else name) for name, child in current.dirs.items())
+        return sorted(set(results))
+
+    def stat(self, rel: str = "") -> Optional[DirSummary]:
+        """Recursive totals of a directory (None if unknown)."""
+        with self._lock:
+            node = self._lookup(rel)
+            return node.summary() if node is not None else None
+
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+_snapshots: Dict[str, TreeSnapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_tree_snapshot(root: Union[str, Path]) -> TreeSnapshot:
+    """
+    Return the process-wide snapshot of a directory.
+
+    Kept current by the CorpusWatcher for root while one is running, else by
+    refresh() at most every TREE_REFRESH_INTERVAL seconds. The watcher is
+    looked up on every call, so a stopped or dead one is noticed.
+    """
+    key = str(Path(root).resolve())
+    with _snapshots_lock:
+        tree = _snapshots.get(key)
+        if tree is None:
+            tree = TreeSnapshot(key)
+            _snapshots[key] = tree
+    _follow_watcher(tree)
+    if not tree.watched and time.time() - tree.refreshed_at > TREE_REFRESH_INTERVAL:
+        tree.refresh()
+    return tree
+
+
+def note_changed(path: Union[str, Path]) -> None:
+    """Tell every snapshot containing path that it was written or deleted."""
+    full = os.path.abspath(path)
+    for key, tree in list(_snapshots.items()):
+        if full.startswith(key + os.sep):
+            tree.apply_paths([os.path.relpath(full, key)])
+
+
+def _follow_watcher(tree: TreeSnapshot) -> None:
+    # Imported here: the watcher imports the catalog, which does not need the tree
+    from corpus.watcher import get_watcher
+
+    with tree._lock:
+        watcher = get_watcher(tree.root)
+        if watcher is None:
+            # Stopped (or failed to restart): nothing applies changes any more
+            tree.watched = False
+            return
+        if tree._watching == (watcher, watcher.starts):
+            return
+
+        if tree._watching is None or tree._watching[0] is not watcher:
+            def on_batch(batch) -> None:
+                if batch.full_rescan:
+                    tree.build()
+                else:
+                    tree.apply_paths(batch.paths)
+
+            watcher.add_listener(on_batch)
+        tree._watching = (watcher, watcher.starts)
+        tree.watched = True
+        # Catch up on anything that changed before the listener was registered or while
+        # the watcher was down
+        tree.refresh()
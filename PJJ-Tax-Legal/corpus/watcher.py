@@ -0,0 +1,557 @@
+"""
+CorpusWatcher - Keeps the catalog and derived indexes in sync with the memory directory
+
+Files under local-memory/tax_legal change underneath running processes:
+save_approved_response writes new past responses, extraction scripts rewrite
+markdown, sessions are written under users/. The watcher notices changes,
+batches them and:
+
+1. Updates the catalog for changed corpus files (DocumentCatalog.refresh_paths),
+   which bumps the catalog generation. Query caches and the graph/duplicate
+   indexes key on that generation, so they become stale automatically
+2. Pushes the affected doc_ids onto reindex_queue; the Reindexer thread
+   re-indexes just those documents (passages) and incrementally rebuilds
+   the duplicate and citation indexes
+3. Calls registered listeners with every batch (including non-corpus paths)
+
+BACKENDS:
+- inotify (Linux, via ctypes): one watch per directory, no polling cost
+- polling: stat sweep every WATCHER_POLL_INTERVAL seconds (other platforms,
+  or when inotify is unavailable / out of watches)
+
+If the inotify backend fails while running (e.g. the watch limit is hit
+when a new directory appears), the watcher switches to polling and
+re-sweeps the catalog once. If the thread dies anyway, catalog.watched is
+cleared so get_catalog() sweeps again, and get_watcher() restarts it.
+
+Hidden files and directories (".index/catalog.sqlite", editor swap files)
+are ignored, so the watcher never reacts to its own index writes.
+
+While a watcher runs, get_catalog() skips its periodic stat sweep.
+
+USAGE:
+    watcher = start_watcher(memory_path)      # idempotent, process-wide
+    watcher.add_listener(lambda batch: print(batch.paths))
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Add repo root to path
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from agent.logging_config import get_logger
+from corpus.catalog import DocumentCatalog, get_catalog
+from corpus.settings import (
+    DEFAULT_MEMORY_PATH,
+    WATCHER_DEBOUNCE,
+    WATCHER_MAX_DELAY,
+    WATCHER_MODE,
+    WATCHER_MODES,
+    WATCHER_POLL_INTERVAL,
+)
+
+logger = get_logger(__name__)
+
+# inotify constants (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0x00000800
+IN_CLOEXEC = 0x00080000
+
+_WATCH_MASK = (
+    IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ATTRIB
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+@dataclass
+class ChangeBatch:
+    """One debounced batch of filesystem changes."""
+    paths: List[str]                       # Changed paths relative to memory_path (files)
+    full_rescan: bool = False              # Events were lost; the catalog was re-swept
+    generation: int = 0                    # Catalog generation after the batch was applied
+    doc_ids: List[int] = field(default_factory=list)
+
+
+def _is_hidden(rel: str) -> bool:
+    return any(part.startswith(".") for part in rel.split("/"))
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class _InotifyBackend:
+    """Recursive directory watches on a Linux inotify descriptor."""
+
+    name = "inotify"
+
+    def __init__(self, root: Path):
+        libc_name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not libc_name:
+            raise OSError("inotify requires Linux")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.root = root
+        self._dirs: Dict[int, str] = {}          # watch descriptor -> relative dir ("" = root)
+        self._add_tree("")
+
+    def _add_tree(self, rel_dir: str) -> List[str]:
+        """Watch rel_dir and its subdirectories; returns the files found (for dirs created/moved in)."""
+        found = []
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            wd = self._libc.inotify_add_watch(
+                self._fd, os.fsencode(str(self.root / current)), _WATCH_MASK
+            )
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    raise OSError(err, "inotify watch limit reached (fs.inotify.max_user_watches)")
+                continue
+            self._dirs[wd] = current
+            try:
+                with os.scandir(self.root / current) as it:
+                    for entry in it:
+                        rel = f"{current}/{entry.name}" if current else entry.name
+                        if entry.name.startswith("."):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(rel)
+                        else:
+                            found.append(rel)
+            except OSError:
+                continue
+        return found
+
+    def read(self, timeout: float) -> Tuple[Set[str], bool]:
+        """Wait up to timeout for events; returns (changed relative paths, events lost)."""
+        changed: Set[str] = set()
+        overflow = False
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed, overflow
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed, overflow
+
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            raw_name = data[offset + _EVENT_HEADER.size:offset + _EVENT_HEADER.size + length]
+            offset += _EVENT_HEADER.size + length
+            name = os.fsdecode(raw_name.rstrip(b"\0"))
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            parent = self._dirs.get(wd)
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            if parent is None or (mask & (IN_DELETE_SELF | IN_MOVE_SELF)):
+                if mask & IN_MOVE_SELF and parent:
+                    overflow = True          # Files moved out with their directory are not reported
+                continue
+            if not name or name.startswith("."):
+                continue
+
+            rel = f"{parent}/{name}" if parent else name
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    changed.update(self._add_tree(rel))
+                elif mask & IN_MOVED_FROM:
+                    overflow = True
+                continue
+            changed.add(rel)
+        return changed, overflow
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _PollingBackend:
+    """Periodic stat sweep diffed against the previous snapshot."""
+
+    name = "polling"
+
+    def __init__(self, root: Path, interval: float = WATCHER_POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self._snapshot = self._scan()
+        self._stop = threading.Event()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        previous = getattr(self, "_snapshot", {})
+        snapshot = {}
+        stack = [""]
+        while stack:
+            current = stack.pop()
+            try:
+                it = os.scandir(self.root / current)
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.name.startswith("."):
+                        continue
+                    rel = f"{current}/{entry.name}" if current else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(rel)
+                        else:
+                            st = entry.stat(follow_symlinks=False)
+                            snapshot[rel] = (st.st_size, st.st_mtime_ns)
+                    except FileNotFoundError:
+                        continue                 # Deleted since listed: reported as removed
+                    except OSError:
+                        # Transient stat failure: keep the last signature rather
+                        # than reporting the file (or the rest of the directory) as deleted
+                        if rel in previous:
+                            snapshot[rel] = previous[rel]
+        return snapshot
+
+    def read(self, timeout: float) -> Tuple[Set[str], bool]:
+        if self._stop.wait(min(timeout, self.interval)):
+            return set(), False
+        current = self._scan()
+        previous, self._snapshot = self._snapshot, current
+        changed = {rel for rel, sig in current.items() if previous.get(rel) != sig}
+        changed.update(rel for rel in previous if rel not in current)
+        return changed, False
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+# ============================================================================
+# WATCHER
+# ============================================================================
+
+class CorpusWatcher:
+    """
+    Background thread that batches filesystem changes and applies them to the catalog.
+    """
+
+    def __init__(
+        self,
+        memory_path: Path = DEFAULT_MEMORY_PATH,
+        mode: str = WATCHER_MODE,
+        debounce: float = WATCHER_DEBOUNCE,
+        max_delay: float = WATCHER_MAX_DELAY
+    ):
+        """
+        Initialize CorpusWatcher
+
+        Args:
+            memory_path: Root directory to watch (/local-memory/tax_legal/)
+            mode: "auto" (inotify, falling back to polling), "inotify" or "polling"
+            debounce: Flush a batch after this many quiet seconds
+            max_delay: Flush a batch at most this many seconds after its first change
+
+        Raises:
+            ValueError: unknown mode
+        """
+        if mode not in WATCHER_MODES or mode == "off":
+            raise ValueError(f"Invalid watcher mode: {mode} (must be auto, inotify or polling)")
+        self.catalog: DocumentCatalog = get_catalog(memory_path, refresh=False)
+        self.memory_path = self.catalog.memory_path
+        self.mode = mode
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.reindex_queue: "queue.Queue[List[int]]" = queue.Queue()
+        self.batches = 0
+        self.starts = 0  # start() calls: a listener attached before the last one missed the gap
+        self._listeners: List[Callable[[ChangeBatch], None]] = []
+        self._backend = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def backend(self) -> str:
+        return self._backend.name if self._backend else "stopped"
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_listener(self, callback: Callable[[ChangeBatch], None]) -> None:
+        """Call callback(batch) after every applied batch (on the watcher thread)."""
+        self._listeners.append(callback)
+
+    def start(self) -> "CorpusWatcher":
+        if self.running:
+            return self
+        if self._backend:
+            self._backend.close()
+        self._backend = self._open_backend()
+        # Catch up on changes made while nothing was watching, then rely on events
+        self.catalog.refresh()
+        self.catalog.watched = True
+        self._stop.clear()
+        self.starts += 1
+        self._thread = threading.Thread(target=self._run, name="corpus-watcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Corpus watcher started on {self.memory_path} ({self.backend})")
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._backend:
+            self._backend.close()
+        if self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+        self.catalog.watched = False
+        logger.info("Corpus watcher stopped")
+
+    def _open_backend(self):
+        if self.mode in ("auto", "inotify"):
+            try:
+                return _InotifyBackend(self.memory_path)
+            except OSError as e:
+                if self.mode == "inotify":
+                    raise
+                logger.warning(f"inotify unavailable ({e}); polling every {WATCHER_POLL_INTERVAL}s")
+        return _PollingBackend(self.memory_path)
+
+    def _run(self) -> None:
+        try:
+            self._watch()
+        except Exception as e:
+            logger.error(f"Corpus watcher failed: {e}", exc_info=True)
+        finally:
+            if not self._stop.is_set():
+                # Nothing applies changes any more: get_catalog() must sweep again
+                self.catalog.watched = False
+
+    def _watch(self) -> None:
+        pending: Set[str] = set()
+        overflow = False
+        first_change = last_change = 0.0
+        while not self._stop.is_set():
+            try:
+                changed, lost = self._backend.read(self.debounce / 2 if pending or overflow else 1.0)
+            except (OSError, ValueError) as e:
+                if self._stop.is_set():
+                    break
+                if self._backend.name == _PollingBackend.name:
+                    raise
+                # e.g. ENOSPC adding a watch for a new directory: events are
+                # lost from here on, so poll instead and re-sweep once
+                logger.warning(f"{self.backend} backend failed ({e}); polling every {WATCHER_POLL_INTERVAL}s")
+                self._backend.close()
+                self._backend = _PollingBackend(self.memory_path)
+                if not pending and not overflow:
+                    first_change = time.time()
+                overflow = True
+                last_change = time.time()
+                continue
+            changed = {rel for rel in changed if not _is_hidden(rel)}
+            now = time.time()
+            if changed or lost:
+                if not pending and not overflow:
+                    first_change = now
+                pending |= changed
+                overflow = overflow or lost
+                last_change = now
+
+            if (pending or overflow) and (now - last_change >= self.debounce or now - first_change >= self.max_delay):
+                try:
+                    self._flush(sorted(pending), overflow)
+                except Exception as e:
+                    logger.error(f"Failed to apply corpus changes: {e}", exc_info=True)
+                pending, overflow = set(), False
+
+    def _flush(self, paths: List[str], full_rescan: bool) -> ChangeBatch:
+        """Apply one batch to the catalog, queue reindexing and notify listeners."""
+        before = self.catalog.generation
+        if full_rescan:
+            logger.warning("Filesystem events were lost; re-sweeping the catalog")
+            self.catalog.refresh()
+        else:
+            self.catalog.refresh_paths(paths)
+        generation = self.catalog.generation
+
+        doc_ids = []
+        for rel in paths:
+            entry = self.catalog.get(rel)
+            if entry:
+                doc_ids.append(entry.doc_id)
+        if generation != before:
+            self.reindex_queue.put(doc_ids)
+
+        batch = ChangeBatch(paths=paths, full_rescan=full_rescan, generation=generation, doc_ids=doc_ids)
+        self.batches += 1
+        logger.info(
+            f"Corpus change batch: {len(paths)} path(s), {len(doc_ids)} document(s), "
+            f"generation {before} -> {generation}"
+        )
+        for callback in list(self._listeners):
+            try:
+                callback(batch)
+            except Exception as e:
+                logger.warning(f"Corpus watcher listener failed: {e}")
+        return batch
+
+
+class Reindexer:
+    """
+    Drains a watcher's reindex queue: re-indexes passages of changed documents
+    and incrementally rebuilds the duplicate and citation indexes. Stops with
+    the watcher (CorpusWatcher.stop()).
+    """
+
+    def __init__(self, watcher: CorpusWatcher):
+        self.watcher = watcher
+        self.reindexed = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "Reindexer":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="corpus-reindexer", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        # Imported here: the derived indexes import the catalog, not the other way round
+        from corpus.dedup import get_duplicate_index
+        from corpus.passages import get_passage_index
+        from corpus.reference_graph import get_reference_graph
+
+        memory_path = self.watcher.memory_path
+        stop = self.watcher._stop
+        while not stop.is_set():
+            try:
+                doc_ids = self.watcher.reindex_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            # Coalesce everything queued meanwhile into one pass
+            while True:
+                try:
+                    doc_ids = doc_ids + self.watcher.reindex_queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                passages = get_passage_index(memory_path)
+                passages.prune()
+                passages.ensure(set(doc_ids))
+                get_duplicate_index(memory_path)
+                get_reference_graph(memory_path)
+                self.reindexed += len(set(doc_ids))
+            except Exception as e:
+                logger.error(f"Incremental reindex failed: {e}", exc_info=True)
+
+
+# ============================================================================
+# SHARED INSTANCES
+# ============================================================================
+
+_watchers: Dict[str, Tuple[CorpusWatcher, Reindexer]] = {}
+_watchers_lock = threading.Lock()
+
+
+def start_watcher(memory_path: Path = DEFAULT_MEMORY_PATH) -> Optional[CorpusWatcher]:
+    """
+    Start (once per process) the watcher and reindexer for a memory directory.
+
+    Returns:
+        The running watcher, or None if TAX_CORPUS_WATCHER=off
+    """
+    if WATCHER_MODE == "off":
+        return None
+    key = str(Path(memory_path).resolve())
+    with _watchers_lock:
+        if key not in _watchers:
+            watcher = CorpusWatcher(Path(key))
+            _watchers[key] = (watcher, Reindexer(watcher))
+        return _ensure_running(*_watchers[key])
+
+
+def get_watcher(memory_path: Path = DEFAULT_MEMORY_PATH) -> Optional[CorpusWatcher]:
+    """
+    The watcher for a memory directory, or None (does not start a new one).
+
+    A started watcher whose thread died is restarted; one stopped with
+    stop() is not.
+    """
+    with _watchers_lock:
+        entry = _watchers.get(str(Path(memory_path).resolve()))
+        if entry is None or entry[0]._stop.is_set():
+            return None
+        return _ensure_running(*entry)
+
+
+def _ensure_running(watcher: CorpusWatcher, reindexer: Reindexer) -> Optional[CorpusWatcher]:
+    """(Re)start a watcher whose thread is not alive (caller holds _watchers_lock)."""
+    if not watcher.running:
+        if watcher._thread is not None:
+            logger.warning(f"Corpus watcher on {watcher.memory_path} died; restarting")
+        watcher.catalog.watched = False
+        try:
+            watcher.start()
+        except OSError as e:
+            logger.warning(f"Corpus watcher not started: {e}")
+            return None
+    reindexer.start()
+    return watcher
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Watch the memory directory and print change batches")
+    parser.add_argument("--memory-path", default=str(DEFAULT_MEMORY_PATH))
+    parser.add_argument("--mode", default=WATCHER_MODE if WATCHER_MODE != "off" else "auto",
+                        choices=[mode for mode in WATCHER_MODES if mode != "off"])
+    args = parser.parse_args(argv)
+
+    watcher = CorpusWatcher(Path(args.memory_path), mode=args.mode)
+    watcher.add_listener(lambda batch: print(
+        f"generation {batch.generation}: {len(batch.paths)} path(s)"
+        + (" (full rescan)" if batch.full_rescan else "")
+        + "".join(f"\n    {p}" for p in batch.paths[:20])
+    ))
+    watcher.start()
+    print(f"Watching {watcher.memory_path} ({watcher.backend}); Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,6 +18,7 @@ if REPO_ROOT not in sys.path:
     sys.path.insert(0, REPO_ROOT)
 
 from agent import Agent
+from agent.profiling import profile_generate
 
 
 @dataclass
@@ -43,6 +44,13 @@ class BaseAgent:
     - Memory access
     """
 
+    def __init_subclass__(cls, **kwargs):
+        """Wrap each subclass's generate() with the opt-in profiling hook (agent/profiling.py)"""
+        super().__init_subclass__(**kwargs)
+        generate = cls.__dict__.get("generate")
+        if generate is not None and not getattr(generate, "__profiled__", False):
+            cls.generate = profile_generate(generate)
+
     def __init__(self, agent: Agent, memory_path: Path):
         """
         Initialize base agent
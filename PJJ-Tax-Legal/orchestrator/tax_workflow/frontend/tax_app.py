@@ -450,6 +450,17 @@ if st.session_state.workflow_stage == "step_4_review":
                 st.markdown("---")
                 st.markdown(f"**Category:** {d.get('category', 'Unknown')}")
                 st.markdown(f"**Date Issued:** {d.get('date_issued', 'Unknown')}")
+                if d.get("doc_number"):
+                    st.markdown(f"**Document No.:** {d['doc_number']}")
+                if d.get("subject"):
+                    st.markdown(f"**Subject (V/v):** {d['subject']}")
+                if d.get("related_documents"):
+                    st.markdown("**Related (cited / citing):**")
+                    for rel in d["related_documents"]:
+                        label = rel.get("doc_number") or rel.get("filename", "")
+                        st.markdown(f"- {label} ({rel.get('date_issued') or 'undated'})")
+                if d.get("duplicates"):
+                    st.markdown(f"**Also filed as:** {', '.join(d['duplicates'])}")
 
         st.markdown("---")
         # === END CONTENT PREVIEW SECTION ===
@@ -553,6 +564,10 @@ if st.session_state.workflow_stage == "draft_review":
     with col1:
         if st.button("✅ Approve & Finalize", key="btn_approve_draft"):
             st.session_state.cited_response = st.session_state.draft_response or st.session_state.compiled_response
+            # Saves the approved advice as a past response (searchable in Step 2 right away)
+            approval = orchestrator.approve_response(st.session_state.session_id, 'user', st.session_state.request_text, st.session_state.cited_response)
+            if not approval.get("success"):
+                st.warning("Response approved, but it could not be saved to the knowledge base.")
             st.session_state.workflow_stage = "complete"
             st.rerun()
 
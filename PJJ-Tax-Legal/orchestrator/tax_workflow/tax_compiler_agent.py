@@ -23,6 +23,7 @@ sys.path.insert(0, str(REPO_ROOT))
 from agent import Agent
 from orchestrator.agents.base_agent import BaseAgent, AgentResult
 from agent.logging_config import get_logger
+from corpus.dedup import collapse_texts
 
 logger = get_logger(__name__)
 
@@ -218,15 +219,22 @@ The above advice is based on the following source documents:
             )
 
     def _build_context(self, selected_files: List[str], contents: Dict[str, str]) -> str:
-        """Build context from selected files (no token limits)"""
+        """Build context from selected files (no token limits, near-duplicates included once)"""
         context_parts = []
-
-        for filename in selected_files:
-            if filename not in contents:
-                continue
-
-            file_content = contents[filename]
-            context_parts.append(f"[{filename}]\n{file_content}")
+        selected = {filename: contents[filename] for filename in selected_files if filename in contents}
+        unique, duplicates = collapse_texts(selected)
+        if duplicates:
+            logger.info(f"Skipping {len(duplicates)} near-duplicate source(s) in context: {duplicates}")
+
+        also_filed_as: Dict[str, List[str]] = {}
+        for duplicate, kept in duplicates.items():
+            also_filed_as.setdefault(kept, []).append(duplicate)
+
+        for filename, file_content in unique.items():
+            header = f"[{filename}]"
+            if filename in also_filed_as:
+                header += f" (also filed as: {', '.join(also_filed_as[filename])})"
+            context_parts.append(f"{header}\n{file_content}")
 
         return "\n\n---\n\n".join(context_parts)
 
@@ -8,7 +8,7 @@ CRITICAL: Prevents past failures where selections were lost mid-workflow.
 - Single source of truth: TaxPlanningSession holds all boundaries
 - Explicit parameter passing: Every agent receives needed boundaries
 - Constraint enforcement: Every agent validates boundaries before use
-- Single save point: Only _save_approved_response() saves to memory
+- Single save point: Only save_approved_response() saves to memory
 """
 
 import sys
@@ -17,6 +17,7 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 import time
 import json
+import re
 
 # Setup path for imports
 REPO_ROOT = Path(__file__).parent.parent.parent
@@ -31,6 +32,9 @@ from orchestrator.tax_workflow.tax_compiler_agent import TaxResponseCompiler
 # DocumentVerifier REMOVED - User does manual verification
 from orchestrator.tax_workflow.tax_tracker_agent import CitationTracker
 from agent.logging_config import get_logger
+from agent.profiling import profile_workflow_step
+from corpus.publish import atomic_write_text, publish_document
+from corpus.watcher import start_watcher
 
 logger = get_logger(__name__)
 
@@ -159,6 +163,11 @@ class TaxOrchestrator(BaseAgent):
         self.sessions_dir = self.runtime_path / "users"
         self.sessions_dir.mkdir(parents=True, exist_ok=True)
 
+        # Keep catalog, indexes and query caches in sync with files changed
+        # underneath the process (one watcher per process, TAX_CORPUS_WATCHER=off disables)
+        start_watcher(self.memory_path)
+
+    @profile_workflow_step
     def run_workflow(
         self,
         request: str,
@@ -466,12 +475,49 @@ class TaxOrchestrator(BaseAgent):
             "error": ""
         }
 
+    def approve_response(
+        self,
+        session_id: str,
+        user_id: str,
+        request: str,
+        final_response: str
+    ) -> Dict[str, Any]:
+        """
+        USER BOUNDARY (Step 7): Record approval of the final response and save it.
+
+        Args:
+            session_id: Workflow session
+            user_id: Approving user
+            request: Original request (used if the session has to be recreated)
+            final_response: Response text as approved by the user
+
+        Returns:
+            {"success": bool, "past_response_path": str}
+        """
+        session = self._load_or_create_session(session_id, user_id, request)
+        session.response_with_citations = final_response or session.response_with_citations
+        session.approval_status = "approved"
+        session.completion_time = datetime.now().isoformat()
+        saved = self.save_approved_response(session)
+        self._save_session(session)
+        return {
+            "success": saved,
+            "past_response_path": self._past_response_path(session) if saved else "",
+        }
+
     def save_approved_response(self, session: TaxPlanningSession) -> bool:
         """
         SINGLE SAVE POINT: Only location that saves approved responses.
 
         This prevents truncation errors from old system where multiple
         save locations could overwrite each other.
+
+        Write-through: besides the JSON audit record in entities/, the
+        approved advice is published as a markdown past response
+        (past_responses/<category>/) and added to the catalog and passage
+        index in the same transaction, so Step 2 finds it immediately. The
+        record and the publication succeed or fail together: the record is
+        written first and restored if publishing fails.
         """
         try:
             if session.approval_status != "approved":
@@ -500,22 +546,63 @@ class TaxOrchestrator(BaseAgent):
                         "past_responses": [0, 1, 2, 3],
                         "tax_documents": [4, 5, 6, 7, 8, 9, 10, 11]
                     },
-                    "approval_status": session.approval_status
+                    "approval_status": session.approval_status,
+                    "past_response_path": self._past_response_path(session)
                 }
             }
 
             # Create response file (single save point)
             response_file = self.memory_path / "entities" / f"{session.session_id}.json"
-            response_file.parent.mkdir(parents=True, exist_ok=True)
+            previous = response_file.read_text(encoding="utf-8") if response_file.exists() else None
+            atomic_write_text(response_file, json.dumps(response_data, indent=2, ensure_ascii=False))
 
-            with open(response_file, 'w', encoding='utf-8') as f:
-                json.dump(response_data, f, indent=2, ensure_ascii=False)
+            # Markdown rendition last (publish_document undoes its own file and rows on
+            # failure); if it fails, the record is undone too, so neither is left behind
+            try:
+                publish_document(self.memory_path, self._past_response_path(session),
+                                 self._render_past_response(session))
+            except Exception:
+                if previous is None:
+                    response_file.unlink(missing_ok=True)
+                else:
+                    atomic_write_text(response_file, previous)
+                raise
 
             return True
 
-        except Exception:
+        except Exception as e:
+            logger.error(f"Failed to save approved response for session {session.session_id}: {e}", exc_info=True)
             return False
 
+    def _past_response_path(self, session: TaxPlanningSession) -> str:
+        """past_responses/<category dir>/<title>-<session>.md (relative to memory_path)"""
+        category = session.confirmed_categories[0] if session.confirmed_categories else ""
+        category_dir = TaxResponseSearcher.CATEGORY_DIR_MAP.get(category, "17_General_Policies")
+        title = re.sub(r'[\\/:*?"<>|\s]+', " ", session.original_request).strip(" .")[:80].rstrip(" .") or "Approved response"
+        return f"past_responses/{category_dir}/{title}-{session.session_id[:8]}.md"
+
+    def _render_past_response(self, session: TaxPlanningSession) -> str:
+        """Approved response as a past_responses markdown document (same frontmatter as converted advices)"""
+        title = session.original_request.strip().splitlines()[0][:120] if session.original_request.strip() else "Approved response"
+        response = session.response_with_citations or session.synthesized_response
+        frontmatter = {
+            "title": title,
+            "document_type": "Advice",
+            "category": "Tax & Legal Advice",
+            "tax_categories": ", ".join(session.confirmed_categories),
+            "source": "Approved Responses",
+            "session_id": session.session_id,
+            "approved_by": session.user_id,
+            "approval_date": (session.completion_time or datetime.now().isoformat())[:10],
+            "original_format": "workflow",
+        }
+        lines = ["---"]
+        lines += [f"{key}: {json.dumps(value, ensure_ascii=False)}" for key, value in frontmatter.items()]
+        lines += ["---", "", "Request", "", session.original_request.strip(), "", "Advice", "", response.strip()]
+        if session.selected_documents:
+            lines += ["", "Source documents", ""] + [f"- {name}" for name in session.selected_documents]
+        return "\n".join(lines) + "\n"
+
     def _load_or_create_session(
         self,
         session_id: str,
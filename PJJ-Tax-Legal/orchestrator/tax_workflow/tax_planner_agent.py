@@ -29,6 +29,7 @@ if REPO_ROOT not in sys.path:
 from agent import Agent
 from orchestrator.agents.base_agent import BaseAgent, AgentResult
 from agent.logging_config import get_logger, log_agent_call, log_agent_response, log_agent_error, log_json_parsing
+from corpus.keywords import get_keyword_matcher
 
 logger = get_logger(__name__)
 
@@ -215,6 +216,11 @@ class RequestCategorizer(BaseAgent):
         """
         Classify request using keyword matching
 
+        One pass over the request counts every domain keyword. Keywords must
+        start at a word boundary ("tp" no longer matches inside "http",
+        "vat" inside "private"), but may be followed by a suffix so plurals
+        and inflections ("profits", "imported") still count.
+
         Args:
             request_lower: Request text in lowercase
 
@@ -222,13 +228,15 @@ class RequestCategorizer(BaseAgent):
             Dict mapping domain -> confidence score (0-1)
         """
         scores = {}
+        matcher = get_keyword_matcher(
+            (keyword for keywords in self.DOMAIN_KEYWORDS.values() for keyword in keywords),
+            boundary="start"
+        )
+        keyword_counts = matcher.counts(request_lower)
 
         for domain, keywords in self.DOMAIN_KEYWORDS.items():
             # Count keyword matches
-            matches = sum(
-                request_lower.count(keyword)
-                for keyword in keywords
-            )
+            matches = sum(keyword_counts.get(keyword, 0) for keyword in keywords)
 
             # Normalize to 0-1 range (cap at 5 matches = score 1.0)
             score = min(matches / 5, 1.0)
@@ -306,13 +314,14 @@ List the domains in order of relevance."""
         Returns:
             Dict mapping domain -> confidence score (0-1)
         """
-        response_lower = llama_response.lower()
+        # Domain names are matched as whole words ("pit" not inside "capital")
+        matcher = get_keyword_matcher(self.DOMAIN_KEYWORDS.keys(), boundary="word")
+        mentions = matcher.counts(llama_response)
         domains_found = {}
 
         for domain in self.DOMAIN_KEYWORDS.keys():
             # Count mentions of domain name
-            domain_lower = domain.lower()
-            count = response_lower.count(domain_lower)
+            count = mentions.get(domain.lower(), 0)
 
             if count >= 2:
                 # Domain mentioned multiple times - high relevance
@@ -30,6 +30,12 @@ sys.path.insert(0, str(REPO_ROOT))
 from agent import Agent
 from orchestrator.agents.base_agent import BaseAgent, AgentResult
 from agent.logging_config import get_logger
+from corpus.catalog import get_catalog
+from corpus.dedup import get_duplicate_index
+from corpus.passages import format_excerpt, get_passage_index, query_terms
+from corpus.query_cache import get_query_cache
+from corpus.reference_graph import get_reference_graph
+from corpus.tree import get_tree_snapshot
 
 logger = get_logger(__name__)
 
@@ -55,6 +61,8 @@ class FileRecommender(BaseAgent):
 
     # Search constraints
     MAX_NEW_RESULTS = 20
+    MAX_RELATED_DOCUMENTS = 5  # Cited/citing documents attached to each result
+    MAX_EXCERPT_CHARS = 3000  # Passage excerpt attached to each result (compiler context)
 
     # Category to directory mapping (numbered prefixes in actual filesystem)
     CATEGORY_DIR_MAP = {
@@ -116,6 +124,8 @@ class FileRecommender(BaseAgent):
 
         This method returns all subdirectory paths that contain .md files,
         so MemAgent's simple os.chdir() + list_files() pattern works.
+        The folder list comes from the shared tree snapshot (in memory)
+        instead of an os.walk() of every category tree per search.
 
         Args:
             category_dirs: List of category directory paths (e.g., ["/path/tax_database/02_VAT"])
@@ -123,19 +133,19 @@ class FileRecommender(BaseAgent):
         Returns:
             List of all subdirectory paths containing .md files
         """
-        all_dirs = []
-
+        tree = get_tree_snapshot(self.memory_path)
+        existing_dirs = []
         for cat_dir in category_dirs:
-            if not os.path.isdir(cat_dir):
+            rel = Path(os.path.relpath(cat_dir, self.memory_path)).as_posix()
+            if not tree.exists(rel):
                 logger.warning(f"Category directory does not exist: {cat_dir}")
                 continue
+            existing_dirs.append(rel)
+
+        if not existing_dirs:
+            return []
 
-            # Walk through all subdirectories
-            for root, dirs, files in os.walk(cat_dir):
-                # Check if this directory has .md files
-                md_files = [f for f in files if f.endswith('.md')]
-                if md_files:
-                    all_dirs.append(root)
+        all_dirs = [str(self.memory_path / rel) for rel in tree.directories_containing(".md", under=existing_dirs)]
 
         logger.info(f"Pre-flattened {len(category_dirs)} categories into {len(all_dirs)} searchable directories")
         return all_dirs
@@ -228,6 +238,8 @@ class FileRecommender(BaseAgent):
         3. Agent writes Python code using os.chdir() + list_files() + read_file()
         4. Results extracted from execution_results['results']
 
+        Results are cached per (query terms, categories, corpus generation).
+
         Args:
             request: The tax question/request
             categories: User-confirmed tax categories (REQUIRED for search)
@@ -273,6 +285,19 @@ class FileRecommender(BaseAgent):
             memory_base = self.memory_path
             absolute_category_dirs = [str(memory_base / "tax_database" / dir_name) for dir_name in actual_dir_names]
 
+            # Repeated/reworded requests against an unchanged corpus are served from cache.
+            # The agent reads the whole request, so every content word keys it, one-character
+            # ones included ("0%" and "5%" give "0" and "5")
+            cache = get_query_cache()
+            cache_key = cache.make_key(memory_base, "tax_database", query_terms(request, min_length=1), categories,
+                                       get_catalog(memory_base).generation)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                cached.metadata["cache_hit"] = True
+                cached.metadata["search_time_ms"] = int((time.time() - start_time) * 1000)
+                logger.info(f"Served from query cache: {cache.stats()}")
+                return cached
+
             # =====================================================================
             # STEP 1: PRE-FLATTEN DIRECTORIES (Deterministic)
             # =====================================================================
@@ -296,12 +321,15 @@ class FileRecommender(BaseAgent):
                     error=""
                 )
 
-            # Limit directories to prevent context overflow (sample if too many)
+            # Limit directories to prevent context overflow (keep those holding the most cited documents)
             max_dirs = 30  # Limit to prevent overly long prompts
             if len(all_searchable_dirs) > max_dirs:
-                logger.info(f"Sampling {max_dirs} directories from {len(all_searchable_dirs)}")
-                import random
-                all_searchable_dirs = random.sample(all_searchable_dirs, max_dirs)
+                logger.info(f"Keeping {max_dirs} of {len(all_searchable_dirs)} directories, "
+                            f"ranked by their most authoritative document")
+                graph = get_reference_graph(self.memory_path)
+                relative_dirs = [os.path.relpath(d, graph.catalog.memory_path) for d in all_searchable_dirs]
+                ranked = graph.rank_folders(relative_dirs)[:max_dirs]
+                all_searchable_dirs = [str(graph.catalog.memory_path / d) for d in ranked]
 
             # =====================================================================
             # STEP 2: CREATE FRESH AGENT INSTANCE
@@ -382,23 +410,72 @@ Write Python code now that searches these directories and extracts relevant cont
             logger.info(f"Search time: {search_time_ms:.1f}ms")
             logger.info(f"Results found: {len(documents)} documents")
 
-            # Format output
+            # Format output (document facts, citation links, duplicate clusters
+            # and passages come from the catalog indexes, built at index time)
+            catalog = get_catalog(self.memory_path, refresh=False)
+            graph = get_reference_graph(self.memory_path)
+            dedup = get_duplicate_index(self.memory_path)
+            passage_index = get_passage_index(self.memory_path)
+            terms = query_terms(request)
+
+            entries = [catalog.get_by_filename(doc.get("filename", ""), collection="tax_database") for doc in documents]
+            unique, duplicates = dedup.collapse(
+                list(zip(documents, entries)),
+                lambda pair: pair[1].doc_id if pair[1] else None
+            )
+            if len(unique) < len(documents):
+                logger.info(f"Collapsed {len(documents) - len(unique)} near-duplicate results")
+
             formatted_results = []
-            for doc in documents[:self.MAX_NEW_RESULTS]:
+            for position, (doc, entry) in enumerate(unique[:self.MAX_NEW_RESULTS]):
+                related = []
+                copies = [e.filename for _, e in duplicates.get(position, [])]
+                content, highlights = doc.get("content", ""), []
+                if entry:
+                    # Best-scoring passages give the compiler denser context than the agent's excerpt
+                    passages = passage_index.best_passages(entry.doc_id, terms, max_chars=self.MAX_EXCERPT_CHARS)
+                    if passages:
+                        content, highlights = format_excerpt(passages)
+                    seen_clusters = {dedup.canonical(entry.doc_id)}
+                    for doc_id in graph.expand([entry.doc_id], limit=self.MAX_RELATED_DOCUMENTS * 2):
+                        cluster = dedup.canonical(doc_id)
+                        if cluster in seen_clusters:
+                            continue
+                        seen_clusters.add(cluster)
+                        related_entry = catalog.get_by_id(doc_id)
+                        if related_entry:
+                            related.append({
+                                "filename": related_entry.filename,
+                                "doc_number": related_entry.doc_number,
+                                "date_issued": related_entry.issued_date,
+                                "authority_score": round(graph.authority(doc_id), 2),
+                            })
+                        if len(related) >= self.MAX_RELATED_DOCUMENTS:
+                            break
+                    for doc_id in dedup.duplicates(entry.doc_id)[:self.MAX_RELATED_DOCUMENTS]:
+                        copy = catalog.get_by_id(doc_id)
+                        if copy and copy.filename not in copies:
+                            copies.append(copy.filename)
                 formatted_results.append({
                     "filename": doc.get("filename", "Unknown"),
                     "category": doc.get("category", "General"),
-                    "subcategory": doc.get("subcategory", "General"),
-                    "size": doc.get("size", "Unknown"),
-                    "date_issued": doc.get("date_issued", "Unknown"),
-                    "content": doc.get("content", ""),
-                    "summary": doc.get("summary", doc.get("content", "")[:250])
+                    "subcategory": entry.subcategory if entry else doc.get("subcategory", "General"),
+                    "size": f"{entry.size_bytes / 1024:.1f} KB" if entry else doc.get("size", "Unknown"),
+                    "date_issued": (entry.issued_date if entry else "") or doc.get("date_issued", "Unknown"),
+                    "doc_number": entry.doc_number if entry else "",
+                    "issuing_authority": entry.authority if entry else "",
+                    "subject": entry.subject if entry else "",
+                    "related_documents": related,
+                    "duplicates": copies,
+                    "content": content,
+                    "highlights": highlights,
+                    "summary": doc.get("summary", content[:250])
                 })
 
             logger.info(f"Final output: {len(formatted_results)} search results")
             logger.info(f"=== FileRecommender.generate() COMPLETED SUCCESSFULLY ===")
 
-            return AgentResult(
+            result = AgentResult(
                 success=True,
                 output=formatted_results,
                 metadata={
@@ -412,6 +489,10 @@ Write Python code now that searches these directories and extracts relevant cont
                 timestamp=datetime.now().isoformat(),
                 error=""
             )
+            if formatted_results:
+                # An empty agent run may be a transient LLM failure; retry it next time
+                cache.put(cache_key, result)
+            return result
 
         except Exception as e:
             logger.error(f"=== FileRecommender.generate() FAILED ===")
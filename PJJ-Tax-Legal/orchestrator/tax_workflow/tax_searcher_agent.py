@@ -31,6 +31,11 @@ if REPO_ROOT not in sys.path:
 from agent import Agent
 from orchestrator.agents.base_agent import BaseAgent, AgentResult
 from agent.logging_config import get_logger, log_search_query, log_search_results
+from corpus.catalog import get_catalog
+from corpus.dedup import get_duplicate_index
+from corpus.keywords import get_keyword_matcher
+from corpus.passages import format_excerpt, get_passage_index
+from corpus.query_cache import get_query_cache
 
 logger = get_logger(__name__)
 
@@ -50,12 +55,13 @@ class TaxResponseSearcher(BaseAgent):
     HYBRID ARCHITECTURE:
     1. Deterministic: Read all files in category directories (Python code)
     2. Semantic: Use Llama to extract keywords from query
-    3. Deterministic: Filter files containing keywords
-    4. Semantic: Use Llama to extract relevant paragraphs from each file
+    3. Deterministic: Rank files by their best-matching passage (passage index)
+    4. Deterministic: Return each file's best passages with highlight spans
     """
 
     # Search constraints
     MAX_RESULTS = 15
+    MAX_EXCERPT_CHARS = 3000
 
     # Category to directory mapping (numbered prefixes in actual filesystem)
     CATEGORY_DIR_MAP = {
@@ -167,120 +173,75 @@ class TaxResponseSearcher(BaseAgent):
             '0%', '5%', '10%', '20%', 'zero', 'reduced'
         }
 
+        multi_word_terms = {'transfer pricing', 'foreign contractor', 'value added',
+                            'corporate income', 'personal income', 'double taxation'}
+
+        # One word-boundary pass finds every tax term and multi-word term
+        # (including '10%' and 'e-commerce', which the word split below breaks up)
+        matcher = get_keyword_matcher(tax_terms | multi_word_terms, boundary="word")
+        found = matcher.found(query)
+
         # Extract words from query
         import re
         words = re.findall(r'\b[\w%]+\b', query.lower())
 
-        # Filter and prioritize
-        keywords = []
-
         # First add tax terms found in query
-        for word in words:
-            if word in tax_terms and word not in keywords:
-                keywords.append(word)
+        keywords = [term for term in found if term in tax_terms]
 
         # Then add other significant words (length > 3, not stop words)
         for word in words:
             if len(word) > 3 and word not in stop_words and word not in keywords:
                 keywords.append(word)
 
-        # Also check for multi-word terms
-        query_lower = query.lower()
-        multi_word_terms = ['transfer pricing', 'foreign contractor', 'value added',
-                          'corporate income', 'personal income', 'double taxation']
-        for term in multi_word_terms:
-            if term in query_lower:
-                keywords.append(term)
+        # Also add multi-word terms
+        keywords.extend(term for term in found if term in multi_word_terms)
 
         logger.info(f"Extracted keywords from query: {keywords}")
         return keywords[:15]  # Limit to 15 keywords
 
-    def _extract_relevant_paragraphs(self, content: str, keywords: List[str], max_chars: int = 3000) -> str:
-        """
-        Extract paragraphs from content that contain any of the keywords.
-
-        Args:
-            content: The full file content
-            keywords: List of keywords to search for
-            max_chars: Maximum characters to return
-
-        Returns:
-            Extracted relevant paragraphs concatenated
-        """
-        if not content or not keywords:
-            return content[:max_chars] if content else ""
-
-        # Split into paragraphs
-        paragraphs = content.split('\n\n')
-
-        relevant_paragraphs = []
-        total_chars = 0
-
-        content_lower = content.lower()
-
-        for para in paragraphs:
-            para = para.strip()
-            if not para or len(para) < 20:
-                continue
-
-            para_lower = para.lower()
-
-            # Check if paragraph contains any keyword
-            contains_keyword = any(kw.lower() in para_lower for kw in keywords)
-
-            if contains_keyword:
-                if total_chars + len(para) <= max_chars:
-                    relevant_paragraphs.append(para)
-                    total_chars += len(para) + 2  # +2 for newlines
-                else:
-                    # Add partial paragraph if we have room
-                    remaining = max_chars - total_chars
-                    if remaining > 100:
-                        relevant_paragraphs.append(para[:remaining] + "...")
-                    break
-
-        if relevant_paragraphs:
-            return '\n\n'.join(relevant_paragraphs)
-        else:
-            # Fallback: return first max_chars if no keyword matches
-            return content[:max_chars]
-
     def _read_all_files_in_directories(self, directories: List[str]) -> List[Dict[str, Any]]:
         """
         Deterministically read all .md files in the specified directories.
 
+        File listings come from the document catalog, so only the files
+        themselves are touched on disk. Near-duplicate copies are read once:
+        each cluster keeps its first file and lists the rest under 'duplicates'.
+
         Args:
             directories: List of directory paths to search
 
         Returns:
             List of dicts with file info and content
         """
-        import os
         all_files = []
+        memory_base = Path(self.memory_path)
 
+        folders = []
         for dir_path in directories:
             if not os.path.isdir(dir_path):
                 logger.warning(f"Directory does not exist: {dir_path}")
                 continue
+            folders.append(Path(os.path.relpath(dir_path, memory_base)).as_posix())
+
+        entries = get_catalog(memory_base).find(collection=None, folders=folders) if folders else []
+        entries, duplicates = get_duplicate_index(memory_base).collapse(entries, lambda e: e.doc_id)
+
+        for position, entry in enumerate(entries):
+            file_path = str(entry.absolute_path(memory_base))
+            content = self._read_file_content(file_path)
+
+            if content:
+                all_files.append({
+                    'doc_id': entry.doc_id,
+                    'filename': entry.filename,
+                    'directory': os.path.basename(entry.folder),
+                    'full_path': file_path,
+                    'content': content,
+                    'duplicates': [d.filename for d in duplicates.get(position, [])]
+                })
 
-            dir_name = os.path.basename(dir_path)
-
-            for filename in os.listdir(dir_path):
-                if not filename.endswith('.md'):
-                    continue
-
-                file_path = os.path.join(dir_path, filename)
-                content = self._read_file_content(file_path)
-
-                if content:
-                    all_files.append({
-                        'filename': filename,
-                        'directory': dir_name,
-                        'full_path': file_path,
-                        'content': content
-                    })
-
-        logger.info(f"Read {len(all_files)} .md files from {len(directories)} directories")
+        skipped = sum(len(d) for d in duplicates.values())
+        logger.info(f"Read {len(all_files)} .md files from {len(directories)} directories ({skipped} near-duplicates skipped)")
         return all_files
 
     # =========================================================================
@@ -298,8 +259,10 @@ class TaxResponseSearcher(BaseAgent):
         HYBRID ARCHITECTURE:
         1. Deterministic: Read all files in category directories (reliable, no truncation)
         2. Deterministic: Extract keywords from query
-        3. Deterministic: Filter files containing keywords
-        4. Deterministic: Extract relevant paragraphs from matching files
+        3. Deterministic: Rank files by their best-matching passage
+        4. Deterministic: Return the best passages of each matching file
+
+        Results are cached per (query terms, categories, corpus generation).
 
         Args:
             request: The tax question/request
@@ -344,6 +307,20 @@ class TaxResponseSearcher(BaseAgent):
             memory_base = Path(self.memory_path)
             absolute_category_dirs = [str(memory_base / d) for d in category_dirs]
 
+            # Keywords are extracted up front: they are what the search runs with, so they key the cache
+            keywords = self._extract_keywords(request)
+
+            # Repeated/reworded requests against an unchanged corpus are served from cache
+            cache = get_query_cache()
+            cache_key = cache.make_key(memory_base, "past_responses", keywords, categories,
+                                       get_catalog(memory_base).generation)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                cached.metadata["cache_hit"] = True
+                cached.metadata["search_time_ms"] = int((time.time() - start_time) * 1000)
+                logger.info(f"Served from query cache: {cache.stats()}")
+                return cached
+
             # =====================================================================
             # STEP 1: DETERMINISTIC FILE READING
             # =====================================================================
@@ -371,19 +348,16 @@ class TaxResponseSearcher(BaseAgent):
             # STEP 2: EXTRACT KEYWORDS FROM QUERY
             # =====================================================================
             logger.info("=== HYBRID STEP 2: Extracting keywords (deterministic) ===")
-            keywords = self._extract_keywords(request)
             logger.info(f"Keywords extracted: {keywords}")
 
             # =====================================================================
-            # STEP 3: FILTER FILES CONTAINING KEYWORDS
+            # STEP 3: RANK FILES BY BEST-MATCHING PASSAGE
             # =====================================================================
-            logger.info("=== HYBRID STEP 3: Filtering files by keywords ===")
-            matching_files = []
-            for file_info in all_files:
-                content_lower = file_info['content'].lower()
-                # Check if any keyword is in the content
-                if any(kw.lower() in content_lower for kw in keywords):
-                    matching_files.append(file_info)
+            logger.info("=== HYBRID STEP 3: Ranking files by passage score ===")
+            passage_index = get_passage_index(memory_base)
+            files_by_id = {file_info['doc_id']: file_info for file_info in all_files}
+            ranked = passage_index.rank_documents(keywords, doc_ids=list(files_by_id), limit=self.MAX_RESULTS)
+            matching_files = [files_by_id[doc_id] for doc_id, _ in ranked]
 
             logger.info(f"Files matching keywords: {len(matching_files)} out of {len(all_files)}")
 
@@ -393,27 +367,34 @@ class TaxResponseSearcher(BaseAgent):
                 matching_files = sorted(all_files, key=lambda x: len(x['content']), reverse=True)
 
             # =====================================================================
-            # STEP 4: EXTRACT RELEVANT PARAGRAPHS
+            # STEP 4: BEST PASSAGES PER FILE
             # =====================================================================
-            logger.info("=== HYBRID STEP 4: Extracting relevant paragraphs ===")
+            logger.info("=== HYBRID STEP 4: Selecting best passages ===")
             past_responses = []
 
             for file_info in matching_files[:self.MAX_RESULTS]:
-                # Extract relevant paragraphs containing keywords
-                relevant_content = self._extract_relevant_paragraphs(
-                    file_info['content'],
+                passages = passage_index.best_passages(
+                    file_info['doc_id'],
                     keywords,
-                    max_chars=3000
-                )
+                    max_chars=self.MAX_EXCERPT_CHARS
+                ) if ranked else []
+
+                if passages:
+                    relevant_content, highlights = format_excerpt(passages)
+                else:
+                    relevant_content, highlights = file_info['content'][:self.MAX_EXCERPT_CHARS], []
 
                 if relevant_content:
                     past_responses.append({
                         "filename": file_info['filename'],
                         "full_path": file_info['full_path'],
                         "content": relevant_content,
+                        "highlights": highlights,
+                        "pages": sorted({p.page for p in passages if p.page}),
                         "summary": relevant_content[:250] if relevant_content else "No relevant content found",
                         "categories": categories,
                         "files_used": [file_info['filename']],
+                        "duplicates": file_info.get('duplicates', []),
                         "date_created": "Unknown"
                     })
 
@@ -429,23 +410,26 @@ class TaxResponseSearcher(BaseAgent):
                 formatted_results.append({
                     "filename": result.get("filename", "Unknown"),
                     "content": result.get("content", ""),
+                    "highlights": result.get("highlights", []),
+                    "pages": result.get("pages", []),
                     "summary": result.get("summary", ""),
                     "categories": result.get("categories", []),
                     "files_used": result.get("files_used", []),
+                    "duplicates": result.get("duplicates", []),
                     "date_created": result.get("date_created", "Unknown")
                 })
 
             logger.info(f"Final formatted output: {len(formatted_results)} past responses")
             logger.info(f"=== TaxResponseSearcher.generate() COMPLETED SUCCESSFULLY ===")
 
-            return AgentResult(
+            result = AgentResult(
                 success=True,
                 output=formatted_results,
                 metadata={
                     "total_found": len(formatted_results),
                     "search_time_ms": int(search_time_ms),
                     "search_scope": "past_responses",
-                    "search_method": "HYBRID (deterministic file I/O + keyword extraction)",
+                    "search_method": "HYBRID (deterministic file I/O + keyword extraction + passage BM25)",
                     "categories_searched": categories,
                     "keywords_used": keywords,
                     "files_scanned": len(all_files),
@@ -454,6 +438,10 @@ class TaxResponseSearcher(BaseAgent):
                 timestamp=datetime.now().isoformat(),
                 error=""
             )
+            if formatted_results:
+                # Same policy as the recommender: empty results are not cached
+                cache.put(cache_key, result)
+            return result
 
         except Exception as e:
             logger.error(f"=== TaxResponseSearcher.generate() FAILED ===")
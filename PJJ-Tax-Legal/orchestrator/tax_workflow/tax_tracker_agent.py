@@ -13,7 +13,7 @@ CONSTRAINT BOUNDARIES:
 import sys
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import re
 import time
 
@@ -24,6 +24,7 @@ sys.path.insert(0, str(REPO_ROOT))
 from agent import Agent
 from orchestrator.agents.base_agent import BaseAgent, AgentResult
 from agent.logging_config import get_logger
+from corpus.alignment import Claim, ClaimAligner, is_header, render_citations
 
 logger = get_logger(__name__)
 
@@ -33,7 +34,11 @@ class CitationTracker(BaseAgent):
     Step 6b: Embed citations in response
 
     Maps claims to source documents and adds citations
-    in format: "According to [Document] (Section X)..."
+    in format: "claim text [Source: filename]"
+
+    Alignment is local and deterministic (shingle overlap, see
+    corpus/alignment.py); only claims that match several sources about
+    equally well are sent to the LLM, in one batched request.
 
     CONSTRAINT BOUNDARIES:
     - Citation Scope: ONLY cite documents provided in selected_file_contents
@@ -42,9 +47,14 @@ class CitationTracker(BaseAgent):
     - Completeness: Every major claim should have a citation
     """
 
+    # Upper bound on claims sent to the LLM for disambiguation per response
+    MAX_LLM_CLAIMS = 20
+
     def __init__(self, agent: Agent, memory_path: Path):
         super().__init__(agent, memory_path)
         self.agent = agent
+        self._aligner: Optional[ClaimAligner] = None
+        self._alignment_stats: Dict[str, int] = {}
 
     def generate(
         self,
@@ -102,9 +112,10 @@ class CitationTracker(BaseAgent):
                 },
                 metadata={
                     "total_citations": len(citations),
-                    "citation_method": "source_matching_with_embedding",
+                    "citation_method": "local_shingle_alignment",
                     "citation_accuracy": "sources_verified",
-                    "source_only_constraint": True
+                    "source_only_constraint": True,
+                    "alignment": dict(self._alignment_stats),
                 },
                 timestamp=datetime.now().isoformat(),
                 error=""
@@ -133,90 +144,98 @@ class CitationTracker(BaseAgent):
 
     def _embed_citations(self, response: str, sources: Dict[str, str]) -> str:
         """
-        Embed citation references in response using Llama.
+        Embed citation references in response.
 
-        Uses semantic understanding to map claims to sources and add citations
-        in format: "claim text [Source: filename]"
+        Claims are aligned to sources locally; markers are inserted in the
+        format "claim text [Source: filename]" without rewriting the text.
+        Ambiguous claims are resolved by a single batched Llama request.
         """
-        try:
-            # Build source context
-            sources_text = "\n---\n".join(
-                f"[Source: {filename}]\n{content[:500]}"  # First 500 chars per source
-                for filename, content in sources.items()
-            )
-
-            # Ask Llama to add citations to the response
-            prompt = f"""Add citations to this response by mapping each claim to a source document.
-
-RESPONSE TEXT:
-{response}
+        aligner = self._get_aligner(sources)
+        claims = aligner.align(response)
+
+        ambiguous = [c for c in claims if c.status == "ambiguous"]
+        resolved_by_llm = 0
+        if ambiguous:
+            resolved_by_llm = self._resolve_ambiguous_claims(ambiguous[:self.MAX_LLM_CLAIMS], aligner)
+
+        self._alignment_stats = {
+            "claims": sum(1 for c in claims if c.status != "skipped"),
+            "cited": sum(1 for c in claims if c.status == "cited"),
+            "ambiguous": len(ambiguous),
+            "resolved_by_llm": resolved_by_llm,
+            "unsupported": sum(1 for c in claims if c.status in ("unsupported", "ambiguous")),
+        }
+        logger.info(f"Citation alignment: {self._alignment_stats}")
+        return render_citations(response, claims)
+
+    def _resolve_ambiguous_claims(self, claims: List[Claim], aligner: ClaimAligner) -> int:
+        """
+        Ask Llama once which candidate source (if any) supports each ambiguous claim.
 
-AVAILABLE SOURCES:
-{sources_text}
+        Updates claims in place; claims left unresolved stay uncited.
 
-INSTRUCTIONS:
-1. Add [Source: filename] citations after each major claim
-2. Only cite sources that actually support the claim
-3. Keep the original text unchanged, just add citations
-4. Use format: "claim text [Source: filename]"
-5. Only cite from the available sources listed above
+        Returns:
+            Number of claims resolved to a source
+        """
+        blocks = []
+        for number, claim in enumerate(claims, start=1):
+            candidates = "\n".join(
+                f"  - {filename}: \"{aligner.snippet(filename, claim.text)}\""
+                for filename, _score in claim.candidates
+            )
+            blocks.append(f"{number}. CLAIM: {claim.text}\n  CANDIDATES:\n{candidates}")
 
-Rewrite the response with citations added:"""
+        prompt = f"""For each numbered claim, decide which candidate source document supports it.
 
-            logger.debug("Requesting Llama to embed citations...")
-            cited_response = self.agent.generate_response(prompt)
+{chr(10).join(blocks)}
 
-            if not cited_response:
-                logger.warning("Llama returned empty response for citation embedding")
-                return response  # Return original response if Llama fails
+INSTRUCTIONS:
+1. Answer with one line per claim: "<number>: <filename>" or "<number>: none"
+2. Only choose a filename from that claim's candidate list
+3. Answer "none" if no candidate clearly supports the claim
 
-            logger.debug(f"Llama citation embedding successful ({len(cited_response)} chars)")
-            return cited_response
+Answers:"""
 
+        try:
+            logger.debug(f"Requesting Llama to disambiguate {len(claims)} claims...")
+            answer = self.agent.generate_response(prompt) or ""
         except Exception as e:
-            logger.error(f"Error embedding citations with Llama: {e}")
-            # Fallback: return original response without citations
-            logger.warning("Falling back to original response without Llama-embedded citations")
-            return response
+            logger.error(f"Error resolving ambiguous citations with Llama: {e}")
+            return 0
+
+        resolved = 0
+        for match in re.finditer(r"^\s*(\d+)\s*[:.)-]\s*(.+?)\s*$", answer, re.MULTILINE):
+            index = int(match.group(1)) - 1
+            if not 0 <= index < len(claims):
+                continue
+            claim = claims[index]
+            choice = match.group(2).strip().strip("`\"'[]")
+            for filename, _score in claim.candidates:
+                if choice == filename or choice.endswith(filename):
+                    claim.status = "cited"
+                    claim.source = filename
+                    resolved += 1
+                    break
+        return resolved
+
+    def _get_aligner(self, sources: Dict[str, str]) -> ClaimAligner:
+        """Reuse the aligner while the source set is unchanged."""
+        if self._aligner is None or self._aligner.sources is not sources:
+            self._aligner = ClaimAligner(sources)
+        return self._aligner
 
     def _is_header(self, text: str) -> bool:
         """Check if line is a header (should not be cited)"""
-        line = text.strip()
-        return (line.startswith("#") or
-                line.startswith("---") or
-                line.endswith(":") or
-                line.isupper() and len(line) < 30)
+        return is_header(text)
 
-    def _find_matching_source(self, text: str, sources: Dict[str, str]) -> str:
+    def _find_matching_source(self, text: str, sources: Dict[str, str]) -> Optional[str]:
         """
         Find best matching source document for given text.
 
-        Uses word matching: returns source with highest keyword overlap.
+        Uses the shingle index: returns the source that clearly has the
+        highest overlap, or None.
         """
-        text_lower = text.lower()
-        text_words = set(w for w in text_lower.split() if len(w) > 3)
-
-        if not text_words:
-            return None
-
-        best_match = None
-        best_score = 0
-
-        for filename, content in sources.items():
-            content_lower = content.lower()
-
-            # Count matching words between text and source
-            matches = sum(1 for word in text_words if word in content_lower)
-
-            # Calculate match score as percentage of text words found in source
-            score = matches / len(text_words) if text_words else 0
-
-            if score > best_score:
-                best_score = score
-                best_match = filename
-
-        # Return match only if threshold exceeded (30% match)
-        return best_match if best_score > 0.3 else None
+        return self._get_aligner(sources).best_source(text)
 
     def _extract_citations(self, response: str, sources: Dict[str, str]) -> List[Dict[str, Any]]:
         """
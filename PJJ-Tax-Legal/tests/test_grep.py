@@ -0,0 +1,74 @@
+"""
+grep_documents - the literal prefilter must never drop a matching line
+
+Run: python -m pytest tests/test_grep.py
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from corpus.catalog import get_catalog
+from corpus.navigation import grep_documents
+from corpus.passages import MAX_PASSAGE_CHARS
+
+PATTERNS = [
+    r"Tax\ Adminis",
+    r"dated\ CV\ 266",
+    r"5580/TCT",
+    r"\x35580/TCT",
+    r"PAGE\ 2\ ---",
+    r"on\ Agreement",
+    r"(?i)hoàn\ thuế",
+    r"seam\ marker",
+]
+
+
+def _document(n: int) -> str:
+    # Frontmatter, page markers and one line longer than a passage (cut mid-line)
+    long_line = " ".join(["filler"] * (MAX_PASSAGE_CHARS // 7)) + " seam marker " + " ".join(["tail"] * 50)
+    return (
+        "---\n"
+        f"title: Official Letter {n} on Agreement dated CV 266/{n}\n"
+        "category: Tax Administration\n"
+        "---\n"
+        "--- PAGE 1 ---\n"
+        f"Official Letter 5580/TCT-CS number {n}.\n\n"
+        "Hoàn thuế giá trị gia tăng đối với hàng xuất khẩu.\n\n"
+        "--- PAGE 2 ---\n"
+        f"{long_line if n % 2 else 'short body'}\n"
+    )
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    folder = tmp_path / "tax_database" / "08_Tax_Administration" / "Letters"
+    folder.mkdir(parents=True)
+    for n in range(6):
+        (folder / f"CV_{n}.md").write_text(_document(n), encoding="utf-8")
+    get_catalog(tmp_path)
+    return tmp_path
+
+
+def _brute_force(memory_path, pattern):
+    regex = re.compile(pattern)
+    hits = []
+    for path in sorted((memory_path / "tax_database").rglob("*.md")):
+        text = path.read_text(encoding="utf-8")
+        for number, line in enumerate(text.splitlines(keepends=True), start=1):
+            if regex.search(line):
+                hits.append((path.relative_to(memory_path).as_posix(), number))
+    return hits
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_grep_equals_brute_force(corpus, pattern):
+    hits = [(hit["path"], hit["line"]) for hit in grep_documents(corpus, pattern, max_results=200)]
+    assert sorted(hits) == _brute_force(corpus, pattern)
+    assert hits
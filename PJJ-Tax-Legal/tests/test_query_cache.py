@@ -0,0 +1,53 @@
+"""
+Query cache keys - requests that search differently must not share entries
+
+Run: python -m pytest tests/test_query_cache.py
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from corpus.passages import query_terms
+from corpus.query_cache import QueryCache
+from orchestrator.tax_workflow.tax_searcher_agent import TaxResponseSearcher
+
+RATE_REQUESTS = [
+    "VAT rate 5% software export",
+    "VAT rate 0% software export",
+    "VAT rate software export",
+]
+
+
+def _searcher_key(tmp_path, request):
+    keywords = TaxResponseSearcher(None, tmp_path)._extract_keywords(request)
+    return QueryCache.make_key(tmp_path, "past_responses", keywords, ["VAT"], 1)
+
+
+def test_searcher_keys_differ_by_rate(tmp_path):
+    keys = [_searcher_key(tmp_path, request) for request in RATE_REQUESTS]
+    assert len(set(keys)) == len(RATE_REQUESTS)
+
+
+def test_recommender_keys_differ_by_rate(tmp_path):
+    keys = [
+        QueryCache.make_key(tmp_path, "tax_database", query_terms(request, min_length=1), ["VAT"], 1)
+        for request in RATE_REQUESTS
+    ]
+    assert len(set(keys)) == len(RATE_REQUESTS)
+
+
+def test_rate_requests_miss_each_other(tmp_path):
+    cache = QueryCache()
+    first, second = (_searcher_key(tmp_path, request) for request in RATE_REQUESTS[:2])
+    cache.put(first, ["5% results"])
+    assert cache.get(second) is None
+    assert cache.get(first) == ["5% results"]
+
+
+def test_rewording_shares_key(tmp_path):
+    assert _searcher_key(tmp_path, "VAT rate 5% software export") == \
+        _searcher_key(tmp_path, "Software export: VAT RATE 5%")
@@ -1,35 +1,67 @@
 #!/usr/bin/env python3
 """
-Clean Word 97-2003 Binary Markers from Tax Database Files
+Clean Word 97-2003 Binary Residue from Tax Database Files
 
-This script removes Word binary markers and formatting codes from 12 corrupted
-markdown files in the CIT category, while preserving the actual Vietnamese text content.
+Some .doc conversions dumped the Word binary stream into the markdown body:
+'bjbj' FIB markers, long runs of blanked-out control bytes, Word XML/RTF
+fragments and formatting codes around the real Vietnamese text. This script
+finds those files across the whole tax database and rewrites their body with
+the readable text only, keeping the YAML frontmatter.
 
-Affected Files: 12 files with 'bjbjzXzX' markers in 01_CIT category
-Processing: Extract readable text, preserve Vietnamese encoding
-Result: Clean markdown files with proper format
+Detection: a byte-level check (no decoding, no regex) - the file contains a
+'bjbj' marker or a run of SPACE_RUN blanks, which no converted letter has.
+
+Cleaning: one pass of a single precompiled pattern for all markup and codes,
+then str.translate for stray characters and one pass over the lines for
+spacing and filtering - instead of a chain of re.sub calls per file.
+
+Files are checked on a process pool and every outcome is recorded in the
+extraction manifest (stage 'clean'), so a rerun skips files that are
+unchanged since they were found clean or were cleaned.
+
+Usage:
+    python3 clean_word_corrupted_files.py                      # whole tax database (env TAX_DB_BASE)
+    python3 clean_word_corrupted_files.py --db /path/to/tax_database --workers 8
+    python3 clean_word_corrupted_files.py file1.md file2.md --dry-run
 """
 
+import argparse
 import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+
 import yaml
-from pathlib import Path
-
-# List of files to clean
-CORRUPTED_FILES = [
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Deductions_Depreciation/CV_1037_0375_01_01_CV_1037519914_Trich_lap.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Deductions_Depreciation/CV_1256_2568_01_01_CV_12568090915BTCKhong_trich_lap.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/CV_1028_0287_01_01_CV_10287_CTTTHT290915Uu_dai_theo.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/CV_2402_0711_01_12_CV_2402120711TCTChi_phi_thue.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/CV_2405_2012_07_09_CV_2405_09072012TCTChi_phi_thanh.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/CV_3677_0814_01_29_CV_3677290814TCTKhong_an_dinh.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/CV_3677_0814_01_29_CV_3677290814TCTKhong_an_dinh_v1.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/CV_9294_2015_10_13_CV_929413102015CTHCMChi_mua_bao.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/CV_9607_2015_10_23_CV_960723102015CTHCMKhoan_chi_bao.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/Doc_2465_Undated_QD_2465_DinhchinhTT96_2015.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/ND_12_Undated_ND_122015CPHuong_dan_luat.md",
-    "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database/01_CIT/CIT_Miscellaneous/TT_212_Undated_TT_2122015BTCUu_dai_thue.md",
-]
+
+from extraction_manifest import CLEAN, DONE, FAILED, STAGE_CLEAN, ExtractionManifest
+
+CLEANER_VERSION = '2'          # Bump when detection/cleaning changes; recorded files are then rechecked
+CLEANER_ID = f'word-residue-cleaner-{CLEANER_VERSION}'
+DB_BASE = os.environ.get(
+    'TAX_DB_BASE', '/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database'
+)
+WORD_MARKER = b'bjbj'          # Word FIB magic ('bjbj' + 4 bytes) at the start of the binary stream
+SPACE_RUN = b' ' * 128         # Control bytes blanked out by the converter leave runs like this
+MIN_CLEAN_CHARS = 50
+
+# Markup to drop: Word markers to end of line, <?xml ...?>, namespaced tags
+# (<w:...>, <xs:...>), RTF groups and RTF control words
+_MARKUP = re.compile(
+    r'bjbj[^\n]*'
+    r'|<\?xml.*?\?>'
+    r'|<\w+:.*?>'
+    r'|\{\\[a-z]+\d*\s*[^}]*\}'
+    r'|\\[a-z]+\d*\s+'
+)
+# Control characters and markdown/formatting characters (str.translate deletes them)
+_STRAY = dict.fromkeys([*range(0x00, 0x09), 0x0B, 0x0C, *range(0x0E, 0x20), 0x7F, *map(ord, '_*~^`')])
+
+
+def is_corrupted(data: bytes) -> bool:
+    """Byte-level check for Word binary residue."""
+    return WORD_MARKER in data or SPACE_RUN in data
+
 
 def extract_text_from_corrupted(content):
     """
@@ -37,169 +69,152 @@ def extract_text_from_corrupted(content):
 
     Removes:
     - Word binary markers (bjbjzXzX, etc.)
-    - Word formatting codes (rtf-style codes)
-    - Excessive whitespace and control characters
-    - XML/formatting tags
+    - Word XML fragments and RTF-style formatting codes
+    - Control characters and formatting characters
+    - Excessive whitespace (runs collapsed to one space per line)
 
     Preserves:
     - Vietnamese text with diacritics
     - Line breaks between meaningful sections
     """
+    text = _MARKUP.sub('', content).translate(_STRAY)
+    lines = (' '.join(line.split()) for line in text.split('\n'))
+    # Keep lines with letters/digits (non-ASCII covers Vietnamese)
+    return '\n'.join(
+        line for line in lines if line and (not line.isascii() or any(c.isalnum() for c in line))
+    ).strip()
 
-    # Remove Word binary markers
-    text = re.sub(r'bjbjzXzX.*?(?=\n|$)', '', content, flags=re.DOTALL)
-
-    # Remove Word document structure markers
-    text = re.sub(r'<\?xml.*?\?>', '', text)
-    text = re.sub(r'<w:.*?>', '', text)
-    text = re.sub(r'<\w+:.*?>', '', text)
-
-    # Remove RTF-style formatting codes
-    text = re.sub(r'\{\\[a-z]+\d*\s*[^}]*\}', '', text)
-    text = re.sub(r'\\[a-z]+\d*\s+', '', text)
-
-    # Remove multiple spaces (but preserve some line structure)
-    lines = text.split('\n')
-    cleaned_lines = []
 
-    for line in lines:
-        # Remove excessive spaces within lines
-        line = re.sub(r' {2,}', ' ', line)
-        # Remove control characters and formatting markers
-        line = re.sub(r'[\x00-\x08\x0B-\x0C\x0E-\x1F\x7F]', '', line)
-        # Remove standalone formatting codes
-        line = re.sub(r'[_\*\~\^\`]{1,3}', '', line)
-        # Clean up Word formatting artifacts
-        line = re.sub(r'(?<=[a-z])\s+(?=[A-Z])', ' ', line)
-
-        # Keep non-empty lines or lines with Vietnamese characters
-        if line.strip() and (any(ord(c) > 127 for c in line) or any(c.isalnum() for c in line)):
-            cleaned_lines.append(line.strip())
-
-    # Remove excessive blank lines
-    result = '\n'.join(cleaned_lines)
-    result = re.sub(r'\n{3,}', '\n\n', result)
-
-    return result.strip()
-
-def clean_file(file_path):
+def clean_file(file_path, backup=True, dry_run=False):
     """
-    Clean a single corrupted file.
+    Clean a single file if it is corrupted.
 
     Process:
-    1. Parse YAML frontmatter
-    2. Extract text from corrupted body
-    3. Recombine with proper markdown format
-    4. Save backup and update original
-    """
-
-    if not os.path.exists(file_path):
-        return False, f"File not found: {file_path}"
+    1. Byte-level corruption check (clean files are left untouched)
+    2. Parse YAML frontmatter
+    3. Extract text from corrupted body
+    4. Save backup and atomically replace the original
 
+    Returns:
+        (status, message, chars) - status is CLEAN, DONE or FAILED
+    """
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        if not is_corrupted(data):
+            return CLEAN, 'No Word residue', 0
 
-        # Split on first --- delimiter to separate frontmatter from body
+        content = data.decode('utf-8', errors='replace')
         parts = content.split('---\n', 2)
-
         if len(parts) < 3:
-            return False, f"Invalid frontmatter format in {file_path}"
+            return FAILED, 'Invalid frontmatter format', 0
 
-        # Extract YAML frontmatter
         yaml_header = parts[1]
-        corrupted_body = parts[2] if len(parts) > 2 else ''
-
-        # Parse YAML to verify it's valid
         try:
-            metadata = yaml.safe_load(yaml_header)
+            yaml.safe_load(yaml_header)
         except yaml.YAMLError as e:
-            return False, f"YAML parse error: {str(e)}"
+            return FAILED, f'YAML parse error: {str(e)[:200]}', 0
+
+        cleaned_text = extract_text_from_corrupted(parts[2])
+        if len(cleaned_text) < MIN_CLEAN_CHARS:
+            return FAILED, f'Insufficient content extracted (only {len(cleaned_text)} chars)', 0
+        if dry_run:
+            return DONE, f'Would clean - {len(data)} bytes -> {len(cleaned_text)} characters', len(cleaned_text)
+
+        if backup:
+            with open(file_path + '.backup', 'wb') as f:
+                f.write(data)
+        tmp = f'{file_path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(f'---\n{yaml_header}---\n\n{cleaned_text}\n')
+        os.replace(tmp, file_path)
+        return DONE, f'Cleaned - extracted {len(cleaned_text)} characters', len(cleaned_text)
+
+    except Exception as e:
+        return FAILED, f'Error: {str(e)[:200]}', 0
 
-        # Extract readable text from corrupted body
-        cleaned_text = extract_text_from_corrupted(corrupted_body)
 
-        # Only update if we extracted meaningful content
-        if not cleaned_text or len(cleaned_text) < 50:
-            return False, f"Insufficient content extracted (only {len(cleaned_text)} chars)"
+def _clean_task(task: Tuple[str, bool, bool]) -> Tuple[str, str, str, int]:
+    """Worker entry point."""
+    file_path, backup, dry_run = task
+    return (file_path, *clean_file(file_path, backup, dry_run))
 
-        # Reconstruct the markdown file
-        reconstructed = f"---\n{yaml_header}---\n\n{cleaned_text}\n"
 
-        # Save backup
-        backup_path = file_path + '.backup'
-        with open(backup_path, 'w', encoding='utf-8') as f:
-            f.write(content)
+def run_cleaner(tasks: List[Tuple[str, bool, bool]], workers: int) -> Iterator[Tuple[str, str, str, int]]:
+    """Clean tasks on a process pool (in-process for one worker); results in task order."""
+    if workers == 1 or len(tasks) < 2:
+        yield from map(_clean_task, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_clean_task, tasks, chunksize=16)
 
-        # Write cleaned version
-        with open(file_path, 'w', encoding='utf-8') as f:
-            f.write(reconstructed)
 
-        return True, f"Cleaned - extracted {len(cleaned_text)} characters"
+def iter_markdown(root: str) -> Iterator[str]:
+    """Every .md file under root (hidden entries skipped)."""
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith('.md'):
+                        yield entry.path
+        except FileNotFoundError:
+            continue
 
-    except Exception as e:
-        return False, f"Error: {str(e)}"
 
 def main():
     """Main cleanup process."""
+    parser = argparse.ArgumentParser(description='Find and clean Word-binary residue in tax database markdown')
+    parser.add_argument('files', nargs='*', help='Specific files (default: every .md under --db)')
+    parser.add_argument('--db', default=DB_BASE, help='Tax database directory (env TAX_DB_BASE)')
+    parser.add_argument('--workers', type=int, default=None, help='Processes (default: CPU count)')
+    parser.add_argument('--no-backup', action='store_true', help='Do not keep .backup copies of cleaned files')
+    parser.add_argument('--dry-run', action='store_true', help='Report what would be cleaned, change nothing')
+    parser.add_argument('--retry-failed', action='store_true', help='Recheck files that failed last time')
+    args = parser.parse_args()
+
+    print('=' * 80)
+    print('WORD BINARY RESIDUE CLEANUP - TAX DATABASE')
+    print('=' * 80)
+
+    start = time.time()
+    extractions = ExtractionManifest(retry_failed=args.retry_failed)
+    files = [os.path.abspath(p) for p in args.files] if args.files else list(iter_markdown(args.db))
+    pending = [p for p in files if not extractions.is_current(p, STAGE_CLEAN, p, CLEANER_ID)]
+    print(f'\n{len(files)} files, {len(files) - len(pending)} unchanged since last run, {len(pending)} to check\n')
+
+    counts = {CLEAN: 0, DONE: 0, FAILED: 0}
+    failures: List[Tuple[str, str]] = []
+    tasks = [(p, not args.no_backup, args.dry_run) for p in pending]
+    workers = max(1, args.workers or os.cpu_count() or 1)
+    for file_path, status, message, chars in run_cleaner(tasks, workers):
+        counts[status] += 1
+        if status == DONE:
+            print(f'  ✅ {os.path.basename(file_path)}: {message}')
+        elif status == FAILED:
+            failures.append((file_path, message))
+            print(f'  ❌ {os.path.basename(file_path)}: {message}')
+        if not args.dry_run:
+            extractions.record(file_path, STAGE_CLEAN, file_path, CLEANER_ID, status,
+                               chars=chars, error=message if status == FAILED else '')
+
+    print('\n' + '=' * 80)
+    print(f'CLEANUP SUMMARY ({time.time() - start:.1f}s)')
+    print('=' * 80)
+    print(f'Checked: {len(pending)}')
+    print(f'Clean: {counts[CLEAN]}')
+    print(f"{'Would clean' if args.dry_run else 'Cleaned'}: {counts[DONE]} ✅")
+    print(f'Failed: {counts[FAILED]} ❌')
+    if counts[DONE] and not args.dry_run and not args.no_backup:
+        print('\nOriginals kept as <file>.md.backup (to restore: mv file.md.backup file.md)')
+
+    return not failures
 
-    print("=" * 80)
-    print("WORD BINARY MARKER CLEANUP - TAX DATABASE")
-    print("=" * 80)
-    print(f"\nProcessing {len(CORRUPTED_FILES)} corrupted files...\n")
-
-    successful = 0
-    failed = 0
-    results = []
-
-    for i, file_path in enumerate(CORRUPTED_FILES, 1):
-        file_name = os.path.basename(file_path)
-        print(f"[{i}/{len(CORRUPTED_FILES)}] Processing {file_name}...")
-
-        success, message = clean_file(file_path)
-
-        if success:
-            successful += 1
-            status = "✅ SUCCESS"
-            print(f"  {status}: {message}")
-        else:
-            failed += 1
-            status = "❌ FAILED"
-            print(f"  {status}: {message}")
-
-        results.append({
-            'file': file_name,
-            'path': file_path,
-            'status': status,
-            'message': message
-        })
-
-    # Print summary
-    print("\n" + "=" * 80)
-    print("CLEANUP SUMMARY")
-    print("=" * 80)
-    print(f"Total files processed: {len(CORRUPTED_FILES)}")
-    print(f"Successful: {successful} ✅")
-    print(f"Failed: {failed} ❌")
-    print(f"Success rate: {100*successful//len(CORRUPTED_FILES)}%")
-    print("\n" + "=" * 80)
-
-    # Detailed results
-    print("\nDETAILED RESULTS:")
-    print("-" * 80)
-    for result in results:
-        print(f"\n{result['status']} {result['file']}")
-        print(f"  Path: {result['path']}")
-        print(f"  Status: {result['message']}")
-
-    print("\n" + "=" * 80)
-    print("BACKUPS CREATED")
-    print("=" * 80)
-    print("All original files backed up with .backup extension")
-    print("Location: Same directory as original files")
-    print("To restore: mv file.md.backup file.md")
-
-    return successful == len(CORRUPTED_FILES)
 
 if __name__ == '__main__':
     success = main()
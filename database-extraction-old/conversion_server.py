@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Pooled DOC/DOCX → PDF conversion on long-lived LibreOffice processes.
+
+convert_doc_to_pdf used to start `soffice --headless --convert-to pdf` for
+every document: a cold LibreOffice start (profile creation, UNO bootstrap)
+per file, all writing into the shared temp directory. This module keeps a
+small pool of workers, each owning one converter backend, and feeds them
+documents from a queue:
+
+- UnoBackend: one `soffice --accept=socket,...` listener per worker, driven
+  over UNO (loadComponentFromURL + storeToURL). Needs the `uno` module of
+  LibreOffice's Python; conversion cost is the render itself
+- SubprocessBackend: one `soffice --convert-to pdf` per document, but with a
+  persistent per-worker profile so only the first call pays profile creation
+  (used when `uno` is not importable)
+- StubBackend: writes a placeholder PDF without LibreOffice (tests, dry runs)
+
+Every request gets its own output directory (the caller removes it with
+discard(); failed requests leave nothing behind). A backend that raises,
+dies or exceeds the timeout is restarted and the request retried once.
+
+Usage:
+    from conversion_server import get_conversion_server
+
+    result = get_conversion_server().convert('/path/doc.doc')
+    if result.ok:
+        ...                                      # read result.pdf_path
+    result.discard()                             # remove the output directory
+
+    python3 conversion_server.py a.doc b.docx --workers 2
+"""
+
+import atexit
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from queue import Queue
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_TIMEOUT = 120              # Seconds per document
+STARTUP_TIMEOUT = 30               # Seconds for a listener to accept UNO connections
+OUTPUT_PREFIX = 'convert_'
+
+
+@dataclass
+class ConversionResult:
+    """Outcome of one conversion."""
+    source: str
+    pdf_path: str = ''
+    output_dir: str = ''
+    error: str = ''
+    seconds: float = 0.0
+    attempts: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.pdf_path) and not self.error
+
+    def discard(self) -> None:
+        """Remove the request's output directory."""
+        if self.output_dir:
+            shutil.rmtree(self.output_dir, ignore_errors=True)
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class ConversionBackend:
+    """One converter instance owned by one worker thread."""
+
+    name = 'base'
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def kill(self) -> None:
+        """Abort a conversion in progress (called from the watchdog thread)."""
+        self.stop()
+
+    def alive(self) -> bool:
+        return True
+
+    def convert(self, source: str, output_dir: str, timeout: int) -> str:
+        """Convert source into output_dir; returns the PDF path (raises on failure)."""
+        raise NotImplementedError
+
+
+def _pdf_in(output_dir: str, source: str) -> str:
+    pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(source))[0] + '.pdf')
+    if not os.path.exists(pdf_path):
+        raise RuntimeError('no PDF produced')
+    return pdf_path
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class UnoBackend(ConversionBackend):
+    """A headless LibreOffice listener driven over UNO."""
+
+    name = 'uno'
+
+    def __init__(self, soffice: str = 'soffice'):
+        self.soffice = soffice
+        self.process: Optional[subprocess.Popen] = None
+        self.profile_dir = ''
+        self.desktop = None
+
+    def start(self) -> None:
+        import uno
+
+        self.profile_dir = tempfile.mkdtemp(prefix='soffice_profile_')
+        port = _free_port()
+        self.process = subprocess.Popen(
+            [self.soffice, '--headless', '--invisible', '--nologo', '--norestore', '--nodefault',
+             f'-env:UserInstallation=file://{self.profile_dir}',
+             f'--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext('com.sun.star.bridge.UnoUrlResolver', local)
+        deadline = time.time() + STARTUP_TIMEOUT
+        while True:
+            try:
+                context = resolver.resolve(f'uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext')
+                break
+            except Exception:
+                if time.time() > deadline or self.process.poll() is not None:
+                    self.stop()
+                    raise RuntimeError('LibreOffice listener did not start')
+                time.sleep(0.25)
+        self.desktop = context.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop', context)
+
+    def stop(self) -> None:
+        self.desktop = None
+        if self.process and self.process.poll() is None:
+            self.process.kill()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                pass
+        self.process = None
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = ''
+
+    def alive(self) -> bool:
+        return self.desktop is not None and self.process is not None and self.process.poll() is None
+
+    def convert(self, source: str, output_dir: str, timeout: int) -> str:
+        import uno
+        from com.sun.star.beans import PropertyValue
+
+        def prop(name, value):
+            p = PropertyValue()
+            p.Name, p.Value = name, value
+            return p
+
+        pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(source))[0] + '.pdf')
+        doc = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(source)), '_blank', 0, (prop('Hidden', True), prop('ReadOnly', True))
+        )
+        if doc is None:
+            raise RuntimeError('LibreOffice could not open the document')
+        try:
+            doc.storeToURL(uno.systemPathToFileUrl(pdf_path), (prop('FilterName', 'writer_pdf_Export'),))
+        finally:
+            doc.close(True)
+        return _pdf_in(output_dir, source)
+
+
+class SubprocessBackend(ConversionBackend):
+    """soffice --convert-to per document, reusing one warm profile per worker."""
+
+    name = 'subprocess'
+
+    def __init__(self, soffice: str = 'soffice'):
+        self.soffice = soffice
+        self.profile_dir = ''
+        self.process: Optional[subprocess.Popen] = None
+
+    def start(self) -> None:
+        self.profile_dir = tempfile.mkdtemp(prefix='soffice_profile_')
+
+    def stop(self) -> None:
+        self.kill()
+        if self.profile_dir:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = ''
+
+    def kill(self) -> None:
+        process = self.process
+        if process and process.poll() is None:
+            process.kill()
+
+    def alive(self) -> bool:
+        return bool(self.profile_dir)
+
+    def convert(self, source: str, output_dir: str, timeout: int) -> str:
+        self.process = subprocess.Popen(
+            [self.soffice, '--headless', '--norestore', f'-env:UserInstallation=file://{self.profile_dir}',
+             '--convert-to', 'pdf', '--outdir', output_dir, source],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.process.wait(timeout=timeout)
+        finally:
+            self.kill()
+            self.process = None
+        return _pdf_in(output_dir, source)
+
+
+class StubBackend(ConversionBackend):
+    """
+    Fake converter for tests: writes a placeholder PDF.
+
+    Args:
+        delay: Seconds per conversion
+        crash_every: Raise (and report dead) on every Nth conversion, to exercise restarts
+    """
+
+    name = 'stub'
+    starts = 0                       # Class-wide, so tests can count restarts across instances
+
+    def __init__(self, delay: float = 0.0, crash_every: int = 0):
+        self.delay = delay
+        self.crash_every = crash_every
+        self.calls = 0
+        self.running = False
+
+    def start(self) -> None:
+        StubBackend.starts += 1
+        self.running = True
+
+    def stop(self) -> None:
+        self.running = False
+
+    def alive(self) -> bool:
+        return self.running
+
+    def convert(self, source: str, output_dir: str, timeout: int) -> str:
+        self.calls += 1
+        if self.crash_every and self.calls % self.crash_every == 0:
+            self.running = False
+            raise RuntimeError('stub crash')
+        if self.delay:
+            time.sleep(self.delay)
+        pdf_path = os.path.join(output_dir, os.path.splitext(os.path.basename(source))[0] + '.pdf')
+        with open(pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4\n% stub conversion of ' + os.path.basename(source).encode('utf-8') + b'\n%%EOF\n')
+        return pdf_path
+
+
+def default_backend_factory() -> Callable[[], ConversionBackend]:
+    """UnoBackend if LibreOffice's `uno` module is importable, else SubprocessBackend."""
+    try:
+        import uno  # noqa: F401
+        return UnoBackend
+    except ImportError:
+        return SubprocessBackend
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+class ConversionServer:
+    """A pool of worker threads, each with its own backend, fed from one queue."""
+
+    _STOP = object()
+
+    def __init__(self, backend_factory: Optional[Callable[[], ConversionBackend]] = None,
+                 workers: int = DEFAULT_WORKERS, timeout: int = DEFAULT_TIMEOUT, output_root: Optional[str] = None):
+        """
+        Args:
+            backend_factory: Creates one backend per worker (default: UNO if available, else subprocess)
+            workers: Concurrent converters
+            timeout: Seconds per document before the backend is killed and restarted
+            output_root: Parent of the per-request output directories (default: system temp)
+        """
+        self.backend_factory = backend_factory or default_backend_factory()
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.output_root = output_root
+        self.stats = {'converted': 0, 'failed': 0, 'restarts': 0, 'seconds': 0.0}
+        self._stats_lock = threading.Lock()
+        self._queue: Queue = Queue()
+        self._threads: List[threading.Thread] = []
+        self._closed = False
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f'convert-{n}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, source: str) -> 'Future[ConversionResult]':
+        """Queue a conversion; the future resolves to a ConversionResult (never raises)."""
+        if self._closed:
+            raise RuntimeError('conversion server is closed')
+        future: Future = Future()
+        self._queue.put((source, future))
+        return future
+
+    def convert(self, source: str) -> ConversionResult:
+        """Convert one document and wait for it."""
+        return self.submit(source).result()
+
+    def close(self) -> None:
+        """Stop the workers and their office processes."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put(self._STOP)
+        for thread in self._threads:
+            thread.join(timeout=self.timeout)
+
+    def __enter__(self) -> 'ConversionServer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _work(self) -> None:
+        backend: Optional[ConversionBackend] = None
+        try:
+            while True:
+                request = self._queue.get()
+                if request is self._STOP:
+                    return
+                source, future = request
+                if not future.set_running_or_notify_cancel():
+                    continue
+                result = ConversionResult(source=source)
+                start = time.time()
+                for attempt in (1, 2):
+                    result.attempts = attempt
+                    if backend is None or not backend.alive():
+                        backend = self._restart(backend)
+                        if backend is None:
+                            result.error = 'converter failed to start'
+                            break
+                    result.discard()
+                    result.output_dir = tempfile.mkdtemp(prefix=OUTPUT_PREFIX, dir=self.output_root)
+                    watchdog = threading.Timer(self.timeout, backend.kill)
+                    watchdog.start()
+                    try:
+                        result.pdf_path = backend.convert(source, result.output_dir, self.timeout)
+                        result.error = ''
+                        break
+                    except Exception as e:
+                        result.error = str(e)[:200] or type(e).__name__
+                        # Assume the office process is in a bad state: restart before the retry
+                        backend = self._restart(backend)
+                    finally:
+                        watchdog.cancel()
+                if not result.ok:
+                    result.discard()
+                    result.output_dir = result.pdf_path = ''
+                result.seconds = time.time() - start
+                with self._stats_lock:
+                    self.stats['converted' if result.ok else 'failed'] += 1
+                    self.stats['seconds'] += result.seconds
+                if not result.ok:
+                    logger.warning(f'Conversion failed for {source}: {result.error}')
+                future.set_result(result)
+        finally:
+            if backend is not None:
+                backend.stop()
+
+    def _restart(self, backend: Optional[ConversionBackend]) -> Optional[ConversionBackend]:
+        if backend is not None:
+            backend.stop()
+            with self._stats_lock:
+                self.stats['restarts'] += 1
+        backend = self.backend_factory()
+        try:
+            backend.start()
+            return backend
+        except Exception as e:
+            logger.error(f'Could not start {backend.name} converter: {e}')
+            return None
+
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+_server: Optional[ConversionServer] = None
+_server_lock = threading.Lock()
+
+
+def get_conversion_server(workers: int = DEFAULT_WORKERS, timeout: int = DEFAULT_TIMEOUT) -> ConversionServer:
+    """Process-wide server (created on first use; arguments apply to that first call)."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ConversionServer(workers=workers, timeout=timeout)
+            # Workers are daemon threads: without this their office listeners outlive the process
+            atexit.register(close_conversion_server)
+        return _server
+
+
+def close_conversion_server() -> None:
+    """Close the process-wide server (if any); the next get_conversion_server() starts a new one."""
+    global _server
+    with _server_lock:
+        server, _server = _server, None
+    if server is not None:
+        server.close()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert DOC/DOCX files to PDF on a LibreOffice pool')
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT)
+    parser.add_argument('--stub', action='store_true', help='Use the stub backend (no LibreOffice)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    factory = StubBackend if args.stub else None
+    with ConversionServer(factory, workers=args.workers, timeout=args.timeout) as server:
+        futures: Dict[str, Future] = {path: server.submit(path) for path in args.files}
+        for path, future in futures.items():
+            result = future.result()
+            status = f'✅ {result.pdf_path}' if result.ok else f'❌ {result.error}'
+            print(f'{os.path.basename(path)}: {status} ({result.seconds:.1f}s)')
+        print(f"\n📊 {server.stats['converted']} converted, {server.stats['failed']} failed, "
+              f"{server.stats['restarts']} restarts")
+
+
+if __name__ == '__main__':
+    main()
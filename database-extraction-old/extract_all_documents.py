@@ -5,6 +5,10 @@ Master document extraction script:
 2. Converts DOC to DOCX using FreeConvert API, then extracts
 3. Identifies scanned PDFs for OCR.SPACE processing
 4. Populates markdown files with extracted content
+
+Progress is kept in the extraction manifest (extraction_manifest.py): a rerun
+only extracts sources that are new, whose content changed, or whose
+extractor version changed.
 """
 
 import re
@@ -29,10 +33,24 @@ except ImportError:
     subprocess.check_call([sys.executable, "-m", "pip", "install", "python-docx", "-q"])
     from docx import Document
 
+import docx
+from extraction_manifest import DONE, FAILED, NEEDS_OCR, STAGE_TEXT, ExtractionManifest
+
 
 class TextExtractor:
     """Extract text from various document formats."""
 
+    VERSION = "1"  # Bump when the extraction logic below changes
+
+    @staticmethod
+    def extractor_for(file_path: Path) -> str:
+        """Extractor id recorded in the manifest (library + version) for a source file."""
+        if file_path.suffix.lower() == ".pdf":
+            library = f"pdfplumber-{getattr(pdfplumber, '__version__', '?')}"
+        else:
+            library = f"python-docx-{getattr(docx, '__version__', '?')}"
+        return f"{library}/{TextExtractor.VERSION}"
+
     @staticmethod
     def extract_from_docx(file_path: Path) -> str:
         """Extract text from DOCX file."""
@@ -150,13 +168,15 @@ class MarkdownProcessor:
 class ExtractionPipeline:
     """Orchestrate the extraction process."""
 
-    def __init__(self):
+    def __init__(self, extractions: Optional[ExtractionManifest] = None):
         self.tax_db_path = Path(
             "/Users/teije/Desktop/memagent-modular-fixed/local-memory/tax_legal/tax_database"
         )
+        self.extractions = extractions or ExtractionManifest()
         self.stats = {
             "total": 0,
             "already_populated": 0,
+            "unchanged": 0,
             "docx_extracted": 0,
             "doc_skipped": 0,
             "pdf_text_extracted": 0,
@@ -172,34 +192,50 @@ class ExtractionPipeline:
 
         for md_file in sorted(self.tax_db_path.rglob("*.md")):
             self.stats["total"] += 1
+            entry = self.extractions.get(str(md_file), STAGE_TEXT)
 
-            if not MarkdownProcessor.is_metadata_only(md_file):
-                self.stats["already_populated"] += 1
-                continue
-
-            # Get source file path
-            relative_path = MarkdownProcessor.parse_metadata_file(md_file)
-            if not relative_path:
-                self.stats["failed"] += 1
-                self.stats["failed_files"].append(str(md_file.name))
-                continue
+            if entry:
+                # Seen before: the manifest knows the source, no need to re-read the markdown
+                source_path = Path(entry.source)
+            else:
+                # Files populated before the manifest existed are left alone
+                if not MarkdownProcessor.is_metadata_only(md_file):
+                    self.stats["already_populated"] += 1
+                    continue
+
+                # Get source file path
+                relative_path = MarkdownProcessor.parse_metadata_file(md_file)
+                if not relative_path:
+                    self.stats["failed"] += 1
+                    self.stats["failed_files"].append(str(md_file.name))
+                    continue
 
-            source_path = MarkdownProcessor.SOURCE_BASE / relative_path
+                source_path = MarkdownProcessor.SOURCE_BASE / relative_path
 
-            # Handle path case sensitivity issues
-            if not source_path.exists():
-                parent = source_path.parent
-                if parent.exists():
-                    for item in parent.iterdir():
-                        if item.name.lower() == source_path.name.lower():
-                            source_path = item
-                            break
+                # Handle path case sensitivity issues
+                if not source_path.exists():
+                    parent = source_path.parent
+                    if parent.exists():
+                        for item in parent.iterdir():
+                            if item.name.lower() == source_path.name.lower():
+                                source_path = item
+                                break
 
             if not source_path.exists():
                 self.stats["failed"] += 1
                 self.stats["failed_files"].append(str(md_file.name))
                 continue
 
+            # Same source content, same extractor: nothing to do
+            if entry and self.extractions.is_current(
+                str(md_file), STAGE_TEXT, str(source_path), TextExtractor.extractor_for(source_path)
+            ):
+                self.stats["unchanged"] += 1
+                if entry.status == NEEDS_OCR:
+                    # Keep the OCR work list complete; the OCR scripts skip what they already did
+                    self.scanned_pdfs.append((str(source_path), str(md_file)))
+                continue
+
             # Process based on file type
             suffix = source_path.suffix.lower()
 
@@ -212,6 +248,12 @@ class ExtractionPipeline:
 
         return self.stats
 
+    def _record(self, source_path: Path, md_file: Path, status: str, chars: int = 0):
+        """Record the outcome for one markdown file in the extraction manifest."""
+        self.extractions.record(
+            str(md_file), STAGE_TEXT, str(source_path), TextExtractor.extractor_for(source_path), status, chars=chars
+        )
+
     def _process_docx(self, source_path: Path, md_file: Path):
         """Process DOCX file."""
         text = TextExtractor.extract_from_docx(source_path)
@@ -219,6 +261,7 @@ class ExtractionPipeline:
         if text and len(text) > 50:
             if MarkdownProcessor.update_markdown_file(md_file, text):
                 self.stats["docx_extracted"] += 1
+                self._record(source_path, md_file, DONE, len(text))
                 print(f"  ✅ DOCX: {md_file.name} ({len(text)} bytes)")
             else:
                 self.stats["failed"] += 1
@@ -226,6 +269,7 @@ class ExtractionPipeline:
         else:
             self.stats["failed"] += 1
             self.stats["failed_files"].append(str(md_file.name))
+            self._record(source_path, md_file, FAILED)
 
     def _process_doc(self, source_path: Path, md_file: Path):
         """Process old DOC file."""
@@ -234,11 +278,13 @@ class ExtractionPipeline:
         if text and len(text) > 50:
             if MarkdownProcessor.update_markdown_file(md_file, text):
                 self.stats["docx_extracted"] += 1
+                self._record(source_path, md_file, DONE, len(text))
                 print(f"  ✅ DOC→DOCX: {md_file.name} ({len(text)} bytes)")
             else:
                 self.stats["failed"] += 1
         else:
             self.stats["doc_skipped"] += 1
+            self._record(source_path, md_file, FAILED)
 
     def _process_pdf(self, source_path: Path, md_file: Path):
         """Process PDF file."""
@@ -248,20 +294,28 @@ class ExtractionPipeline:
             # Track for OCR.SPACE
             self.stats["pdf_scanned_needs_ocr"] += 1
             self.scanned_pdfs.append((str(source_path), str(md_file)))
+            self._record(source_path, md_file, NEEDS_OCR)
             print(f"  📋 SCANNED PDF (needs OCR): {md_file.name}")
         else:
             # Has extractable text
             if text and len(text) > 50:
                 if MarkdownProcessor.update_markdown_file(md_file, text):
                     self.stats["pdf_text_extracted"] += 1
+                    self._record(source_path, md_file, DONE, len(text))
                     print(f"  ✅ PDF: {md_file.name} ({len(text)} bytes)")
                 else:
                     self.stats["failed"] += 1
             else:
                 self.stats["failed"] += 1
+                self._record(source_path, md_file, FAILED)
 
     def save_ocr_manifest(self):
-        """Save list of scanned PDFs for OCR processing."""
+        """
+        Save list of scanned PDFs for OCR processing.
+
+        OCR progress lives in the extraction manifest, so the `processed`
+        flags written here are only informational.
+        """
         manifest_path = Path(
             "/Users/teije/Desktop/memagent-modular-fixed/ocr_manifest.json"
         )
@@ -302,6 +356,7 @@ def main():
     print(f"{'='*70}")
     print(f"Total files:              {stats['total']}")
     print(f"Already populated:        {stats['already_populated']}")
+    print(f"Unchanged since last run: {stats['unchanged']}")
     print(f"")
     print(f"✅ DOCX extracted:        {stats['docx_extracted']}")
     print(f"⏭️  DOC format (skipped):  {stats['doc_skipped']}")
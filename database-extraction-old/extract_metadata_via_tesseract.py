@@ -18,23 +18,31 @@ Categories to extract:
 - Other: 282 files (~2 hours)
 
 Total: 1,066 files (~7.7 hours serial, ~5.5 hours parallel)
+
+Reruns: every extraction is recorded in the extraction manifest
+(extraction_manifest.py), so only files whose source is new or changed, or
+whose extractor settings changed, are processed again.
 """
 
 import os
 import sys
 import json
 import yaml
-import pytesseract
-import subprocess
-import tempfile
+import shutil
 import time
 from pathlib import Path
-from pdf2image import convert_from_path
-from PIL import Image
 from docx import Document
 import logging
 import datetime
 
+# Shared directory tree snapshot (PJJ-Tax-Legal/corpus/tree.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PJJ-Tax-Legal'))
+from corpus.tree import get_tree_snapshot
+from conversion_server import close_conversion_server, get_conversion_server
+from extraction_manifest import DONE, FAILED, STAGE_OCR, ExtractionManifest
+from ocr_engine import ParallelOCREngine, TesseractBackend
+from source_index import SourceIndex
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -77,12 +85,18 @@ CATEGORIES = {
 class TesseractExtractor:
     """Extracts text from documents using Tesseract OCR."""
 
-    def __init__(self):
+    def __init__(self, workers=None, extractions=None):
+        # Pages of all queued PDFs are OCR'd on a process pool (None = all cores)
+        self.ocr_engine = ParallelOCREngine(TesseractBackend(lang=TESSERACT_LANG), workers=workers, dpi=DPI)
+        self.extractions = extractions or ExtractionManifest()
+        self.extractor = self.ocr_engine.extractor_id(page_markers=True)
+        self._source_index = None
         self.stats = {
             'total_processed': 0,
             'successful': 0,
             'failed': 0,
             'skipped': 0,
+            'unchanged': 0,
             'total_chars': 0,
         }
         self.manifest = {
@@ -93,52 +107,30 @@ class TesseractExtractor:
         }
 
     def extract_pdf_tesseract(self, pdf_path):
-        """Extract text from PDF using Tesseract OCR."""
-        try:
-            # Convert PDF to images
-            images = convert_from_path(pdf_path, dpi=DPI)
-
-            all_text = []
-            for page_num, image in enumerate(images, 1):
-                try:
-                    # Extract text using Tesseract
-                    text = pytesseract.image_to_string(image, lang=TESSERACT_LANG)
-                    if text.strip():
-                        all_text.append(f"--- PAGE {page_num} ---\n{text}")
-                except Exception as e:
-                    logger.warning(f"Failed to extract page {page_num} from {pdf_path}: {e}")
-                    continue
-
-            combined_text = '\n\n--- PAGE BREAK ---\n\n'.join(all_text)
-            return combined_text if combined_text.strip() else None
-
-        except Exception as e:
-            logger.error(f"PDF extraction failed for {pdf_path}: {e}")
+        """Extract text from PDF using Tesseract OCR (pages in parallel)."""
+        doc = self.ocr_engine.ocr_document(pdf_path)
+        if doc.error:
+            logger.error(f"PDF extraction failed for {pdf_path}: {doc.error}")
             return None
+        combined_text = doc.text(page_markers=True)
+        return combined_text if combined_text.strip() else None
 
     def convert_doc_to_pdf(self, doc_path):
-        """Convert DOC file to PDF using LibreOffice."""
-        try:
-            pdf_path = tempfile.mktemp(suffix='.pdf')
-            cmd = [
-                'soffice',
-                '--headless',
-                '--convert-to', 'pdf',
-                '--outdir', tempfile.gettempdir(),
-                doc_path
-            ]
-            result = subprocess.run(cmd, capture_output=True, timeout=30)
-
-            if result.returncode == 0:
-                # LibreOffice outputs to same dir with .pdf extension
-                expected_pdf = doc_path.rsplit('.', 1)[0] + '.pdf'
-                if os.path.exists(expected_pdf):
-                    return expected_pdf
+        """
+        Convert DOC/DOCX file to PDF on the shared LibreOffice conversion pool.
 
+        Returns: PDF path in its own temp directory (remove with discard_converted), or None
+        """
+        result = get_conversion_server(timeout=TIMEOUT).convert(doc_path)
+        if not result.ok:
+            logger.error(f"DOC to PDF conversion failed for {doc_path}: {result.error}")
             return None
-        except Exception as e:
-            logger.error(f"DOC to PDF conversion failed for {doc_path}: {e}")
-            return None
+        return result.pdf_path
+
+    @staticmethod
+    def discard_converted(pdf_path):
+        """Remove a converted PDF and its per-conversion directory."""
+        shutil.rmtree(os.path.dirname(pdf_path), ignore_errors=True)
 
     def extract_docx_python(self, docx_path):
         """Try to extract text from DOCX using python-docx."""
@@ -155,47 +147,50 @@ class TesseractExtractor:
         pdf_path = self.convert_doc_to_pdf(docx_path)
         if pdf_path:
             text = self.extract_pdf_tesseract(pdf_path)
-            try:
-                os.remove(pdf_path)
-            except:
-                pass
+            self.discard_converted(pdf_path)
             return text
         return None
 
-    def extract_content(self, source_path):
+    def resolve_ocr_input(self, source_path):
         """
-        Extract content from source document based on file type.
+        Decide how a source document is extracted.
 
-        Returns: extracted text or None if failed
+        Returns: (text, pdf_path, is_temp_pdf) - text is set when no OCR is
+        needed (DOCX with a usable text layer), otherwise pdf_path is the PDF
+        to OCR (None if conversion failed or the type is unsupported)
         """
         ext = source_path.lower().split('.')[-1]
 
         if ext == 'pdf':
-            return self.extract_pdf_tesseract(source_path)
+            return None, source_path, False
 
-        elif ext == 'doc':
-            # Convert DOC to PDF then extract
-            pdf_path = self.convert_doc_to_pdf(source_path)
-            if pdf_path:
-                text = self.extract_pdf_tesseract(pdf_path)
-                try:
-                    os.remove(pdf_path)
-                except:
-                    pass
-                return text
-            return None
-
-        elif ext == 'docx':
+        if ext == 'docx':
             # Try python-docx first, then fallback to PDF conversion
             text = self.extract_docx_python(source_path)
             if text and len(text) > 100:
-                return text
-            # Fallback to conversion
-            return self.extract_docx_tesseract(source_path)
+                return text, None, False
 
-        else:
-            logger.warning(f"Unsupported file type: {ext}")
-            return None
+        if ext in ('doc', 'docx'):
+            # Convert DOC/DOCX to PDF then OCR
+            pdf_path = self.convert_doc_to_pdf(source_path)
+            return None, pdf_path, bool(pdf_path)
+
+        logger.warning(f"Unsupported file type: {ext}")
+        return None, None, False
+
+    def extract_content(self, source_path):
+        """
+        Extract content from source document based on file type.
+
+        Returns: extracted text or None if failed
+        """
+        text, pdf_path, is_temp = self.resolve_ocr_input(source_path)
+        if text or not pdf_path:
+            return text
+        text = self.extract_pdf_tesseract(pdf_path)
+        if is_temp:
+            self.discard_converted(pdf_path)
+        return text
 
     def update_markdown(self, md_path, content):
         """Update markdown file with extracted content."""
@@ -220,11 +215,19 @@ class TesseractExtractor:
             logger.error(f"Failed to update markdown {md_path}: {e}")
             return False
 
+    @property
+    def source_index(self):
+        """Index of SOURCE_BASE, built on first use (one walk for the whole run)."""
+        if self._source_index is None:
+            self._source_index = SourceIndex(SOURCE_BASE)
+            logger.info(f"Indexed {len(self._source_index)} source files in {self._source_index.build_seconds:.1f}s")
+        return self._source_index
+
     def find_source_document(self, markdown_path):
         """Find source document path from markdown frontmatter.
 
-        Strategy: Extract base name from markdown and search entire source tree
-        for files with matching name regardless of metadata quality.
+        Strategy: Extract base name from markdown and look it up in the source
+        index (basename and number-token maps) regardless of metadata quality.
         """
         try:
             with open(markdown_path, 'r', encoding='utf-8') as f:
@@ -242,45 +245,11 @@ class TesseractExtractor:
                 if not original_format or original_format not in ['pdf', 'doc', 'docx']:
                     return None
 
-                # Get markdown filename as search pattern
+                # Get markdown filename as search pattern; the index matches files like
+                # "CV_5367_Ke_khai.pdf" to "CV_2023_11_30_CV_5367_30112023_TCT_Ke_khai" by
+                # contained base name or shared number sequences
                 md_filename = os.path.basename(markdown_path).replace('.md', '')
-
-                # Extract the core filename (without date prefixes like "CV_2023_11_30_")
-                # This helps find files like "CV_5367_30112023_TCT_Ke_khai"
-                # when source is "CV_5367_Ke_khai.pdf"
-                md_parts = md_filename.split('_')
-
-                # Search entire source tree for matching files
-                if not os.path.exists(SOURCE_BASE):
-                    return None
-
-                for root, dirs, files in os.walk(SOURCE_BASE):
-                    for file in files:
-                        file_ext = file.split('.')[-1].lower()
-
-                        # Must match the required format
-                        if file_ext != original_format:
-                            continue
-
-                        file_path = os.path.join(root, file)
-                        file_base = file.replace('.' + file_ext, '')
-
-                        # Exact match: check if markdown name contains file base name
-                        if file_base in md_filename or file_base.replace(' ', '_').replace('-', '_') in md_filename.replace('-', '_'):
-                            return file_path
-
-                        # Fuzzy match: check if meaningful parts overlap
-                        # Extract number sequences that often identify files
-                        md_numbers = [s for s in md_parts if any(c.isdigit() for c in s)]
-                        file_numbers = [s for s in file_base.replace(' ', '_').split('_') if any(c.isdigit() for c in s)]
-
-                        # If at least 2 number sequences match, likely the same file
-                        if len(md_numbers) >= 2 and len(file_numbers) >= 1:
-                            matches = sum(1 for fn in file_numbers if fn in md_numbers)
-                            if matches >= min(1, len(file_numbers)):
-                                return file_path
-
-                return None
+                return self.source_index.find(md_filename, original_format)
 
             except yaml.YAMLError:
                 return None
@@ -289,10 +258,20 @@ class TesseractExtractor:
             logger.warning(f"Error finding source for {markdown_path}: {e}")
             return None
 
-    def process_file(self, markdown_path):
-        """Process a single markdown file."""
+    def prepare_file(self, markdown_path):
+        """
+        Check a markdown file and find its source document.
+
+        Returns: (result, source_path) - result is set when the file is
+        finished here (skipped or failed), else source_path needs extracting
+        """
         self.stats['total_processed'] += 1
 
+        # Extracted before: re-extract from the recorded source (its content or our extractor changed)
+        entry = self.extractions.get(markdown_path, STAGE_OCR)
+        if entry and os.path.exists(entry.source):
+            return None, entry.source
+
         try:
             # Check if already has content
             with open(markdown_path, 'r', encoding='utf-8') as f:
@@ -301,37 +280,56 @@ class TesseractExtractor:
             parts = content.split('---\n', 2)
             if len(parts) > 2 and len(parts[2].strip()) > 500:
                 self.stats['skipped'] += 1
-                return {'status': 'skipped', 'reason': 'already has content'}
+                return {'status': 'skipped', 'reason': 'already has content'}, None
 
             # Find source document
             source_path = self.find_source_document(markdown_path)
             if not source_path or not os.path.exists(source_path):
                 self.stats['failed'] += 1
-                return {'status': 'failed', 'reason': 'source document not found'}
+                return {'status': 'failed', 'reason': 'source document not found'}, None
 
-            # Extract content
-            extracted_text = self.extract_content(source_path)
-            if not extracted_text:
-                self.stats['failed'] += 1
-                return {'status': 'failed', 'reason': 'extraction returned no text'}
-
-            # Update markdown
-            if self.update_markdown(markdown_path, extracted_text):
-                self.stats['successful'] += 1
-                self.stats['total_chars'] += len(extracted_text)
-                return {
-                    'status': 'success',
-                    'chars': len(extracted_text),
-                    'source': source_path
-                }
-            else:
-                self.stats['failed'] += 1
-                return {'status': 'failed', 'reason': 'failed to update markdown'}
+            return None, source_path
 
+        except Exception as e:
+            self.stats['failed'] += 1
+            logger.error(f"Error processing {markdown_path}: {e}")
+            return {'status': 'failed', 'reason': str(e)}, None
+
+    def finish_file(self, markdown_path, source_path, extracted_text):
+        """Write extracted text into the markdown file and record the outcome."""
+        if not extracted_text:
+            self.stats['failed'] += 1
+            self.extractions.record(markdown_path, STAGE_OCR, source_path, self.extractor, FAILED,
+                                    error='extraction returned no text')
+            return {'status': 'failed', 'reason': 'extraction returned no text'}
+
+        # Update markdown
+        if self.update_markdown(markdown_path, extracted_text):
+            self.stats['successful'] += 1
+            self.stats['total_chars'] += len(extracted_text)
+            self.extractions.record(markdown_path, STAGE_OCR, source_path, self.extractor, DONE,
+                                    chars=len(extracted_text))
+            return {
+                'status': 'success',
+                'chars': len(extracted_text),
+                'source': source_path
+            }
+        else:
+            self.stats['failed'] += 1
+            return {'status': 'failed', 'reason': 'failed to update markdown'}
+
+    def process_file(self, markdown_path):
+        """Process a single markdown file."""
+        result, source_path = self.prepare_file(markdown_path)
+        if result:
+            return result
+        try:
+            extracted_text = self.extract_content(source_path)
         except Exception as e:
             self.stats['failed'] += 1
             logger.error(f"Error processing {markdown_path}: {e}")
             return {'status': 'failed', 'reason': str(e)}
+        return self.finish_file(markdown_path, source_path, extracted_text)
 
     def process_category(self, category_name, max_files=None):
         """Process only empty (metadata-only) files in a category."""
@@ -345,24 +343,34 @@ class TesseractExtractor:
         logger.info(f"Processing category: {category_name}")
         logger.info(f"{'='*80}")
 
-        # Find ONLY empty markdown files (< 500 bytes after frontmatter)
+        # Find files to extract: recorded ones whose source or extractor changed,
+        # and unrecorded ones that are still empty (< 500 bytes after frontmatter)
+        # One cached tree listing instead of two os.walk passes per category
+        all_md = [os.path.join(DB_BASE, rel) for rel in get_tree_snapshot(DB_BASE).files(category_name, suffix='.md')]
         md_files = []
-        for root, dirs, files in os.walk(category_path):
-            for file in files:
-                if file.endswith('.md'):
-                    file_path = os.path.join(root, file)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        parts = content.split('---\n', 2)
-                        # Only process if content after frontmatter is < 500 bytes
-                        if len(parts) <= 2 or len(parts[2].strip()) < 500:
-                            md_files.append(file_path)
-                    except:
-                        pass
-
-        total_in_cat = sum(1 for root, dirs, files in os.walk(category_path) for f in files if f.endswith('.md'))
-        logger.info(f"Found {len(md_files)}/{total_in_cat} empty markdown files in {category_name}")
+        unchanged = 0
+        for file_path in all_md:
+            entry = self.extractions.get(file_path, STAGE_OCR)
+            if entry:
+                if self.extractions.is_current(file_path, STAGE_OCR, entry.source, self.extractor):
+                    unchanged += 1
+                else:
+                    md_files.append(file_path)
+                continue
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    content = f.read()
+                parts = content.split('---\n', 2)
+                # Only process if content after frontmatter is < 500 bytes
+                if len(parts) <= 2 or len(parts[2].strip()) < 500:
+                    md_files.append(file_path)
+            except:
+                pass
+
+        total_in_cat = len(all_md)
+        self.stats['unchanged'] += unchanged
+        logger.info(f"Found {len(md_files)}/{total_in_cat} markdown files to extract in {category_name} "
+                    f"({unchanged} unchanged since last run)")
 
         if max_files:
             md_files = md_files[:max_files]
@@ -374,12 +382,7 @@ class TesseractExtractor:
             'skipped': 0,
         }
 
-        for i, md_path in enumerate(md_files, 1):
-            file_name = os.path.basename(md_path)
-            print(f"\r[{i}/{len(md_files)}] {file_name[:50]:<50}", end='', flush=True)
-
-            result = self.process_file(md_path)
-
+        def record(result):
             if result['status'] == 'success':
                 category_stats['successful'] += 1
             elif result['status'] == 'failed':
@@ -387,6 +390,36 @@ class TesseractExtractor:
             else:
                 category_stats['skipped'] += 1
 
+        # Pass 1: find sources, queue PDFs for OCR
+        ocr_jobs = {}  # pdf_path -> ([markdown_path, ...], source_path, is_temp_pdf)
+        for i, md_path in enumerate(md_files, 1):
+            file_name = os.path.basename(md_path)
+            print(f"\r[{i}/{len(md_files)}] {file_name[:50]:<50}", end='', flush=True)
+
+            result, source_path = self.prepare_file(md_path)
+            if result:
+                record(result)
+                continue
+
+            text, pdf_path, is_temp = self.resolve_ocr_input(source_path)
+            if text or not pdf_path:
+                record(self.finish_file(md_path, source_path, text))
+            else:
+                # Several markdown files can share one source: OCR it once
+                ocr_jobs.setdefault(pdf_path, ([], source_path, is_temp))[0].append(md_path)
+
+        # Pass 2: OCR every page of every queued PDF on all cores
+        print()
+        logger.info(f"OCR of {len(ocr_jobs)} documents on {self.ocr_engine.workers} worker(s)")
+        for doc in self.ocr_engine.run(list(ocr_jobs)):
+            md_paths, source_path, is_temp = ocr_jobs[doc.pdf_path]
+            text = doc.text(page_markers=True) if doc.success else None
+            for md_path in md_paths:
+                record(self.finish_file(md_path, source_path, text))
+            if is_temp:
+                self.discard_converted(doc.pdf_path)
+        logger.info(f"  OCR throughput: {self.ocr_engine.stats['pages_per_sec']} pages/sec")
+
         print()  # New line after progress
         logger.info(f"\n{category_name} Results:")
         logger.info(f"  Successful: {category_stats['successful']}")
@@ -414,6 +447,7 @@ class TesseractExtractor:
         logger.info(f"Successful: {self.stats['successful']} ({100*self.stats['successful']//max(1, self.stats['total_processed'])}%)")
         logger.info(f"Failed: {self.stats['failed']}")
         logger.info(f"Skipped: {self.stats['skipped']}")
+        logger.info(f"Unchanged since last run: {self.stats['unchanged']}")
         logger.info(f"Total characters extracted: {self.stats['total_chars']:,}")
         logger.info(f"{'='*80}")
 
@@ -447,10 +481,14 @@ def main():
 
     start_time = time.time()
 
-    for category in priority_order:
-        if category not in CATEGORIES:
-            continue
-        extractor.process_category(category)
+    try:
+        for category in priority_order:
+            if category not in CATEGORIES:
+                continue
+            extractor.process_category(category)
+    finally:
+        extractor.ocr_engine.close()  # Stop the OCR worker processes
+        close_conversion_server()  # And the LibreOffice listeners
 
     elapsed = time.time() - start_time
     minutes = int(elapsed / 60)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Content-hash extraction manifest shared by the extraction and OCR scripts.
+
+The scripts used to decide what to (re)process by re-reading every markdown
+file and checking whether its body was under 500 bytes, or by a `processed`
+flag in a JSON manifest rewritten wholesale after each batch. This module
+keeps one SQLite table with a row per (target markdown, stage):
+
+    stage      'text' (pdfplumber / python-docx), 'ocr' (Tesseract, OCR.SPACE),
+               'pipeline' (extraction_pipeline.py, all steps) or 'clean'
+               (clean_word_corrupted_files.py; source is the markdown itself)
+    source     source document the target was extracted from
+    hash       SHA-256 of the source content
+    extractor  extractor name + version (e.g. 'tesseract-5.3.0/dpi150/eng+vie')
+    status     'done', 'failed', 'needs_ocr' or 'clean' (checked, nothing to do)
+
+A target is current for a stage when its row has the same source, the source
+content hash is unchanged and the extractor is the same. Rows are written
+one per committed transaction as each item finishes, so an interrupted run
+keeps everything done so far.
+
+Hashing is skipped when the source's size and mtime match the row, so a
+rerun where nothing changed costs one index lookup and one stat per file.
+
+Usage:
+    from extraction_manifest import ExtractionManifest
+
+    manifest = ExtractionManifest()               # extraction_manifest.db next to this script
+    if manifest.is_current(md_path, 'ocr', source_pdf, extractor):
+        ...                                       # skip: unchanged source, same extractor
+    manifest.record(md_path, 'ocr', source_pdf, extractor, 'done', chars=len(text))
+
+    python3 extraction_manifest.py [db_path]      # counts per stage and status
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+DEFAULT_DB = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'extraction_manifest.db')
+HASH_CHUNK = 1 << 20
+
+STAGE_TEXT = 'text'
+STAGE_OCR = 'ocr'
+STAGE_PIPELINE = 'pipeline'
+STAGE_CLEAN = 'clean'
+
+DONE = 'done'
+FAILED = 'failed'
+NEEDS_OCR = 'needs_ocr'
+CLEAN = 'clean'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS extractions (
+    target TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    source TEXT NOT NULL,
+    source_hash TEXT NOT NULL,
+    source_size INTEGER NOT NULL,
+    source_mtime_ns INTEGER NOT NULL,
+    extractor TEXT NOT NULL,
+    status TEXT NOT NULL,
+    chars INTEGER NOT NULL DEFAULT 0,
+    error TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (target, stage)
+);
+CREATE INDEX IF NOT EXISTS idx_extractions_hash ON extractions(source_hash, extractor);
+CREATE INDEX IF NOT EXISTS idx_extractions_status ON extractions(stage, status);
+"""
+
+
+@dataclass
+class ManifestEntry:
+    """One row of the manifest."""
+    target: str
+    stage: str
+    source: str
+    source_hash: str
+    source_size: int
+    source_mtime_ns: int
+    extractor: str
+    status: str
+    chars: int
+    error: str
+    updated_at: float
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExtractionManifest:
+    """SQLite-backed record of what was extracted from which source content, by which extractor."""
+
+    def __init__(self, db_path: str = DEFAULT_DB, retry_failed: bool = False):
+        """
+        Args:
+            db_path: SQLite file (created if missing)
+            retry_failed: Treat 'failed' rows as not current, so failures are retried
+        """
+        self.db_path = db_path
+        self.retry_failed = retry_failed
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        try:
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.OperationalError:
+            pass
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    # =========================================================================
+    # LOOKUPS
+    # =========================================================================
+
+    def get(self, target: str, stage: str) -> Optional[ManifestEntry]:
+        """Row of a target for a stage (None if never recorded)."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM extractions WHERE target = ? AND stage = ?', (str(target), stage)
+            ).fetchone()
+        return ManifestEntry(**dict(row)) if row else None
+
+    def source_fingerprint(self, source: str, entry: Optional[ManifestEntry] = None) -> Tuple[str, int, int]:
+        """
+        (hash, size, mtime_ns) of a source; the hash is reused from entry when size and mtime match.
+
+        Raises:
+            OSError: source cannot be read
+        """
+        st = os.stat(source)
+        if entry and entry.source == str(source) and (entry.source_size, entry.source_mtime_ns) == (st.st_size, st.st_mtime_ns):
+            return entry.source_hash, st.st_size, st.st_mtime_ns
+        return file_hash(source), st.st_size, st.st_mtime_ns
+
+    def is_current(self, target: str, stage: str, source: str, extractor: str) -> bool:
+        """
+        True if target was already handled for stage from this exact source content by this extractor.
+
+        A source whose mtime changed but whose content did not is still
+        current; its new size/mtime are stored so the next check skips hashing.
+        """
+        entry = self.get(target, stage)
+        if entry is None or entry.source != str(source) or entry.extractor != extractor:
+            return False
+        if self.retry_failed and entry.status == FAILED:
+            return False
+        try:
+            source_hash, size, mtime_ns = self.source_fingerprint(source, entry)
+        except OSError:
+            return False
+        if source_hash != entry.source_hash:
+            return False
+        if (size, mtime_ns) != (entry.source_size, entry.source_mtime_ns):
+            with self._lock, self._conn:
+                self._conn.execute(
+                    'UPDATE extractions SET source_size = ?, source_mtime_ns = ? WHERE target = ? AND stage = ?',
+                    (size, mtime_ns, str(target), stage)
+                )
+        return True
+
+    def entries(self, stage: Optional[str] = None, status: Optional[str] = None) -> Iterator[ManifestEntry]:
+        """All rows, optionally filtered by stage and status, in target order."""
+        query, params = 'SELECT * FROM extractions WHERE 1 = 1', []
+        if stage:
+            query += ' AND stage = ?'
+            params.append(stage)
+        if status:
+            query += ' AND status = ?'
+            params.append(status)
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY target', params).fetchall()
+        for row in rows:
+            yield ManifestEntry(**dict(row))
+
+    def counts(self) -> Dict[str, Dict[str, int]]:
+        """{stage: {status: rows}}"""
+        result: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT stage, status, COUNT(*) AS n FROM extractions GROUP BY stage, status'
+            ).fetchall()
+        for row in rows:
+            result.setdefault(row['stage'], {})[row['status']] = row['n']
+        return result
+
+    # =========================================================================
+    # UPDATES
+    # =========================================================================
+
+    def record(self, target: str, stage: str, source: str, extractor: str, status: str,
+               chars: int = 0, error: str = '') -> None:
+        """
+        Record the outcome of one item (own transaction, committed on return).
+
+        The source is fingerprinted now; a source that is gone is recorded with an empty hash.
+        """
+        entry = self.get(target, stage)
+        try:
+            source_hash, size, mtime_ns = self.source_fingerprint(source, entry)
+        except OSError:
+            source_hash, size, mtime_ns = '', 0, 0
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO extractions '
+                '(target, stage, source, source_hash, source_size, source_mtime_ns, extractor, status, chars, error, updated_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (str(target), stage, str(source), source_hash, size, mtime_ns, extractor, status,
+                 int(chars), str(error)[:500], time.time())
+            )
+
+    def forget(self, target: str, stage: Optional[str] = None) -> None:
+        """Drop a target's rows (all stages by default) so the next run extracts it again."""
+        with self._lock, self._conn:
+            if stage:
+                self._conn.execute('DELETE FROM extractions WHERE target = ? AND stage = ?', (str(target), stage))
+            else:
+                self._conn.execute('DELETE FROM extractions WHERE target = ?', (str(target),))
+
+
+def main():
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB
+    if not os.path.exists(db_path):
+        print(f'❌ No manifest at {db_path}')
+        return
+    manifest = ExtractionManifest(db_path)
+    print(f'📋 {db_path}')
+    for stage, statuses in sorted(manifest.counts().items()):
+        summary = ', '.join(f'{status}: {n}' for status, n in sorted(statuses.items()))
+        print(f'   {stage:<6} {summary}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+Parallel OCR engine with page-level work units.
+
+The Tesseract pipelines used to OCR one PDF at a time, one page at a time,
+on a single core. This engine splits every PDF into pages, OCRs the pages
+on a process pool sized to the machine, and merges each document's pages
+back in page order.
+
+Backends are pluggable:
+- TesseractBackend: one page at a time via pdf_stream (poppler) + pytesseract (default)
+- StubBackend: fixed text per page, no Tesseract/poppler needed (tests, dry runs)
+
+Usage:
+    from ocr_engine import ParallelOCREngine, TesseractBackend
+
+    with ParallelOCREngine(TesseractBackend(lang='eng+vie'), dpi=150) as engine:
+        for doc in engine.run(['a.pdf', 'b.pdf']):  # documents in completion order
+            print(doc.pdf_path, doc.page_count, len(doc.text()))
+        print(engine.stats)                          # pages, seconds, pages_per_sec
+
+The process pool is started on first use and kept for the engine's lifetime
+(close() or the with block shuts it down), so ocr_document() calls do not
+pay the worker start-up per document. If a worker dies (a page that crashes
+poppler or Tesseract), the pool is recreated, the pages that were in flight
+are retried one at a time, and only the document with the crashing page is
+marked failed.
+
+    python3 ocr_engine.py file1.pdf file2.pdf --workers 8
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pdf_stream
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LANG = 'eng+vie'
+DEFAULT_DPI = 150
+PAGE_BREAK = '\n\n--- PAGE BREAK ---\n\n'
+INFLIGHT_PER_WORKER = 4        # Pages queued per worker (bounds pending work held in memory)
+WORKER_CRASHED = 'OCR worker process crashed'
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class OCRBackend:
+    """
+    Base OCR backend: counts pages, OCRs one page.
+
+    Backends are pickled into the worker processes, so keep their state small
+    and import heavy libraries lazily inside the methods.
+    """
+
+    name = 'base'
+    version = '0'
+
+    def __init__(self, lang: str = DEFAULT_LANG):
+        self.lang = lang
+
+    def page_count(self, pdf_path: str) -> int:
+        return pdf_stream.page_count(pdf_path)
+
+    def render(self, pdf_path: str, page: int, dpi: int):
+        """Render one page (1-based) to a PIL image (spooled, grayscale; one page in memory)."""
+        return pdf_stream.render_page(pdf_path, page, dpi=dpi)
+
+    def recognize(self, image) -> str:
+        raise NotImplementedError
+
+    def ocr_page(self, pdf_path: str, page: int, dpi: int) -> str:
+        image = self.render(pdf_path, page, dpi)
+        if image is None:
+            return ''
+        try:
+            return self.recognize(image)
+        finally:
+            image.close()
+
+
+class TesseractBackend(OCRBackend):
+    """Tesseract via pytesseract."""
+
+    name = 'tesseract'
+
+    @property
+    def version(self) -> str:
+        import pytesseract
+        return str(pytesseract.get_tesseract_version())
+
+    def recognize(self, image) -> str:
+        import pytesseract
+        return pytesseract.image_to_string(image, lang=self.lang)
+
+
+class StubBackend(OCRBackend):
+    """
+    Deterministic fake OCR for tests: no rendering, no Tesseract.
+
+    Args:
+        pages: Page count reported for every PDF (or per path via pages_by_path)
+        delay: Seconds to sleep per page (simulates OCR cost)
+    """
+
+    name = 'stub'
+    version = '1'
+
+    def __init__(self, pages: int = 3, delay: float = 0.0, pages_by_path: Optional[Dict[str, int]] = None,
+                 lang: str = DEFAULT_LANG):
+        super().__init__(lang)
+        self.pages = pages
+        self.delay = delay
+        self.pages_by_path = pages_by_path or {}
+
+    def page_count(self, pdf_path: str) -> int:
+        return self.pages_by_path.get(pdf_path, self.pages)
+
+    def ocr_page(self, pdf_path: str, page: int, dpi: int) -> str:
+        if self.delay:
+            time.sleep(self.delay)
+        return f'{os.path.basename(pdf_path)} page {page}'
+
+
+# ============================================================================
+# RESULTS
+# ============================================================================
+
+@dataclass
+class PageResult:
+    """OCR output of one page."""
+    pdf_path: str
+    page: int
+    text: str = ''
+    error: str = ''
+    seconds: float = 0.0
+
+
+@dataclass
+class DocumentResult:
+    """All pages of one PDF, in page order."""
+    pdf_path: str
+    page_count: int
+    pages: List[PageResult] = field(default_factory=list)
+    error: str = ''
+
+    @property
+    def success(self) -> bool:
+        return not self.error and any(p.text.strip() for p in self.pages)
+
+    def text(self, page_markers: bool = True) -> str:
+        """
+        Merged text of the non-empty pages, joined with PAGE BREAK separators.
+
+        Args:
+            page_markers: Prefix each page with "--- PAGE N ---" (page-aware indexing uses these)
+        """
+        parts = []
+        for p in self.pages:
+            if p.text.strip():
+                parts.append(f'--- PAGE {p.page} ---\n{p.text}' if page_markers else p.text)
+        return PAGE_BREAK.join(parts).strip()
+
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+_worker_backend: Optional[OCRBackend] = None
+_worker_dpi = DEFAULT_DPI
+
+
+def _init_worker(backend: OCRBackend, dpi: int) -> None:
+    global _worker_backend, _worker_dpi
+    _worker_backend = backend
+    _worker_dpi = dpi
+
+
+def _ocr_unit(pdf_path: str, page: int) -> PageResult:
+    """Worker entry point: OCR one page."""
+    start = time.time()
+    try:
+        text = _worker_backend.ocr_page(pdf_path, page, _worker_dpi)
+        return PageResult(pdf_path, page, text=text or '', seconds=time.time() - start)
+    except Exception as e:
+        return PageResult(pdf_path, page, error=str(e)[:200], seconds=time.time() - start)
+
+
+class ParallelOCREngine:
+    """OCR many PDFs with pages spread over a process pool."""
+
+    def __init__(self, backend: Optional[OCRBackend] = None, workers: Optional[int] = None,
+                 dpi: int = DEFAULT_DPI):
+        """
+        Args:
+            backend: OCR backend (default: TesseractBackend)
+            workers: Worker processes (default: CPU count); 1 runs in-process
+            dpi: Render resolution
+        """
+        self.backend = backend or TesseractBackend()
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.dpi = dpi
+        self._elapsed = 0.0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.stats = {'documents': 0, 'pages': 0, 'failed_pages': 0, 'seconds': 0.0, 'pages_per_sec': 0.0,
+                      'pool_restarts': 0}
+
+    def __enter__(self) -> 'ParallelOCREngine':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the worker pool (the engine can still be used; a new pool starts on demand)."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def extractor_id(self, page_markers: bool = True) -> str:
+        """Extractor id for the extraction manifest: backend version, DPI, language and text layout."""
+        layout = '/pages' if page_markers else ''
+        return f'{self.backend.name}-{self.backend.version}/dpi{self.dpi}/{self.backend.lang}{layout}'
+
+    def ocr_document(self, pdf_path: str) -> DocumentResult:
+        """OCR a single PDF (its pages still run in parallel)."""
+        return list(self.run([pdf_path]))[0]
+
+    def run(self, pdf_paths: Iterable[str]) -> Iterator[DocumentResult]:
+        """
+        OCR every PDF; yields each document as soon as all its pages are done.
+
+        Documents whose page count cannot be read are yielded first with error set.
+        """
+        start = time.time()
+        units: List[Tuple[str, int]] = []
+        pending: Dict[str, DocumentResult] = {}
+        for pdf_path in pdf_paths:
+            if pdf_path in pending:
+                continue
+            try:
+                count = self.backend.page_count(pdf_path)
+            except Exception as e:
+                yield self._finish(DocumentResult(pdf_path, 0, error=f'page count failed: {str(e)[:150]}'))
+                continue
+            doc = DocumentResult(pdf_path, count)
+            if count <= 0:
+                doc.error = 'no pages'
+                yield self._finish(doc)
+                continue
+            pending[pdf_path] = doc
+            units.extend((pdf_path, page) for page in range(1, count + 1))
+
+        logger.info(f'OCR: {len(units)} pages in {len(pending)} documents on {self.workers} worker(s)')
+        for result in self._map(units):
+            doc = pending[result.pdf_path]
+            doc.pages.append(result)
+            if len(doc.pages) == doc.page_count:
+                doc.pages.sort(key=lambda p: p.page)
+                crashed = [p.page for p in doc.pages if p.error == WORKER_CRASHED]
+                if crashed:
+                    doc.error = f'{WORKER_CRASHED} on page(s) {crashed}'
+                del pending[result.pdf_path]
+                yield self._finish(doc)
+
+        self._elapsed += time.time() - start
+        self.stats['seconds'] = round(self._elapsed, 2)
+        if self._elapsed:
+            self.stats['pages_per_sec'] = round(self.stats['pages'] / self._elapsed, 2)
+        logger.info(f"OCR done: {self.stats['pages']} pages, {self.stats['pages_per_sec']} pages/sec")
+
+    def _map(self, units: List[Tuple[str, int]]) -> Iterator[PageResult]:
+        """Run units on the pool with a bounded number in flight (results in completion order)."""
+        if self.workers == 1 or len(units) <= 1:
+            _init_worker(self.backend, self.dpi)
+            for pdf_path, page in units:
+                yield _ocr_unit(pdf_path, page)
+            return
+
+        limit = self.workers * INFLIGHT_PER_WORKER
+        queue = deque(units)
+        # Units in flight when the pool broke: retried alone, so the one that
+        # breaks it again is known to be the crashing page
+        suspects: deque = deque()
+        inflight: Dict = {}
+        while queue or suspects or inflight:
+            pool = self._get_pool()
+            isolated = bool(suspects)
+            if suspects:
+                if not inflight:
+                    unit = suspects.popleft()
+                    inflight[pool.submit(_ocr_unit, *unit)] = unit
+            else:
+                while queue and len(inflight) < limit:
+                    unit = queue.popleft()
+                    inflight[pool.submit(_ocr_unit, *unit)] = unit
+
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                unit = inflight.pop(future)
+                try:
+                    result = future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    if isolated:
+                        yield PageResult(*unit, error=WORKER_CRASHED)
+                    else:
+                        suspects.append(unit)
+                    continue
+                yield result
+            if broken:
+                # Everything else in flight died with the pool
+                suspects.extend(inflight.values())
+                inflight.clear()
+                self._reset_pool(pool)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                                 initargs=(self.backend, self.dpi))
+            return self._pool
+
+    def _reset_pool(self, broken: ProcessPoolExecutor) -> None:
+        """Drop a broken pool (once, even if several callers saw it break)."""
+        with self._lock:
+            if self._pool is not broken:
+                return
+            self._pool = None
+            self.stats['pool_restarts'] += 1
+        logger.warning('OCR worker pool broke; restarting it')
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _finish(self, doc: DocumentResult) -> DocumentResult:
+        with self._lock:
+            self.stats['documents'] += 1
+            self.stats['pages'] += len(doc.pages)
+            self.stats['failed_pages'] += sum(1 for p in doc.pages if p.error)
+        for p in doc.pages:
+            if p.error:
+                logger.warning(f'Page {p.page} of {doc.pdf_path} failed: {p.error}')
+        return doc
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='OCR PDFs on all cores and print pages/sec')
+    parser.add_argument('pdfs', nargs='+')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI)
+    parser.add_argument('--lang', default=DEFAULT_LANG)
+    parser.add_argument('--stub', action='store_true', help='Use the stub backend (no Tesseract)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    backend = StubBackend(lang=args.lang) if args.stub else TesseractBackend(lang=args.lang)
+    with ParallelOCREngine(backend, workers=args.workers, dpi=args.dpi) as engine:
+        for doc in engine.run(args.pdfs):
+            status = '✅' if doc.success else f'❌ {doc.error}'
+            print(f'{status} {os.path.basename(doc.pdf_path)}: {doc.page_count} pages, {len(doc.text())} chars')
+    print(f"\n📊 {engine.stats['pages']} pages in {engine.stats['seconds']}s "
+          f"({engine.stats['pages_per_sec']} pages/sec, {engine.workers} workers)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Bounded-memory PDF rasterization for OCR.
+
+convert_from_path(pdf_path, dpi=...) renders every page of a document into
+PIL images held in memory at once, so a 200-page decree costs gigabytes per
+worker. This module renders one page at a time to a temp-file spool (poppler
+writes the file, not this process), loads it and deletes it. Peak memory is
+one decoded page, whatever the page count. ParallelOCREngine (ocr_engine.py)
+calls render_page() for each page unit on its workers.
+
+Pages are rendered in grayscale by default: Tesseract binarizes internally,
+so colour only triples the buffer size.
+
+Usage:
+    from pdf_stream import page_count, render_page
+
+    for page in range(1, page_count(pdf_path) + 1):
+        image = render_page(pdf_path, page, dpi=150)   # one page, spooled, caller closes
+"""
+
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+DEFAULT_DPI = 150
+SPOOL_PREFIX = 'pdf_stream_'
+
+
+def page_count(pdf_path: str) -> int:
+    """Number of pages (poppler pdfinfo)."""
+    from pdf2image import pdfinfo_from_path
+    return int(pdfinfo_from_path(pdf_path)['Pages'])
+
+
+def _render_to_spool(pdf_path: str, first: int, last: int, dpi: int, grayscale: bool, spool_dir: str) -> list:
+    """Render pages first..last into spool_dir; returns the image file paths in page order."""
+    from pdf2image import convert_from_path
+    paths = convert_from_path(
+        pdf_path,
+        dpi=dpi,
+        first_page=first,
+        last_page=last,
+        grayscale=grayscale,
+        output_folder=spool_dir,
+        fmt='ppm',              # Uncompressed: cheapest to write and read back
+        paths_only=True,
+    )
+    return sorted(paths)
+
+
+def _open_and_unlink(path: str):
+    """Load a spooled page fully into memory and delete its file."""
+    from PIL import Image
+    try:
+        image = Image.open(path)
+        image.load()
+        return image
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def render_page(pdf_path: str, page: int, dpi: int = DEFAULT_DPI, grayscale: bool = True,
+                spool_dir: Optional[str] = None):
+    """
+    Render a single page (1-based) to a PIL image via the spool.
+
+    The caller owns the image and should close() it after use.
+    """
+    own_spool = spool_dir is None
+    spool_dir = spool_dir or tempfile.mkdtemp(prefix=SPOOL_PREFIX)
+    try:
+        paths = _render_to_spool(pdf_path, page, page, dpi, grayscale, spool_dir)
+        return _open_and_unlink(paths[0]) if paths else None
+    finally:
+        if own_spool:
+            shutil.rmtree(spool_dir, ignore_errors=True)
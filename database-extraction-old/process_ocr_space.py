@@ -2,6 +2,9 @@
 """
 Process scanned PDFs via OCR.SPACE free API.
 OCR.SPACE allows 25,000 requests/month free (no registration required).
+
+Done items are kept in the extraction manifest (extraction_manifest.py), so
+a rerun skips PDFs already OCR'd by OCR.SPACE from the same content.
 """
 
 import json
@@ -17,12 +20,15 @@ except ImportError:
     subprocess.check_call(["python3", "-m", "pip", "install", "requests", "-q"])
     import requests
 
+from extraction_manifest import DONE, FAILED, STAGE_OCR, ExtractionManifest
+
 
 class OCRSpaceProcessor:
     """Process PDFs using OCR.SPACE API."""
 
     # Use free API endpoint (no registration needed)
     API_URL = "https://api.ocr.space/parse"
+    EXTRACTOR = "ocr.space/eng"  # Extractor id recorded in the extraction manifest
 
     @staticmethod
     def process_pdf(pdf_path: str, timeout: int = 120) -> str:
@@ -88,10 +94,11 @@ class OCRSpaceProcessor:
 class OCRPipeline:
     """Orchestrate OCR processing."""
 
-    def __init__(self, manifest_path: str):
+    def __init__(self, manifest_path: str, extractions: ExtractionManifest = None):
         self.manifest_path = Path(manifest_path)
         with open(manifest_path) as f:
             self.manifest = json.load(f)
+        self.extractions = extractions or ExtractionManifest()
 
     def process_batch(self, start_idx: int = 0, limit: int = None) -> Dict:
         """
@@ -108,8 +115,10 @@ class OCRPipeline:
             "processed": 0,
             "succeeded": 0,
             "failed": 0,
+            "skipped": 0,
             "failed_files": [],
         }
+        extractor = OCRSpaceProcessor.EXTRACTOR
 
         print(f"\n{'='*70}")
         print(f"OCR.SPACE BATCH PROCESSING")
@@ -126,6 +135,11 @@ class OCRPipeline:
                 stats["failed_files"].append(Path(source_pdf).name)
                 continue
 
+            if self.extractions.is_current(target_md, STAGE_OCR, source_pdf, extractor):
+                print(f"⏭️  [{idx}/{end_idx}] Unchanged since last OCR: {Path(source_pdf).name}")
+                stats["skipped"] += 1
+                continue
+
             # Process with OCR.SPACE
             extracted_text = OCRSpaceProcessor.process_pdf(source_pdf)
 
@@ -135,7 +149,9 @@ class OCRPipeline:
                 # Update markdown
                 if self._update_markdown(target_md, extracted_text):
                     stats["succeeded"] += 1
-                    item["processed"] = True
+                    self.extractions.record(
+                        target_md, STAGE_OCR, source_pdf, extractor, DONE, chars=len(extracted_text)
+                    )
                     print(f"   📝 Updated: {Path(target_md).name}\n")
                 else:
                     stats["failed"] += 1
@@ -144,15 +160,13 @@ class OCRPipeline:
             else:
                 stats["failed"] += 1
                 stats["failed_files"].append(Path(source_pdf).name)
+                self.extractions.record(target_md, STAGE_OCR, source_pdf, extractor, FAILED, error="no text")
                 print(f"   ⚠️  No text extracted\n")
 
             # Rate limiting: OCR.SPACE is free so let's be respectful
             if idx < end_idx:
                 time.sleep(2)  # 2 second delay between requests
 
-        # Save updated manifest
-        self._save_manifest()
-
         return stats
 
     @staticmethod
@@ -181,16 +195,15 @@ class OCRPipeline:
             print(f"   ⚠️  Update error: {e}")
             return False
 
-    def _save_manifest(self):
-        """Save updated manifest."""
-        with open(self.manifest_path, "w") as f:
-            json.dump(self.manifest, f, indent=2)
-        print(f"📋 Manifest saved: {self.manifest_path}")
+    def processed_count(self) -> int:
+        """Work-list items with a successful OCR record in the extraction manifest."""
+        done = {entry.target for entry in self.extractions.entries(STAGE_OCR, DONE)}
+        return sum(1 for f in self.manifest["files"] if f["target_markdown"] in done)
 
     def print_summary(self, stats: Dict):
         """Print processing summary."""
         total = self.manifest["total_scanned"]
-        processed_count = sum(1 for f in self.manifest["files"] if f.get("processed"))
+        processed_count = self.processed_count()
 
         print(f"\n{'='*70}")
         print(f"OCR PROCESSING SUMMARY")
@@ -199,6 +212,7 @@ class OCRPipeline:
         print(f"Processed so far:         {processed_count}")
         print(f"")
         print(f"✅ This batch succeeded:  {stats['succeeded']}")
+        print(f"⏭️  This batch skipped:    {stats['skipped']}")
         print(f"⚠️  This batch failed:     {stats['failed']}")
         print(f"")
         print(f"📊 Overall progress:      {processed_count}/{total} ({100*processed_count//total}%)")
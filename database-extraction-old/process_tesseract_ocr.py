@@ -2,6 +2,10 @@
 """
 Process scanned PDFs using local Tesseract OCR.
 Works offline, supports Vietnamese, no API limits.
+
+ocr_manifest.json is the work list; which items are done is kept in the
+extraction manifest (extraction_manifest.py), so a rerun only OCRs PDFs that
+are new, changed, or were OCR'd with a different Tesseract version/settings.
 """
 
 import json
@@ -27,6 +31,9 @@ except ImportError:
 
 from PIL import Image
 
+from extraction_manifest import DONE, FAILED, STAGE_OCR, ExtractionManifest
+from ocr_engine import ParallelOCREngine, TesseractBackend
+
 
 class TesseractOCR:
     """Process PDFs using local Tesseract OCR."""
@@ -35,7 +42,7 @@ class TesseractOCR:
     def extract_from_pdf(pdf_path: str, lang: str = "eng+vie") -> Tuple[str, bool]:
         """
         Extract text from PDF using Tesseract OCR.
-        Converts PDF to images and runs OCR on each page.
+        Pages are rendered one at a time (bounded memory) and OCR'd in process.
 
         Args:
             pdf_path: Path to PDF file
@@ -44,55 +51,29 @@ class TesseractOCR:
         Returns:
             (extracted_text, success)
         """
-        try:
-            print(f"  🔄 Converting PDF to images: {Path(pdf_path).name}...")
-
-            # Convert PDF to images
-            images = convert_from_path(pdf_path, dpi=150)  # 150 DPI is good balance
-
-            if not images:
-                print(f"     ⚠️  No pages extracted from PDF")
-                return "", False
-
-            print(f"     📄 {len(images)} pages extracted, running OCR...")
-
-            # Run OCR on each page and combine results
-            text_parts = []
-            for idx, image in enumerate(images):
-                try:
-                    # Run Tesseract OCR
-                    text = pytesseract.image_to_string(image, lang=lang)
-
-                    if text.strip():
-                        text_parts.append(text)
-                        print(f"     ✓ Page {idx + 1}: {len(text)} chars")
-                    else:
-                        print(f"     ✗ Page {idx + 1}: No text found")
-                except Exception as e:
-                    print(f"     ⚠️  Page {idx + 1} error: {str(e)[:50]}")
-                    continue
-
-            full_text = "\n\n--- PAGE BREAK ---\n\n".join(text_parts).strip()
-
-            if full_text:
-                print(f"     ✅ Extracted {len(full_text)} characters")
-                return full_text, True
-            else:
-                print(f"     ⚠️  No text extracted from any page")
-                return "", False
-
-        except Exception as e:
-            print(f"     ❌ Error: {str(e)[:100]}")
-            return "", False
+        print(f"  🔄 OCR: {Path(pdf_path).name}...")
+        with ParallelOCREngine(TesseractBackend(lang=lang), workers=1, dpi=150) as engine:  # 150 DPI is good balance
+            doc = engine.ocr_document(pdf_path)
+        for page in doc.pages:
+            if page.error:
+                print(f"     ⚠️  Page {page.page} error: {page.error[:50]}")
+        full_text = doc.text(page_markers=False)
+        if doc.success and full_text:
+            print(f"     ✅ Extracted {len(full_text)} characters from {doc.page_count} pages")
+            return full_text, True
+        print(f"     ⚠️  No text extracted {doc.error}")
+        return "", False
 
 
 class TesseractPipeline:
     """Orchestrate Tesseract OCR processing."""
 
-    def __init__(self, manifest_path: str):
+    def __init__(self, manifest_path: str, workers: int = None, extractions: ExtractionManifest = None):
         self.manifest_path = Path(manifest_path)
+        self.workers = workers  # OCR processes (None = all cores)
         with open(manifest_path) as f:
             self.manifest = json.load(f)
+        self.extractions = extractions or ExtractionManifest()
         self.stats = {
             "processed": 0,
             "succeeded": 0,
@@ -117,14 +98,23 @@ class TesseractPipeline:
         print(f"{'='*70}")
         print(f"Processing PDFs {start_idx + 1}-{end_idx} of {len(files)} total\n")
 
+        engine = ParallelOCREngine(TesseractBackend(lang="eng+vie"), workers=self.workers, dpi=150)
+        extractor = engine.extractor_id(page_markers=False)
+
+        # Pass 1: decide what to OCR
+        jobs = {}
         for idx, item in enumerate(files[start_idx:end_idx], start=start_idx + 1):
             source_pdf = item["source_pdf"]
             target_md = item["target_markdown"]
             pdf_name = Path(source_pdf).name
 
-            # Skip if already processed
-            if item.get("processed"):
-                print(f"[{idx}/{end_idx}] ⏭️  SKIP: {pdf_name} (already processed)")
+            if item.get("processed") and self.extractions.get(target_md, STAGE_OCR) is None:
+                # Processed before the extraction manifest existed: adopt rather than re-OCR
+                self.extractions.record(target_md, STAGE_OCR, source_pdf, extractor, DONE)
+
+            # Skip if already OCR'd from this exact PDF content with the same settings
+            if self.extractions.is_current(target_md, STAGE_OCR, source_pdf, extractor):
+                print(f"[{idx}/{end_idx}] ⏭️  SKIP: {pdf_name} (unchanged since last OCR)")
                 self.stats["skipped"] += 1
                 continue
 
@@ -134,32 +124,50 @@ class TesseractPipeline:
                 self.stats["failed_files"].append(pdf_name)
                 continue
 
-            print(f"[{idx}/{end_idx}] {pdf_name}")
-
-            # Extract with Tesseract
-            extracted_text, success = TesseractOCR.extract_from_pdf(source_pdf)
-            self.stats["processed"] += 1
+            jobs[source_pdf] = item
 
-            if success and extracted_text and len(extracted_text) > 50:
-                # Update markdown
-                if self._update_markdown(target_md, extracted_text):
-                    self.stats["succeeded"] += 1
-                    item["processed"] = True
-                    print(f"   📝 Updated markdown\n")
+        # Pass 2: OCR all pages of all PDFs on every core; documents arrive as they finish
+        print(f"🔄 OCR of {len(jobs)} PDFs on {engine.workers} worker(s)...\n")
+        try:
+            for done, doc in enumerate(engine.run(list(jobs)), start=1):
+                item = jobs[doc.pdf_path]
+                pdf_name = Path(doc.pdf_path).name
+                extracted_text = doc.text(page_markers=False)
+                self.stats["processed"] += 1
+                print(f"[{done}/{len(jobs)}] {pdf_name}: {doc.page_count} pages, {len(extracted_text)} chars")
+
+                if doc.success and extracted_text and len(extracted_text) > 50:
+                    # Update markdown
+                    if self._update_markdown(item["target_markdown"], extracted_text):
+                        self.stats["succeeded"] += 1
+                        self.extractions.record(
+                            item["target_markdown"], STAGE_OCR, doc.pdf_path, extractor, DONE, chars=len(extracted_text)
+                        )
+                        print(f"   📝 Updated markdown\n")
+                    else:
+                        self.stats["failed"] += 1
+                        self.stats["failed_files"].append(pdf_name)
+                        print(f"   ⚠️  Failed to update markdown\n")
                 else:
                     self.stats["failed"] += 1
                     self.stats["failed_files"].append(pdf_name)
-                    print(f"   ⚠️  Failed to update markdown\n")
-            else:
-                self.stats["failed"] += 1
-                self.stats["failed_files"].append(pdf_name)
-                print(f"   ⚠️  Extraction failed or no text found\n")
+                    self.extractions.record(
+                        item["target_markdown"], STAGE_OCR, doc.pdf_path, extractor, FAILED, error=doc.error or "no text"
+                    )
+                    print(f"   ⚠️  Extraction failed or no text found {doc.error}\n")
+        finally:
+            engine.close()  # Stop the OCR worker processes
 
-        # Save updated manifest
-        self._save_manifest()
+        self.stats["pages_per_sec"] = engine.stats["pages_per_sec"]
+        print(f"📊 {engine.stats['pages']} pages at {engine.stats['pages_per_sec']} pages/sec")
 
         return self.stats
 
+    def processed_count(self) -> int:
+        """Work-list items with a successful OCR record in the extraction manifest."""
+        done = {entry.target for entry in self.extractions.entries(STAGE_OCR, DONE)}
+        return sum(1 for f in self.manifest["files"] if f["target_markdown"] in done)
+
     @staticmethod
     def _update_markdown(md_path: str, extracted_text: str) -> bool:
         """Update markdown file with OCR'd text."""
@@ -184,15 +192,10 @@ class TesseractPipeline:
             print(f"   ⚠️  Markdown update error: {str(e)[:50]}")
             return False
 
-    def _save_manifest(self):
-        """Save updated manifest."""
-        with open(self.manifest_path, "w") as f:
-            json.dump(self.manifest, f, indent=2)
-
     def print_summary(self, stats: Dict):
         """Print processing summary."""
         total = self.manifest["total_scanned"]
-        processed_count = sum(1 for f in self.manifest["files"] if f.get("processed"))
+        processed_count = self.processed_count()
 
         print(f"\n{'='*70}")
         print(f"BATCH SUMMARY")
@@ -228,11 +231,13 @@ def main():
         print("   Run extract_all_documents.py first.")
         return
 
-    # Parse command-line arguments
-    start_idx = int(sys.argv[1]) if len(sys.argv) > 1 else 0
-    limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10  # Default: 10 at a time
+    # Parse command-line arguments (--retry-failed re-runs PDFs that failed last time)
+    args = [a for a in sys.argv[1:] if a != "--retry-failed"]
+    start_idx = int(args[0]) if len(args) > 0 else 0
+    limit = int(args[1]) if len(args) > 1 else 10  # Default: 10 at a time
 
-    pipeline = TesseractPipeline(manifest_path)
+    extractions = ExtractionManifest(retry_failed="--retry-failed" in sys.argv)
+    pipeline = TesseractPipeline(manifest_path, extractions=extractions)
 
     print("\n🚀 Starting Tesseract OCR processing...")
     print(f"   (Local OCR - no API limits, supports Vietnamese)\n")
@@ -241,7 +246,7 @@ def main():
     pipeline.print_summary(stats)
 
     # Calculate next batch
-    processed_count = sum(1 for f in pipeline.manifest["files"] if f.get("processed"))
+    processed_count = pipeline.processed_count()
     total = pipeline.manifest["total_scanned"]
     remaining = total - processed_count
 
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+One-walk index of the source document tree for markdown → source matching.
+
+TesseractExtractor.find_source_document used to os.walk the whole source
+tree for every markdown file and test each source file in turn. This index
+walks the tree once and keeps, per extension:
+
+- raw basename → paths and normalized basename (spaces/hyphens → "_") → paths
+- number token → paths (inverted map over the "_"-separated tokens with a digit)
+
+find() applies the same two rules as before - the markdown name contains
+the source basename, or they share a number token when the markdown name
+has at least two - by looking up the markdown name's substrings and number
+tokens, and returns the first candidate in walk order, as the per-file walk
+did.
+
+Usage:
+    from source_index import SourceIndex
+
+    index = SourceIndex(SOURCE_BASE)               # one os.walk
+    index.find('CV_2023_11_30_CV_5367_Ke_khai', 'pdf')
+"""
+
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+
+def normalize_name(name: str) -> str:
+    """Spaces and hyphens to underscores (how markdown file names were derived)."""
+    return name.replace(' ', '_').replace('-', '_')
+
+
+def number_tokens(name: str) -> List[str]:
+    """"_"-separated tokens containing a digit."""
+    return [token for token in name.split('_') if any(c.isdigit() for c in token)]
+
+
+class SourceIndex:
+    """Basename and number-token maps of every file under a root, built with one walk."""
+
+    def __init__(self, root: str):
+        """
+        Args:
+            root: Source tree to index (a missing root gives an empty index)
+        """
+        self.root = root
+        self.paths: List[str] = []                 # Walk order; the maps below hold indexes into it
+        self._raw: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        self._normalized: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        self._numbers: Dict[str, Dict[str, List[int]]] = defaultdict(lambda: defaultdict(list))
+        self._max_base = 0
+        self.build_seconds = 0.0
+        self._build()
+
+    def _build(self) -> None:
+        start = time.time()
+        if os.path.exists(self.root):
+            for dirpath, _, files in os.walk(self.root):
+                for file in files:
+                    base, dot, ext = file.rpartition('.')
+                    if not dot:
+                        continue
+                    ext = ext.lower()
+                    position = len(self.paths)
+                    self.paths.append(os.path.join(dirpath, file))
+                    self._raw[ext][base].append(position)
+                    self._normalized[ext][normalize_name(base)].append(position)
+                    for token in set(number_tokens(base.replace(' ', '_'))):
+                        self._numbers[ext][token].append(position)
+                    self._max_base = max(self._max_base, len(base))
+        self.build_seconds = time.time() - start
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def find(self, md_filename: str, ext: str) -> Optional[str]:
+        """
+        Source file for a markdown name (without .md), or None.
+
+        Args:
+            md_filename: Markdown file name without extension
+            ext: Required source extension ('pdf', 'doc', 'docx')
+        """
+        ext = ext.lower()
+        candidates = set()
+
+        # Rule 1: markdown name contains the source basename (raw or normalized)
+        raw, normalized = self._raw.get(ext, {}), self._normalized.get(ext, {})
+        md_normalized = md_filename.replace('-', '_')
+        for name, table in ((md_filename, raw), (md_normalized, normalized)):
+            if not table:
+                continue
+            for positions in _substring_hits(name, table, self._max_base):
+                candidates.update(positions)
+
+        # Rule 2: at least two number tokens in the markdown name, one shared with the source
+        md_numbers = number_tokens(md_filename)
+        if len(md_numbers) >= 2:
+            numbers = self._numbers.get(ext, {})
+            for token in md_numbers:
+                candidates.update(numbers.get(token, ()))
+
+        return self.paths[min(candidates)] if candidates else None
+
+
+def _substring_hits(name: str, table: Dict[str, List[int]], max_length: int):
+    """Position lists of table keys that occur in name (including the empty key)."""
+    if '' in table:
+        yield table['']
+    for start in range(len(name)):
+        for end in range(start + 1, min(len(name), start + max_length) + 1):
+            positions = table.get(name[start:end])
+            if positions:
+                yield positions
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Usage: python3 source_index.py <source_root> [markdown_name ext]')
+        return
+    index = SourceIndex(sys.argv[1])
+    print(f'📂 {len(index)} source files indexed in {index.build_seconds:.2f}s')
+    if len(sys.argv) >= 4:
+        print(index.find(sys.argv[2], sys.argv[3]) or '❌ No match')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the conversion server's restart and retry path on the stub backend (no LibreOffice needed)
+
+Run: python3 -m pytest test_conversion_server.py
+"""
+
+import functools
+import os
+
+from conversion_server import ConversionServer, StubBackend
+
+
+def _server(tmp_path, crash_every):
+    StubBackend.starts = 0
+    factory = functools.partial(StubBackend, crash_every=crash_every)
+    return ConversionServer(factory, workers=1, timeout=10, output_root=str(tmp_path))
+
+
+def test_crashed_backend_is_restarted_and_request_retried(tmp_path):
+    with _server(tmp_path, crash_every=2) as server:
+        first = server.convert('/docs/first.doc')
+        second = server.convert('/docs/second.doc')   # Crashes once, succeeds on the new backend
+
+    assert first.ok and first.attempts == 1
+    assert second.ok, second.error
+    assert second.attempts == 2
+    assert os.path.basename(second.pdf_path) == 'second.pdf'
+    assert server.stats['restarts'] == 1
+    assert StubBackend.starts == 2
+    assert server.stats['converted'] == 2 and server.stats['failed'] == 0
+    # Only the successful attempts' output directories remain
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        os.path.basename(r.output_dir) for r in (first, second)
+    )
+    first.discard()
+    second.discard()
+    assert os.listdir(tmp_path) == []
+
+
+def test_request_retried_once_then_failed_without_output(tmp_path):
+    with _server(tmp_path, crash_every=1) as server:
+        result = server.convert('/docs/broken.doc')
+
+    assert not result.ok
+    assert result.error == 'stub crash'
+    assert result.attempts == 2
+    assert result.output_dir == '' and result.pdf_path == ''
+    assert server.stats['failed'] == 1
+    assert os.listdir(tmp_path) == []
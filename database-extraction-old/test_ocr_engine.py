@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the parallel OCR engine on the stub backend (no Tesseract or poppler needed)
+
+Run: python3 -m pytest test_ocr_engine.py
+"""
+
+import os
+import time
+
+from ocr_engine import WORKER_CRASHED, ParallelOCREngine, StubBackend
+
+
+class ReversedDelayBackend(StubBackend):
+    """Later pages finish first, so results reach the engine out of page order."""
+
+    def ocr_page(self, pdf_path, page, dpi):
+        time.sleep(0.02 * (self.page_count(pdf_path) - page))
+        return super().ocr_page(pdf_path, page, dpi)
+
+
+class CrashingBackend(StubBackend):
+    """Kills the worker process on every page of crash.pdf."""
+
+    def ocr_page(self, pdf_path, page, dpi):
+        if os.path.basename(pdf_path) == 'crash.pdf':
+            os._exit(1)
+        return super().ocr_page(pdf_path, page, dpi)
+
+
+def test_pages_merged_in_page_order():
+    with ParallelOCREngine(ReversedDelayBackend(pages=6), workers=3) as engine:
+        doc = engine.ocr_document('a.pdf')
+    assert [p.page for p in doc.pages] == list(range(1, 7))
+    assert doc.success
+    assert doc.text(page_markers=False).split('\n\n--- PAGE BREAK ---\n\n') == [
+        f'a.pdf page {n}' for n in range(1, 7)
+    ]
+    assert doc.text().startswith('--- PAGE 1 ---\na.pdf page 1')
+
+
+def test_worker_crash_fails_only_that_document():
+    paths = ['a.pdf', 'crash.pdf', 'b.pdf']
+    with ParallelOCREngine(CrashingBackend(pages=2), workers=2) as engine:
+        docs = {doc.pdf_path: doc for doc in engine.run(paths)}
+        # The pool survives the crash and keeps serving later calls
+        after = engine.ocr_document('c.pdf')
+
+    assert set(docs) == set(paths)
+    assert WORKER_CRASHED in docs['crash.pdf'].error
+    assert not docs['crash.pdf'].success
+    for path in ('a.pdf', 'b.pdf'):
+        assert docs[path].success, docs[path].error
+        assert [p.text for p in docs[path].pages] == [f'{path} page 1', f'{path} page 2']
+    assert after.success
+    assert engine.stats['pool_restarts'] >= 1
+
+
+def test_stats_count_pages_and_rate():
+    with ParallelOCREngine(StubBackend(pages=4, delay=0.01), workers=2) as engine:
+        docs = list(engine.run(['a.pdf', 'b.pdf', 'c.pdf']))
+    assert len(docs) == 3
+    assert engine.stats['documents'] == 3
+    assert engine.stats['pages'] == 12
+    assert engine.stats['failed_pages'] == 0
+    assert engine.stats['seconds'] > 0
+    assert engine.stats['pages_per_sec'] == round(12 / engine._elapsed, 2)